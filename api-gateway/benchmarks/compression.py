@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+"""
+Mesure la compression des réponses de la passerelle, route par route.
+
+Les microservices sont remplacés par des stubs dont la taille de réponse
+dépend du service (listes produits et commandes volumineuses, inventaire
+court). Pour chaque route et chaque ``Accept-Encoding`` proposé, le
+benchmark appelle le ``WSGIHandler`` séquentiellement et rapporte les octets
+envoyés au client et le temps CPU du processus par requête ; le surcoût CPU
+est calculé par rapport aux réponses non compressées.
+
+    python benchmarks/compression.py --requests 500
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from benchmarks.proxy_engines import _wsgi_environ  # noqa: E402
+
+ROUTES = {
+    '/api/products/': ('product', 64 * 1024, False),
+    '/api/orders/': ('order', 16 * 1024, True),
+    '/api/inventory/': ('inventory', 512, True),
+}
+
+ENCODINGS = ['identity', 'gzip', 'br']
+
+
+def run(handler, path, headers, requests):
+    wire_bytes = 0
+    encoding = None
+    cpu_start = time.process_time()
+    for _ in range(requests):
+        status = []
+        body = handler(_wsgi_environ(path, headers),
+                       lambda code, response_headers: status.append(response_headers))
+        for chunk in body:
+            wire_bytes += len(chunk)
+        body.close()
+        encoding = dict(status[0]).get('Content-Encoding', 'identity')
+    cpu = time.process_time() - cpu_start
+    return wire_bytes / requests, cpu / requests, encoding
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=300)
+    args = parser.parse_args()
+
+    os.environ['DJANGO_SETTINGS_MODULE'] = 'gateway.settings'
+    os.environ['GATEWAY_ASYNC_PROXY'] = '0'
+    import django
+    from django.conf import settings
+    django.setup()
+    settings.RATE_LIMITS['ENABLED'] = False
+
+    from benchmarks.stubs import StubUpstream, start_stubs
+    from django.core.handlers.wsgi import WSGIHandler
+    from gateway.compression import available_encodings
+
+    sizes = {service: size for service, size, _ in ROUTES.values()}
+    start_stubs({name: url for name, url in settings.MICROSERVICES.items() if name not in sizes})
+    for service, size in sizes.items():
+        port = int(settings.MICROSERVICES[service].rsplit(':', 1)[1])
+        StubUpstream(port, payload_size=size).start()
+
+    handler = WSGIHandler()
+    offered = [encoding for encoding in ENCODINGS
+               if encoding == 'identity' or encoding in available_encodings()]
+    print(f"{'route':<18} {'accept':<9} {'sent':>8} {'wire B':>9} {'ratio':>6} "
+          f"{'cpu us':>8} {'+cpu us':>8}")
+    for path, (_, _, protected) in ROUTES.items():
+        baseline_bytes = baseline_cpu = None
+        for encoding in offered:
+            headers = {'Accept-Encoding': encoding}
+            if protected:
+                headers['Authorization'] = 'Bearer bench'
+            run(handler, path, headers, min(20, args.requests))  # chauffe
+            wire, cpu, sent = run(handler, path, headers, args.requests)
+            if baseline_bytes is None:
+                baseline_bytes, baseline_cpu = wire, cpu
+            print(f"{path:<18} {encoding:<9} {sent:>8} {wire:>9.0f} "
+                  f"{wire / baseline_bytes:>6.2f} {cpu * 1e6:>8.0f} "
+                  f"{(cpu - baseline_cpu) * 1e6:>8.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,231 @@
+#!/usr/bin/env python
+"""
+Test de charge de la passerelle sur des microservices simulés.
+
+Des stubs (``benchmarks/stubs.py``) remplacent les sept services sur les ports
+de ``settings.MICROSERVICES``, avec latence, gigue, taille de réponse et taux
+d'erreurs réglables. Le générateur envoie un mélange de GET réparti sur toutes
+les routes de proxy de ``settings.GATEWAY_ROUTES`` (identifiants tirés parmi
+``--ids``, token pris parmi ``--tokens`` pour les routes protégées) et rapporte
+débit, p50/p95/p99 et erreurs par route, puis pour l'ensemble des routes
+publiques et protégées.
+
+Par défaut, chaque moteur est mesuré dans son sous-processus en appelant
+l'application directement, comme ``proxy_engines.py`` ; avec ``--url``, la
+charge vise une passerelle déjà lancée (runserver, daphne…) dont les services
+pointent sur les ports des stubs, de préférence sans limitation de débit ni
+traçage (``RATE_LIMIT_ENABLED=0 TRACING_ENABLED=0``).
+
+    python benchmarks/load_test.py --requests 5000 --concurrency 100 --latency 0.02 --jitter 0.03
+    python benchmarks/load_test.py --error-rate 0.01 --engine async
+    python benchmarks/load_test.py --url http://localhost:8000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from benchmarks.proxy_engines import call_asgi, call_wsgi, summarize  # noqa: E402
+
+
+def proxy_routes(gateway_routes, only=None):
+    """Routes de proxy : ``(préfixe, protégée)`` pour chaque route avec un service."""
+    routes = [(entry['PREFIX'], entry.get('AUTH') is not None)
+              for entry in gateway_routes if entry.get('SERVICE')]
+    if only:
+        routes = [route for route in routes if route[0] in only]
+    return routes
+
+
+def build_plan(routes, count, ids, tokens, rng):
+    """Requêtes à envoyer, réparties également entre les routes puis mélangées."""
+    plan = []
+    for index in range(count):
+        prefix, protected = routes[index % len(routes)]
+        headers = {'Authorization': f'Bearer bench-{rng.randrange(tokens)}'} if protected else {}
+        plan.append((prefix, protected, f'{prefix}{rng.randrange(ids)}/', headers))
+    rng.shuffle(plan)
+    return plan
+
+
+def run_sync(plan, concurrency):
+    from django.core.handlers.wsgi import WSGIHandler
+
+    handler = WSGIHandler()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        start = time.perf_counter()
+        results = list(pool.map(lambda item: call_wsgi(handler, item[2], item[3]), plan))
+        elapsed = time.perf_counter() - start
+    return results, elapsed
+
+
+def run_async(plan, concurrency):
+    from django.core.handlers.asgi import ASGIHandler
+
+    handler = ASGIHandler()
+
+    async def one(semaphore, item):
+        async with semaphore:
+            return await call_asgi(handler, item[2], item[3])
+
+    async def main():
+        semaphore = asyncio.Semaphore(concurrency)
+        start = time.perf_counter()
+        results = await asyncio.gather(*(one(semaphore, item) for item in plan))
+        return results, time.perf_counter() - start
+
+    return asyncio.run(main())
+
+
+def run_http(plan, concurrency, url):
+    import aiohttp
+
+    async def one(session, semaphore, item):
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                async with session.get(url.rstrip('/') + item[2], headers=item[3]) as response:
+                    await response.read()
+                    status = response.status
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                status = 0
+            return time.perf_counter() - start, status
+
+    async def main():
+        semaphore = asyncio.Semaphore(concurrency)
+        connector = aiohttp.TCPConnector(limit=concurrency)
+        # Corps compressés lus tels quels, comme les recevrait un client
+        async with aiohttp.ClientSession(connector=connector, auto_decompress=False) as session:
+            start = time.perf_counter()
+            results = await asyncio.gather(*(one(session, semaphore, item) for item in plan))
+            return results, time.perf_counter() - start
+
+    return asyncio.run(main())
+
+
+def report(plan, results, elapsed):
+    """Statistiques par route, par type de route et globales."""
+    groups = defaultdict(lambda: ([], [0]))
+    for (prefix, protected, _, _), (latency, status) in zip(plan, results):
+        for key in (('route', prefix), ('auth', 'protected' if protected else 'public'),
+                    ('total', 'all')):
+            latencies, errors = groups[key]
+            latencies.append(latency)
+            # Statut 0 : la requête n'a pas abouti (mode --url)
+            if status >= 400 or status == 0:
+                errors[0] += 1
+    return [(scope, name, summarize(latencies, errors[0], elapsed))
+            for (scope, name), (latencies, errors) in groups.items()]
+
+
+def configure(args):
+    os.environ['DJANGO_SETTINGS_MODULE'] = 'gateway.settings'
+    os.environ['GATEWAY_ASYNC_PROXY'] = '1' if args.engine == 'async' else '0'
+    from django.conf import settings
+    if not args.url:
+        import django
+        django.setup()
+        # Tout le trafic vient d'une seule adresse : la limitation de débit fausserait la mesure
+        settings.RATE_LIMITS['ENABLED'] = False
+        if args.no_cache:
+            settings.RESPONSE_CACHE['ENABLED'] = False
+        # Les spans de milliers de requêtes noieraient le collecteur commun
+        settings.TRACING['ENABLED'] = args.tracing
+    from benchmarks.stubs import start_stubs
+    start_stubs(settings.MICROSERVICES, latency=args.latency, jitter=args.jitter,
+                payload_size=args.payload, error_rate=args.error_rate)
+    return settings
+
+
+def measure(args):
+    settings = configure(args)
+    routes = proxy_routes(settings.GATEWAY_ROUTES, args.route)
+    if not routes:
+        sys.exit("Aucune route de proxy à mesurer")
+    rng = random.Random(args.seed)
+    if args.url:
+        runner = lambda plan: run_http(plan, args.concurrency, args.url)  # noqa: E731
+    elif args.engine == 'async':
+        runner = lambda plan: run_async(plan, args.concurrency)  # noqa: E731
+    else:
+        runner = lambda plan: run_sync(plan, args.concurrency)  # noqa: E731
+
+    # Échauffement : connexions amont, tokens et caches des premières requêtes
+    runner(build_plan(routes, min(len(routes) * 5, args.requests), args.ids, args.tokens, rng))
+    plan = build_plan(routes, args.requests, args.ids, args.tokens, rng)
+    results, elapsed = runner(plan)
+    return report(plan, results, elapsed)
+
+
+def print_table(rows):
+    print(f"{'engine':<7} {'scope':<6} {'route':<26} {'requests':>8} {'req/s':>9} {'p50 ms':>8} "
+          f"{'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    order = {'route': 0, 'auth': 1, 'total': 2}
+    for engine, scope, name, stats in sorted(rows, key=lambda row: (row[0], order[row[1]], row[2])):
+        print(f"{engine:<7} {scope:<6} {name:<26} {stats['requests']:>8} {stats['throughput']:>9.1f} "
+              f"{stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f} "
+              f"{stats['errors']:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--latency', type=float, default=0.02, help='latence amont en secondes')
+    parser.add_argument('--jitter', type=float, default=0.0,
+                        help='gigue amont maximale en secondes, ajoutée à la latence')
+    parser.add_argument('--payload', type=int, default=2048, help='taille de la réponse amont')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='part des réponses amont en erreur 500')
+    parser.add_argument('--ids', type=int, default=100, help='identifiants distincts par route')
+    parser.add_argument('--tokens', type=int, default=50, help='tokens distincts des routes protégées')
+    parser.add_argument('--route', action='append', metavar='PREFIX',
+                        help='préfixe à mesurer (répétable ; toutes les routes de proxy par défaut)')
+    parser.add_argument('--no-cache', action='store_true', help='désactive le cache de réponses')
+    parser.add_argument('--tracing', action='store_true', help='garde le traçage des requêtes')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--engine', choices=['sync', 'async', 'both'], default='both')
+    parser.add_argument('--url', help='passerelle déjà lancée à charger, au lieu de l’appel direct')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        return print(json.dumps(measure(args)))
+    if args.url:
+        # Serveur déjà lancé : les stubs vivent dans ce processus le temps de la mesure
+        return print_table([('http', *row) for row in measure(args)])
+
+    engines = ['sync', 'async'] if args.engine == 'both' else [args.engine]
+    options = ['--requests', args.requests, '--concurrency', args.concurrency,
+               '--latency', args.latency, '--jitter', args.jitter, '--payload', args.payload,
+               '--error-rate', args.error_rate, '--ids', args.ids, '--tokens', args.tokens,
+               '--seed', args.seed]
+    for prefix in args.route or []:
+        options += ['--route', prefix]
+    if args.no_cache:
+        options.append('--no-cache')
+    if args.tracing:
+        options.append('--tracing')
+    rows = []
+    for engine in engines:
+        output = subprocess.run(
+            [sys.executable, __file__, '--worker', '--engine', engine, *map(str, options)],
+            check=True, capture_output=True, text=True, cwd=BASE_DIR,
+        ).stdout.strip().splitlines()[-1]
+        rows.extend((engine, *row) for row in json.loads(output))
+    print_table(rows)
+
+
+if __name__ == '__main__':
+    main()
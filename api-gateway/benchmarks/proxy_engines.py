@@ -0,0 +1,230 @@
+#!/usr/bin/env python
+"""
+Compare le moteur de proxy synchrone (WSGI) et le moteur asynchrone (ASGI).
+
+Des stubs asyncio remplacent les microservices sur les ports de
+``settings.MICROSERVICES`` ; chaque moteur est mesuré dans un sous-processus
+distinct, l'application étant appelée directement (sans serveur HTTP) :
+un pool de threads de la taille de la concurrence pour le ``WSGIHandler``,
+autant de tâches asyncio pour l'``ASGIHandler``.
+
+Les middlewares Django basés sur ``MiddlewareMixin`` (sessions, CSRF, messages…)
+s'exécutent dans un thread à chaque requête sous ASGI ; ``--middleware``
+permet de mesurer aussi la seule chaîne de la passerelle (CORS, auth, routage).
+
+    python benchmarks/proxy_engines.py --requests 2000 --concurrency 200 --latency 0.05
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+GATEWAY_MIDDLEWARE = [
+    'gateway.middleware.compression.CompressionMiddleware',
+    'corsheaders.middleware.CorsMiddleware',
+    'gateway.middleware.routing.RoutingMiddleware',
+    'gateway.middleware.auth.AuthMiddleware',
+    'gateway.middleware.rate_limit.RateLimitMiddleware',
+]
+
+PATHS = {
+    'public': '/api/products/',
+    'protected': '/api/orders/',
+}
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(latencies, errors, elapsed):
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'mean_ms': statistics.fmean(latencies) * 1000,
+    }
+
+
+def wsgi_environ(path, headers):
+    environ = {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'QUERY_STRING': '',
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'REMOTE_ADDR': '127.0.0.1',
+        'wsgi.input': io.BytesIO(),
+        'wsgi.url_scheme': 'http',
+    }
+    for key, value in headers.items():
+        environ['HTTP_' + key.upper().replace('-', '_')] = value
+    return environ
+
+
+def asgi_scope(path, headers):
+    return {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': b'',
+        'root_path': '',
+        'headers': [(b'host', b'localhost')] + [
+            (key.lower().encode(), value.encode()) for key, value in headers.items()
+        ],
+        'client': ('127.0.0.1', 50000),
+        'server': ('localhost', 80),
+    }
+
+
+def call_wsgi(handler, path, headers):
+    """Une requête GET sur le ``WSGIHandler`` ; retourne ``(durée, statut)``."""
+    status = []
+    start = time.perf_counter()
+    body = handler(wsgi_environ(path, headers), lambda code, _headers: status.append(code))
+    for _ in body:
+        pass
+    body.close()
+    return time.perf_counter() - start, int(status[0].split()[0])
+
+
+async def call_asgi(handler, path, headers):
+    """Une requête GET sur l'``ASGIHandler`` ; retourne ``(durée, statut)``."""
+    status = []
+    done = asyncio.Event()
+    disconnected = asyncio.Event()
+    messages = iter([{'type': 'http.request', 'body': b'', 'more_body': False}])
+
+    async def receive():
+        message = next(messages, None)
+        if message is None:
+            await disconnected.wait()
+            return {'type': 'http.disconnect'}
+        return message
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+        elif not message.get('more_body'):
+            done.set()
+
+    start = time.perf_counter()
+    await handler(asgi_scope(path, headers), receive, send)
+    await done.wait()
+    elapsed = time.perf_counter() - start
+    disconnected.set()
+    return elapsed, status[0]
+
+
+def run_sync(args, path, headers):
+    from django.core.handlers.wsgi import WSGIHandler
+
+    handler = WSGIHandler()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        start = time.perf_counter()
+        results = list(pool.map(lambda _: call_wsgi(handler, path, headers), range(args.requests)))
+        elapsed = time.perf_counter() - start
+    return results, elapsed
+
+
+def run_async(args, path, headers):
+    from django.core.handlers.asgi import ASGIHandler
+
+    handler = ASGIHandler()
+
+    async def one(semaphore):
+        async with semaphore:
+            return await call_asgi(handler, path, headers)
+
+    async def main():
+        semaphore = asyncio.Semaphore(args.concurrency)
+        start = time.perf_counter()
+        results = await asyncio.gather(*(one(semaphore) for _ in range(args.requests)))
+        return results, time.perf_counter() - start
+
+    return asyncio.run(main())
+
+
+def worker(args):
+    os.environ['DJANGO_SETTINGS_MODULE'] = 'gateway.settings'
+    os.environ['GATEWAY_ASYNC_PROXY'] = '1' if args.engine == 'async' else '0'
+    import django
+    from django.conf import settings
+    django.setup()
+    if args.middleware == 'gateway':
+        # Sans les middlewares Django synchrones qui imposent un saut de thread en ASGI
+        settings.MIDDLEWARE = [m for m in settings.MIDDLEWARE if m in GATEWAY_MIDDLEWARE]
+    # Tout le trafic vient d'une seule adresse : la limitation de débit fausserait la mesure
+    settings.RATE_LIMITS['ENABLED'] = False
+    from benchmarks.stubs import start_stubs
+    start_stubs(settings.MICROSERVICES, latency=args.latency, payload_size=args.payload)
+    runner = run_async if args.engine == 'async' else run_sync
+
+    report = {}
+    for label, path in PATHS.items():
+        headers = {'Authorization': 'Bearer bench'} if label == 'protected' else {}
+        runner(argparse.Namespace(**dict(vars(args), requests=min(50, args.requests))), path, headers)
+        results, elapsed = runner(args, path, headers)
+        latencies = [latency for latency, _ in results]
+        errors = sum(1 for _, code in results if code >= 400)
+        report[label] = summarize(latencies, errors, elapsed)
+    print(json.dumps(report))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--latency', type=float, default=0.05, help='latence amont en secondes')
+    parser.add_argument('--payload', type=int, default=2048, help='taille de la réponse amont')
+    parser.add_argument('--middleware', choices=['settings', 'gateway', 'both'], default='both',
+                        help="chaîne complète de settings.MIDDLEWARE, ou seulement celle de la passerelle")
+    parser.add_argument('--engine', choices=['sync', 'async'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.engine:
+        return worker(args)
+
+    profiles = ['settings', 'gateway'] if args.middleware == 'both' else [args.middleware]
+    rows = []
+    for profile in profiles:
+        for engine in ('sync', 'async'):
+            output = subprocess.run(
+                [sys.executable, __file__, '--engine', engine, '--middleware', profile,
+                 '--requests', str(args.requests), '--concurrency', str(args.concurrency),
+                 '--latency', str(args.latency), '--payload', str(args.payload)],
+                check=True, capture_output=True, text=True, cwd=BASE_DIR,
+            ).stdout.strip().splitlines()[-1]
+            for label, stats in json.loads(output).items():
+                rows.append((profile, engine, label, stats))
+
+    print(f"{'middleware':<11} {'engine':<7} {'path':<10} {'req/s':>9} {'p50 ms':>8} "
+          f"{'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for profile, engine, label, stats in rows:
+        print(f"{profile:<11} {engine:<7} {label:<10} {stats['throughput']:>9.1f} {stats['p50_ms']:>8.1f} "
+              f"{stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f} {stats['errors']:>7}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+"""
+Micro-benchmark de la résolution de route de la passerelle.
+
+Compare, pour des tables de plusieurs milliers de routes, l'arbre de préfixes
+de ``gateway.routes`` au parcours linéaire de préfixes (``str.startswith``)
+qu'utilisait l'``AuthMiddleware``. Les chemins résolus sont tirés au hasard
+parmi les routes, avec des segments supplémentaires et une part d'inconnus.
+
+    python benchmarks/route_resolution.py --routes 100 1000 10000 --lookups 200000
+"""
+
+import argparse
+import random
+import string
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+
+def _segment(rng):
+    return ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10)))
+
+
+def build_prefixes(count, rng):
+    prefixes = {'/'}
+    services = [f'/api/{_segment(rng)}' for _ in range(max(1, count // 50))]
+    while len(prefixes) < count:
+        prefix = rng.choice(services) + ''.join(
+            f'/{_segment(rng)}' for _ in range(rng.randint(0, 3))
+        )
+        prefixes.add(prefix + '/')
+    return sorted(prefixes)
+
+
+def build_paths(prefixes, count, rng):
+    paths = []
+    for _ in range(count):
+        if rng.random() < 0.1:
+            paths.append(f'/unknown/{_segment(rng)}/')
+        else:
+            paths.append(rng.choice(prefixes) + f'{rng.randint(1, 99999)}/')
+    return paths
+
+
+class LinearTable:
+    """Référence : premier plus long préfixe trouvé par balayage."""
+
+    def __init__(self, routes):
+        self.routes = sorted(routes, key=lambda route: len(route.prefix), reverse=True)
+
+    def resolve(self, path):
+        for route in self.routes:
+            if path.startswith(route.prefix):
+                return route
+        return None
+
+
+def measure(table, paths):
+    start = time.perf_counter()
+    for path in paths:
+        table.resolve(path)
+    return (time.perf_counter() - start) / len(paths)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--routes', type=int, nargs='+', default=[100, 1000, 5000, 10000])
+    parser.add_argument('--lookups', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    from gateway.routes import Route, RouteTable
+
+    print(f"{'routes':>8} {'compile ms':>11} {'trie ns':>9} {'linear ns':>10} {'speedup':>8}")
+    for count in args.routes:
+        rng = random.Random(args.seed)
+        prefixes = build_prefixes(count, rng)
+        routes = [Route(prefix, service='bench', auth='auth') for prefix in prefixes]
+        paths = build_paths(prefixes, args.lookups, rng)
+
+        start = time.perf_counter()
+        trie = RouteTable(routes)
+        compile_ms = (time.perf_counter() - start) * 1000
+        linear = LinearTable(routes)
+
+        # Les deux tables doivent s'accorder avant d'être comparées
+        for path in paths[:1000]:
+            assert trie.resolve(path) is linear.resolve(path), path
+
+        trie_ns = measure(trie, paths) * 1e9
+        linear_ns = measure(linear, paths[:max(1000, args.lookups // max(1, count // 100))]) * 1e9
+        print(f"{count:>8} {compile_ms:>11.1f} {trie_ns:>9.0f} {linear_ns:>10.0f} "
+              f"{linear_ns / trie_ns:>7.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+"""
+Compare le profil sans état de la passerelle (``GATEWAY_STATELESS=1``) à la
+configuration par défaut : temps de démarrage et surcoût par requête.
+
+Le démarrage est mesuré dans des processus neufs : import de Django,
+``django.setup()``, construction du handler (chaîne de middlewares) et
+chargement des URL. Le surcoût par requête est mesuré requête après requête,
+sans concurrence, contre des stubs amont sans latence (``benchmarks/stubs.py``) :
+ce qui reste est le temps passé dans la passerelle. Les connexions à la base
+ouvertes pendant la mesure sont comptées.
+
+    python benchmarks/stateless_profile.py --starts 10 --requests 2000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+PROFILES = {'default': '0', 'stateless': '1'}
+
+PATHS = {
+    'public': '/api/products/',
+    'protected': '/api/orders/',
+}
+
+STARTUP = """
+import time
+started = time.perf_counter()
+import django
+from django.conf import settings
+django.setup()
+from django.core.handlers.{module} import {handler}
+from django.urls import get_resolver
+{handler}()
+get_resolver().url_patterns
+print(time.perf_counter() - started, len(settings.INSTALLED_APPS), len(settings.MIDDLEWARE))
+"""
+
+
+def _environ(profile, engine):
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE='gateway.settings',
+               GATEWAY_STATELESS=PROFILES[profile],
+               GATEWAY_ASYNC_PROXY='1' if engine == 'async' else '0')
+    # Les spans de la mesure n'ont pas leur place dans le collecteur commun
+    env.setdefault('TRACING_ENABLED', '0')
+    return env
+
+
+def measure_startup(profile, engine, starts):
+    module, handler = ('asgi', 'ASGIHandler') if engine == 'async' else ('wsgi', 'WSGIHandler')
+    code = STARTUP.format(module=module, handler=handler)
+    setup, wall = [], []
+    for _ in range(starts):
+        started = time.perf_counter()
+        output = subprocess.run([sys.executable, '-c', code], check=True, capture_output=True,
+                                text=True, cwd=BASE_DIR, env=_environ(profile, engine)).stdout
+        wall.append(time.perf_counter() - started)
+        elapsed, apps, middleware = output.split()
+        setup.append(float(elapsed))
+    return {
+        'setup_ms': statistics.median(setup) * 1000,
+        'process_ms': statistics.median(wall) * 1000,
+        'apps': int(apps),
+        'middleware': int(middleware),
+    }
+
+
+def worker(args):
+    import django
+    from django.conf import settings
+    from django.db.backends.signals import connection_created
+    django.setup()
+    # Tout le trafic vient d'une seule adresse : la limitation de débit fausserait la mesure
+    settings.RATE_LIMITS['ENABLED'] = False
+    # Sans cache, chaque requête traverse toute la chaîne jusqu'au stub
+    settings.RESPONSE_CACHE['ENABLED'] = False
+    from benchmarks.proxy_engines import call_asgi, call_wsgi
+    from benchmarks.stubs import start_stubs
+    start_stubs(settings.MICROSERVICES, latency=0, payload_size=args.payload)
+
+    if args.engine == 'async':
+        from django.core.handlers.asgi import ASGIHandler
+        handler = ASGIHandler()
+
+        def run(path, headers, count):
+            async def main():
+                return [await call_asgi(handler, path, headers) for _ in range(count)]
+            return asyncio.run(main())
+    else:
+        from django.core.handlers.wsgi import WSGIHandler
+        handler = WSGIHandler()
+
+        def run(path, headers, count):
+            return [call_wsgi(handler, path, headers) for _ in range(count)]
+
+    report = {}
+    for label, path in PATHS.items():
+        headers = {'Authorization': 'Bearer bench'} if label == 'protected' else {}
+        run(path, headers, min(200, args.requests))
+        # Connexions ouvertes, quel que soit le thread (sync_to_async des middlewares en ASGI)
+        opened = []
+        receiver = lambda sender, connection, **kwargs: opened.append(connection.alias)  # noqa: E731
+        connection_created.connect(receiver)
+        try:
+            results = run(path, headers, args.requests)
+        finally:
+            connection_created.disconnect(receiver)
+        latencies = sorted(latency for latency, _ in results)
+        report[label] = {
+            'mean_us': statistics.fmean(latencies) * 1e6,
+            'p50_us': latencies[len(latencies) // 2] * 1e6,
+            'p99_us': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1e6,
+            'errors': sum(1 for _, code in results if code >= 400),
+            'db_connections': len(opened),
+        }
+    print(json.dumps(report))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--starts', type=int, default=10, help='démarrages mesurés par profil')
+    parser.add_argument('--requests', type=int, default=2000, help='requêtes mesurées par chemin')
+    parser.add_argument('--payload', type=int, default=2048, help='taille de la réponse amont')
+    parser.add_argument('--engine', choices=['sync', 'async'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.engine:
+        return worker(args)
+
+    print(f"{'profile':<10} {'engine':<7} {'apps':>5} {'mw':>4} {'setup ms':>9} {'process ms':>11}")
+    for profile in PROFILES:
+        for engine in ('sync', 'async'):
+            stats = measure_startup(profile, engine, args.starts)
+            print(f"{profile:<10} {engine:<7} {stats['apps']:>5} {stats['middleware']:>4} "
+                  f"{stats['setup_ms']:>9.1f} {stats['process_ms']:>11.1f}")
+
+    rows = []
+    for profile in PROFILES:
+        for engine in ('sync', 'async'):
+            output = subprocess.run(
+                [sys.executable, __file__, '--engine', engine, '--requests', str(args.requests),
+                 '--payload', str(args.payload)],
+                check=True, capture_output=True, text=True, cwd=BASE_DIR,
+                env=_environ(profile, engine),
+            ).stdout.strip().splitlines()[-1]
+            for label, stats in json.loads(output).items():
+                rows.append((profile, engine, label, stats))
+
+    baseline = {(engine, label): stats['mean_us'] for profile, engine, label, stats in rows
+                if profile == 'default'}
+    print()
+    print(f"{'profile':<10} {'engine':<7} {'path':<10} {'mean µs':>9} {'p50 µs':>9} {'p99 µs':>9} "
+          f"{'vs default':>11} {'db conn':>8} {'errors':>7}")
+    for profile, engine, label, stats in rows:
+        change = stats['mean_us'] / baseline[(engine, label)] - 1
+        print(f"{profile:<10} {engine:<7} {label:<10} {stats['mean_us']:>9.0f} {stats['p50_us']:>9.0f} "
+              f"{stats['p99_us']:>9.0f} {change:>+11.1%} {stats['db_connections']:>8} {stats['errors']:>7}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""
+Faux microservices HTTP/1.1 pour les benchmarks de la passerelle.
+
+Chaque ``StubUpstream`` écoute sur un port (typiquement ceux de
+``settings.MICROSERVICES``) dans sa propre boucle asyncio, conserve les
+connexions keep-alive et répond avec une latence (plus une gigue aléatoire),
+une taille de charge et un taux d'erreurs 500 configurables. Les chemins
+``.../verify-token/`` acceptent tout token différent de ``invalid``, sans
+erreur injectée, pour que les routes protégées soient mesurables.
+"""
+
+import asyncio
+import json
+import random
+import threading
+
+
+class StubUpstream:
+    def __init__(self, port, latency=0.0, payload_size=256, host='127.0.0.1',
+                 jitter=0.0, error_rate=0.0, seed=None):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.payload = self._build_payload(payload_size)
+        self.requests_served = 0
+        self.errors_served = 0
+        self._random = random.Random(seed)
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._ready = threading.Event()
+
+    @staticmethod
+    def _build_payload(size):
+        item = {'id': 0, 'name': 'Produit', 'price': '19.99'}
+        items = []
+        while len(json.dumps(items)) < size:
+            items.append(dict(item, id=len(items)))
+        return json.dumps(items).encode()
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                head = await reader.readuntil(b'\r\n\r\n')
+                lines = head.decode('latin-1').split('\r\n')
+                method, path, _ = lines[0].split(' ', 2)
+                headers = {}
+                for line in lines[1:]:
+                    if ':' in line:
+                        key, value = line.split(':', 1)
+                        headers[key.strip().lower()] = value.strip()
+                length = int(headers.get('content-length') or 0)
+                body = await reader.readexactly(length) if length else b''
+
+                status, payload = self._respond(method, path, body)
+                delay = self.latency + self._random.uniform(0, self.jitter)
+                if delay:
+                    await asyncio.sleep(delay)
+
+                writer.write(
+                    f'HTTP/1.1 {status}\r\n'
+                    'Content-Type: application/json\r\n'
+                    f'Content-Length: {len(payload)}\r\n'
+                    '\r\n'.encode() + payload
+                )
+                await writer.drain()
+                self.requests_served += 1
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def _respond(self, method, path, body):
+        if path.rstrip('/').endswith('verify-token'):
+            token = json.loads(body or b'{}').get('token')
+            if token == 'invalid':
+                return '401 Unauthorized', b'{"valid": false}'
+            return '200 OK', json.dumps({'valid': True, 'user': {'id': 1}}).encode()
+        if self.error_rate and self._random.random() < self.error_rate:
+            self.errors_served += 1
+            return '500 Internal Server Error', b'{"error": "injected"}'
+        return '200 OK', self.payload
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._server = self._loop.run_until_complete(
+            asyncio.start_server(self._handle, self.host, self.port, backlog=4096)
+        )
+        self._ready.set()
+        self._loop.run_forever()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def stop(self):
+        if self._loop:
+            self._loop.call_soon_threadsafe(self._server.close)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+
+
+def start_stubs(microservices, **options):
+    """Démarre un stub par instance des services de ``settings.MICROSERVICES``."""
+    stubs = []
+    for urls in microservices.values():
+        for url in [urls] if isinstance(urls, str) else urls:
+            port = int(url.rsplit(':', 1)[1].split('/')[0])
+            stubs.append(StubUpstream(port, **options).start())
+    return stubs
@@ -12,5 +12,24 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'gateway.settings')
+# Servie par un serveur ASGI, la passerelle utilise le moteur de proxy asynchrone
+os.environ.setdefault('GATEWAY_ASYNC_PROXY', '1')
 
-application = get_asgi_application()
\ No newline at end of file
+django_application = get_asgi_application()
+
+# Importés une fois Django initialisé
+from channels.routing import ProtocolTypeRouter, URLRouter  # noqa: E402
+from django.urls import re_path  # noqa: E402
+
+from gateway.push import EventStream, PushConsumer  # noqa: E402
+
+# Push temps réel (voir gateway/push.py) ; tout le reste passe par Django
+application = ProtocolTypeRouter({
+    'http': URLRouter([
+        re_path(r'^api/events/stream/?$', EventStream()),
+        re_path(r'', django_application),
+    ]),
+    'websocket': URLRouter([
+        re_path(r'^ws/events/?$', PushConsumer.as_asgi()),
+    ]),
+})
@@ -0,0 +1,94 @@
+"""
+Vérification des tokens de la passerelle, partagée par l'``AuthMiddleware``
+et les sous-requêtes de ``/api/batch``.
+
+Un token signé est vérifié localement (``gateway.signed_tokens``) ; un token
+opaque est d'abord cherché dans le cache (``gateway.token_cache``) puis
+vérifié auprès du service d'authentification de la route.
+"""
+
+import asyncio
+import threading
+
+import aiohttp
+import requests
+from django.conf import settings
+from rest_framework import status
+
+from .signed_tokens import get_verifier, is_signed_token
+from .token_cache import INVALID, get_token_cache
+from .upstream import get_async_client, get_client
+
+# Marqueur d'un service d'authentification injoignable
+UNAVAILABLE = object()
+
+
+class TokenAuthenticator:
+    def __init__(self, token_cache, signed_tokens):
+        self.token_cache = token_cache
+        self.signed_tokens = signed_tokens
+
+    def _known(self, service, token):
+        # Token signé : signature, expiration et liste de révocation, sans appel réseau
+        if self.signed_tokens is not None and is_signed_token(token):
+            claims = self.signed_tokens.verify(token, service)
+            return (claims.get('user') or {}) if claims else INVALID
+        return self.token_cache.get(service, token)
+
+    def _remember(self, service, token, status_code, payload):
+        if status_code == 200:
+            user_data = payload.get('user') or {}
+            self.token_cache.set_valid(service, token, user_data)
+            return user_data
+        if status_code in (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN):
+            self.token_cache.set_invalid(service, token)
+        return INVALID
+
+    def identify(self, service, token):
+        """Retourne l'identité du token, ``INVALID`` ou ``UNAVAILABLE``."""
+        identity = self._known(service, token)
+        if identity is not None:
+            return identity
+        try:
+            # Valider le token auprès du service d'authentification
+            response = get_client(service).send(
+                'POST', settings.TOKEN_VERIFY_URLS[service], json={'token': token}
+            )
+            payload = response.json() if response.status_code == 200 else None
+        except requests.exceptions.RequestException:
+            return UNAVAILABLE
+        return self._remember(service, token, response.status_code, payload)
+
+    async def aidentify(self, service, token):
+        """Variante asynchrone de ``identify``."""
+        identity = self._known(service, token)
+        if identity is not None:
+            return identity
+        try:
+            async with get_async_client(service).send(
+                'POST', settings.TOKEN_VERIFY_URLS[service], json={'token': token}
+            ) as response:
+                payload = await response.json() if response.status == 200 else None
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            return UNAVAILABLE
+        return self._remember(service, token, response.status, payload)
+
+    def forget(self, token):
+        """Le token révoqué en amont ne doit plus être accepté par ce processus."""
+        self.token_cache.invalidate(token)
+        if self.signed_tokens is not None and is_signed_token(token):
+            self.signed_tokens.revoke(token)
+
+
+_authenticator = None
+_authenticator_lock = threading.Lock()
+
+
+def get_authenticator():
+    """Retourne le vérificateur de tokens partagé du processus."""
+    global _authenticator
+    if _authenticator is None:
+        with _authenticator_lock:
+            if _authenticator is None:
+                _authenticator = TokenAuthenticator(get_token_cache(), get_verifier())
+    return _authenticator
@@ -0,0 +1,232 @@
+"""
+Répartition de charge entre les instances d'un microservice.
+
+Une entrée de ``settings.MICROSERVICES`` peut être une URL ou une liste
+d'URL. Pour chaque appel, le répartiteur du service choisit une instance
+parmi celles en bonne santé :
+
+- ``round_robin`` : à tour de rôle ;
+- ``least_outstanding`` : celle qui a le moins de requêtes en vol ;
+- ``power_of_two`` : la moins chargée de deux instances tirées au hasard.
+
+Un répartiteur maison peut être désigné par son chemin d'import ; il expose
+``choose(instances)``. Un thread de fond interroge régulièrement chaque
+instance (``HEALTH_CHECK_PATH``) : toute réponse HTTP inférieure à 500 compte
+comme un succès. Une instance est retirée après ``UNHEALTHY_THRESHOLD`` échecs
+consécutifs et réintégrée après ``HEALTHY_THRESHOLD`` succès ; un refus de
+connexion constaté par le proxy compte aussi comme un échec. Si aucune
+instance n'est saine, toutes restent éligibles plutôt que de tout refuser.
+"""
+
+import itertools
+import logging
+import random
+import threading
+
+import requests
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BALANCING_SETTINGS = {
+    'BALANCER': 'round_robin',
+    'HEALTH_CHECK_PATH': '/',
+    'HEALTH_CHECK_INTERVAL': 5,   # secondes entre deux vérifications
+    'HEALTH_CHECK_TIMEOUT': 1,
+    'UNHEALTHY_THRESHOLD': 2,
+    'HEALTHY_THRESHOLD': 2,
+}
+
+
+def get_balancing_settings(service):
+    """Retourne la configuration de répartition d'un service."""
+    config = getattr(settings, 'LOAD_BALANCING', {})
+    merged = dict(DEFAULT_BALANCING_SETTINGS)
+    merged.update({key: value for key, value in config.items() if key != 'SERVICES'})
+    merged.update(config.get('SERVICES', {}).get(service, {}))
+    return merged
+
+
+def get_instance_urls(service):
+    """URL des instances d'un service de ``settings.MICROSERVICES``."""
+    urls = settings.MICROSERVICES[service]
+    if isinstance(urls, str):
+        urls = [urls]
+    return [url.rstrip('/') for url in urls]
+
+
+class Instance:
+    def __init__(self, url):
+        self.url = url
+        self.outstanding = 0
+        self.healthy = True
+        self.failures = 0
+        self.successes = 0
+
+
+class RoundRobinBalancer:
+    def __init__(self):
+        self._counter = itertools.count()
+
+    def choose(self, instances):
+        return instances[next(self._counter) % len(instances)]
+
+
+class LeastOutstandingBalancer:
+    def choose(self, instances):
+        return min(instances, key=lambda instance: instance.outstanding)
+
+
+class PowerOfTwoBalancer:
+    def choose(self, instances):
+        if len(instances) == 1:
+            return instances[0]
+        first, second = random.sample(instances, 2)
+        return first if first.outstanding <= second.outstanding else second
+
+
+BALANCERS = {
+    'round_robin': RoundRobinBalancer,
+    'least_outstanding': LeastOutstandingBalancer,
+    'power_of_two': PowerOfTwoBalancer,
+}
+
+
+def build_balancer(name):
+    balancer_class = BALANCERS.get(name) or import_string(name)
+    return balancer_class()
+
+
+class InstancePool:
+    """Instances d'un service, leur charge et leur état de santé."""
+
+    def __init__(self, service, urls, balancer, health_check_path, unhealthy_threshold,
+                 healthy_threshold):
+        self.service = service
+        self.instances = [Instance(url) for url in urls]
+        self.balancer = balancer
+        self.health_check_path = health_check_path
+        self.unhealthy_threshold = unhealthy_threshold
+        self.healthy_threshold = healthy_threshold
+        self._lock = threading.Lock()
+
+    def acquire(self, avoid=()):
+        """Choisit une instance et la compte comme occupée jusqu'à ``release``.
+
+        Les instances de ``avoid`` (déjà essayées pour cet appel) ne sont
+        choisies que s'il n'en reste pas d'autre.
+        """
+        with self._lock:
+            if len(self.instances) == 1:
+                instance = self.instances[0]
+            else:
+                candidates = [instance for instance in self.instances if instance.healthy]
+                candidates = candidates or self.instances
+                others = [instance for instance in candidates if instance not in avoid]
+                instance = self.balancer.choose(others or candidates)
+            instance.outstanding += 1
+        return instance
+
+    def release(self, instance):
+        with self._lock:
+            instance.outstanding -= 1
+
+    def record_check(self, instance, ok):
+        with self._lock:
+            if ok:
+                instance.failures = 0
+                instance.successes += 1
+                if not instance.healthy and instance.successes >= self.healthy_threshold:
+                    instance.healthy = True
+                    logger.info("Instance %s of %s is back", instance.url, self.service)
+            else:
+                instance.successes = 0
+                instance.failures += 1
+                if instance.healthy and instance.failures >= self.unhealthy_threshold:
+                    instance.healthy = False
+                    logger.warning("Instance %s of %s removed", instance.url, self.service)
+
+    def stats(self):
+        with self._lock:
+            return [
+                {'url': instance.url, 'healthy': instance.healthy,
+                 'outstanding': instance.outstanding}
+                for instance in self.instances
+            ]
+
+
+class HealthChecker:
+    """Thread de fond qui vérifie les instances des services répartis."""
+
+    def __init__(self, interval, timeout):
+        self.interval = interval
+        self.timeout = timeout
+        self.pools = []
+        self._session = requests.Session()
+        self._session.trust_env = False
+        self._stop = threading.Event()
+        self._thread = None
+
+    def watch(self, pool):
+        self.pools.append(pool)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def check(self, pool, instance):
+        try:
+            response = self._session.get(instance.url + pool.health_check_path,
+                                         timeout=self.timeout)
+            ok = response.status_code < 500
+        except requests.exceptions.RequestException:
+            ok = False
+        pool.record_check(instance, ok)
+
+    def _run(self):
+        while not self._stop.is_set():
+            for pool in list(self.pools):
+                for instance in pool.instances:
+                    self.check(pool, instance)
+            self._stop.wait(self.interval)
+
+    def stop(self):
+        self._stop.set()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+_checker = None
+
+
+def get_instance_pool(service):
+    """Retourne le pool d'instances partagé d'un service."""
+    global _checker
+    pool = _pools.get(service)
+    if pool is not None:
+        return pool
+    with _pools_lock:
+        pool = _pools.get(service)
+        if pool is None:
+            config = get_balancing_settings(service)
+            pool = InstancePool(
+                service=service,
+                urls=get_instance_urls(service),
+                balancer=build_balancer(config['BALANCER']),
+                health_check_path=config['HEALTH_CHECK_PATH'],
+                unhealthy_threshold=config['UNHEALTHY_THRESHOLD'],
+                healthy_threshold=config['HEALTHY_THRESHOLD'],
+            )
+            # Une instance unique reste toujours éligible : inutile de la surveiller
+            if len(pool.instances) > 1:
+                if _checker is None:
+                    defaults = get_balancing_settings(None)
+                    _checker = HealthChecker(defaults['HEALTH_CHECK_INTERVAL'],
+                                             defaults['HEALTH_CHECK_TIMEOUT'])
+                _checker.watch(pool)
+            _pools[service] = pool
+        return pool
+
+
+def pools_stats():
+    return {service: get_instance_pool(service).stats() for service in settings.MICROSERVICES}
@@ -0,0 +1,350 @@
+"""
+Point d'entrée ``/api/batch`` : plusieurs appels de la passerelle en une requête.
+
+Le corps est un objet JSON ``{"requests": [...]}`` dont chaque élément décrit
+une sous-requête : ``method`` (GET par défaut), ``path`` (avec sa query
+string), ``headers`` et ``body`` optionnels. Les sous-requêtes s'exécutent en
+parallèle à travers le même moteur que les appels directs (table de routage,
+cache, regroupement, disjoncteurs, limitation de débit) et les réponses sont
+renvoyées dans l'ordre des demandes : ``{"responses": [{"status", "headers",
+"body"}]}``.
+
+Le token de la requête batch n'est vérifié qu'une fois par service
+d'authentification. Le nombre de sous-requêtes, leur parallélisme, la taille
+du corps et la durée totale sont bornés par ``settings.BATCH`` ; une
+sous-requête qui n'a pas abouti dans le délai reçoit un statut 504.
+"""
+
+import asyncio
+import contextvars
+import io
+import json
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.http import HttpRequest, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+
+from .authentication import UNAVAILABLE, get_authenticator
+from .proxy import ALLOWED_METHODS, async_proxy, sync_proxy
+from .rate_limit import POST_AUTH_SCOPES, PRE_AUTH_SCOPES, get_rate_limiter
+from .routes import get_route_table
+from .token_cache import INVALID
+
+DEFAULT_BATCH_SETTINGS = {
+    'MAX_REQUESTS': 20,
+    'MAX_CONCURRENCY': 10,        # sous-requêtes simultanées d'un même batch
+    'MAX_BODY_BYTES': 256 * 1024,
+    'TIMEOUT': 10,                # secondes pour l'ensemble du batch
+}
+
+# En-têtes de la requête batch transmis à chaque sous-requête
+INHERITED_META = ('REMOTE_ADDR', 'SERVER_NAME', 'SERVER_PORT', 'HTTP_HOST', 'HTTP_AUTHORIZATION')
+
+# En-têtes de sous-réponse recopiés dans le résultat
+RESULT_HEADERS = ('Content-Type', 'ETag', 'Cache-Control', 'Location', 'Retry-After', 'Link',
+                  'X-Cache')
+
+
+class BatchError(Exception):
+    pass
+
+
+def get_batch_settings():
+    config = dict(DEFAULT_BATCH_SETTINGS)
+    config.update(getattr(settings, 'BATCH', {}))
+    return config
+
+
+def _error(message, status_code):
+    return {'status': status_code, 'headers': {}, 'body': {'error': message}}
+
+
+def parse_batch(request, config):
+    """Valide le corps de la requête batch et retourne la liste des sous-requêtes."""
+    if request.method != 'POST':
+        raise BatchError('Batch requests must use POST')
+    if len(request.body) > config['MAX_BODY_BYTES']:
+        raise BatchError('Batch body too large')
+    try:
+        items = json.loads(request.body)['requests']
+    except (ValueError, KeyError, TypeError):
+        raise BatchError('Expected a JSON object with a "requests" list')
+    if not isinstance(items, list) or not items:
+        raise BatchError('"requests" must be a non-empty list')
+    if len(items) > config['MAX_REQUESTS']:
+        raise BatchError(f'At most {config["MAX_REQUESTS"]} sub-requests per batch')
+    for item in items:
+        if not isinstance(item, dict) or not str(item.get('path', '')).startswith('/'):
+            raise BatchError('Each sub-request needs an absolute "path"')
+    return items
+
+
+def build_subrequest(parent, item):
+    """Construit la requête Django d'une sous-requête."""
+    path, _, query = item['path'].partition('?')
+    body = item.get('body')
+    if body is not None and not isinstance(body, (str, bytes)):
+        body = json.dumps(body)
+    if isinstance(body, str):
+        body = body.encode()
+
+    request = HttpRequest()
+    request.method = str(item.get('method', 'GET')).upper()
+    request.path = request.path_info = path
+    request.META = {key: parent.META[key] for key in INHERITED_META if key in parent.META}
+    request.META['QUERY_STRING'] = query
+    for header, value in (item.get('headers') or {}).items():
+        request.META['HTTP_' + header.upper().replace('-', '_')] = str(value)
+    if body:
+        request.META['CONTENT_TYPE'] = request.META.pop('HTTP_CONTENT_TYPE', 'application/json')
+        request.META['CONTENT_LENGTH'] = str(len(body))
+    request._stream = io.BytesIO(body or b'')
+    request._read_started = False
+    return request
+
+
+def _token(request):
+    parts = request.headers.get('Authorization', '').split(' ')
+    return parts[1] if len(parts) > 1 else None
+
+
+class Batch:
+    """Prépare les sous-requêtes : route, authentification et limitation de débit."""
+
+    def __init__(self, request):
+        self.request = request
+        self.routes = get_route_table()
+        self.authenticator = get_authenticator()
+        self.limiter = get_rate_limiter()
+        self.identities = {}  # (service, token) -> identité, une vérification par service
+
+    def prepare(self, item):
+        """Retourne ``(requête, route)`` ou un résultat d'erreur."""
+        request = build_subrequest(self.request, item)
+        if request.method not in ALLOWED_METHODS:
+            return _error('Method not allowed', status.HTTP_405_METHOD_NOT_ALLOWED)
+        route = self.routes.resolve(request.path)
+        if route is None or route.service is None:
+            return _error(f'No upstream service for {request.path}', status.HTTP_404_NOT_FOUND)
+        request.route = route
+        # ip et route avant toute vérification de token, comme hors batch
+        rejection = self._limit(request, route, PRE_AUTH_SCOPES)
+        if rejection:
+            return rejection
+        return request, route
+
+    def needs_auth(self, request, route):
+        if route.auth is None:
+            return None
+        token = _token(request)
+        if token is None:
+            return _error('No authorization token provided', status.HTTP_401_UNAUTHORIZED)
+        if route.auth not in settings.TOKEN_VERIFY_URLS:
+            return _error('Invalid authentication service for this path',
+                          status.HTTP_400_BAD_REQUEST)
+        return (route.auth, token)
+
+    def admit(self, request, route, identity):
+        """Applique l'identité vérifiée puis la limitation de débit par utilisateur."""
+        if identity is UNAVAILABLE:
+            return _error('Invalid token or authentication service unavailable',
+                          status.HTTP_503_SERVICE_UNAVAILABLE)
+        if identity is INVALID:
+            return _error('Invalid or expired token', status.HTTP_401_UNAUTHORIZED)
+        if identity:
+            request.user_id = identity.get('id')
+        return self._limit(request, route, POST_AUTH_SCOPES)
+
+    def _limit(self, request, route, scopes):
+        if self.limiter is not None:
+            retry_after = self.limiter.check(request, route, scopes)
+            if retry_after:
+                return {'status': status.HTTP_429_TOO_MANY_REQUESTS,
+                        'headers': {'Retry-After': str(retry_after)},
+                        'body': {'error': 'Too many requests'}}
+        return None
+
+
+def _result(response, content):
+    headers = {header: response[header] for header in RESULT_HEADERS if response.has_header(header)}
+    if 'json' in response.get('Content-Type', '') and content:
+        try:
+            body = json.loads(content)
+        except ValueError:
+            body = content.decode(errors='replace')
+    else:
+        body = content.decode(errors='replace')
+    return {'status': response.status_code, 'headers': headers, 'body': body}
+
+
+def _run_sync_one(request, route):
+    response = sync_proxy(request, route)
+    if response.streaming:
+        content = b''.join(response.streaming_content)
+        response.close()
+    else:
+        content = response.content
+    return _result(response, content)
+
+
+async def _run_async_one(request, route):
+    response = await async_proxy(request, route)
+    if response.streaming:
+        content = b''.join([chunk async for chunk in response.streaming_content])
+        response.close()
+    else:
+        content = response.content
+    return _result(response, content)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor(config):
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=config['MAX_CONCURRENCY'] * 4,
+                                               thread_name_prefix='gateway-batch')
+    return _executor
+
+
+def sync_batch(request):
+    config = get_batch_settings()
+    try:
+        items = parse_batch(request, config)
+    except BatchError as e:
+        return JsonResponse({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    batch = Batch(request)
+    results = [None] * len(items)
+    pending = []
+    for index, item in enumerate(items):
+        prepared = batch.prepare(item)
+        if isinstance(prepared, dict):
+            results[index] = prepared
+            continue
+        sub_request, route = prepared
+        needed = batch.needs_auth(sub_request, route)
+        identity = None
+        if isinstance(needed, dict):
+            results[index] = needed
+            continue
+        if needed is not None:
+            if needed not in batch.identities:
+                batch.identities[needed] = batch.authenticator.identify(*needed)
+            identity = batch.identities[needed]
+        rejection = batch.admit(sub_request, route, identity)
+        if rejection:
+            results[index] = rejection
+            continue
+        pending.append((index, sub_request, route))
+
+    executor = _get_executor(config)
+    deadline = time.monotonic() + config['TIMEOUT']
+    queued = iter(pending)
+    running = {}
+
+    def submit_next():
+        entry = next(queued, None)
+        if entry is not None:
+            index, sub_request, route = entry
+            # Chaque sous-requête garde le contexte de la requête batch (trace en cours)
+            future = executor.submit(contextvars.copy_context().run, _run_sync_one, sub_request, route)
+            running[future] = index
+
+    # Au plus MAX_CONCURRENCY sous-requêtes du batch dans le pool partagé : la
+    # suivante n'est soumise qu'à la fin d'une autre, aucun thread n'attend son tour
+    for _ in range(config['MAX_CONCURRENCY']):
+        submit_next()
+    while running:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        done, _ = wait(running, timeout=remaining, return_when=FIRST_COMPLETED)
+        for future in done:
+            index = running.pop(future)
+            try:
+                results[index] = future.result()
+            except Exception:
+                results[index] = _error('Sub-request failed', status.HTTP_502_BAD_GATEWAY)
+            submit_next()
+    # Délai dépassé : les sous-requêtes restantes ne sont jamais soumises, celles
+    # en cours se terminent sans être attendues
+    for index in [*running.values(), *(index for index, _, _ in queued)]:
+        results[index] = _error('Batch deadline exceeded', status.HTTP_504_GATEWAY_TIMEOUT)
+    return JsonResponse({'responses': results})
+
+
+async def async_batch(request):
+    config = get_batch_settings()
+    try:
+        items = parse_batch(request, config)
+    except BatchError as e:
+        return JsonResponse({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    batch = Batch(request)
+    results = [None] * len(items)
+    prepared_items = []
+    for index, item in enumerate(items):
+        prepared = batch.prepare(item)
+        if isinstance(prepared, dict):
+            results[index] = prepared
+            continue
+        sub_request, route = prepared
+        needed = batch.needs_auth(sub_request, route)
+        if isinstance(needed, dict):
+            results[index] = needed
+            continue
+        prepared_items.append((index, sub_request, route, needed))
+
+    # Une seule vérification par (service, token), en parallèle
+    needed_keys = {needed for _, _, _, needed in prepared_items if needed is not None}
+    identities = await asyncio.gather(*(batch.authenticator.aidentify(*key) for key in needed_keys))
+    batch.identities = dict(zip(needed_keys, identities))
+
+    semaphore = asyncio.Semaphore(config['MAX_CONCURRENCY'])
+
+    async def run(sub_request, route):
+        async with semaphore:
+            return await _run_async_one(sub_request, route)
+
+    tasks = {}
+    for index, sub_request, route, needed in prepared_items:
+        rejection = batch.admit(sub_request, route, batch.identities.get(needed))
+        if rejection:
+            results[index] = rejection
+            continue
+        tasks[asyncio.create_task(run(sub_request, route))] = index
+
+    if tasks:
+        done, not_done = await asyncio.wait(tasks, timeout=config['TIMEOUT'])
+        for task in done:
+            try:
+                results[tasks[task]] = task.result()
+            except Exception:
+                results[tasks[task]] = _error('Sub-request failed', status.HTTP_502_BAD_GATEWAY)
+        for task in not_done:
+            task.cancel()
+            results[tasks[task]] = _error('Batch deadline exceeded',
+                                          status.HTTP_504_GATEWAY_TIMEOUT)
+    return JsonResponse({'responses': results})
+
+
+def batch_view():
+    """Construit la vue batch selon le mode du serveur."""
+    if settings.GATEWAY_ASYNC_PROXY:
+        async def view(request):
+            return await async_batch(request)
+    else:
+        def view(request):
+            return sync_batch(request)
+
+    view.__name__ = 'batch'
+    return csrf_exempt(view)
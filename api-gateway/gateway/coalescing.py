@@ -0,0 +1,169 @@
+"""
+Regroupement (« single-flight ») des GET identiques simultanés.
+
+Quand plusieurs requêtes GET identiques (méthode, chemin, paramètres, portée
+d'authentification et encodage accepté) arrivent alors qu'un appel amont est
+déjà en vol, seule la première (le « meneur ») interroge le service ; les
+autres attendent sa réponse, au plus ``MAX_WAIT`` secondes, puis en reçoivent
+une copie. Passé ce délai, ou si la réponse du meneur est diffusée par
+morceaux ou a échoué, chaque requête en attente appelle le service elle-même.
+"""
+
+import asyncio
+import hashlib
+import threading
+
+from django.conf import settings
+from django.http import HttpResponse
+
+DEFAULT_COALESCING_SETTINGS = {
+    'ENABLED': True,
+    'MAX_WAIT': 5,  # secondes d'attente maximale de la réponse du meneur
+}
+
+
+class SharedResponse:
+    """Copie immuable d'une réponse, rejouée pour chaque requête regroupée."""
+
+    def __init__(self, response):
+        self.status = response.status_code
+        self.headers = list(response.items())
+        self.content = response.content
+
+    def to_response(self):
+        response = HttpResponse(self.content, status=self.status)
+        for header, value in self.headers:
+            response[header] = value
+        return response
+
+
+def _share(response):
+    # Une réponse diffusée par morceaux ne peut être lue qu'une fois
+    if response is None or response.streaming:
+        return None
+    return SharedResponse(response)
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+
+
+class SingleFlight:
+    def __init__(self, max_wait):
+        self.max_wait = max_wait
+        self._flights = {}
+        self._async_flights = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            'leaders': 0,
+            'collapsed': 0,   # requêtes servies par l'appel d'un meneur
+            'timeouts': 0,    # attente plafonnée par MAX_WAIT
+            'fallbacks': 0,   # réponse du meneur non partageable
+        }
+
+    @staticmethod
+    def key_for(request):
+        """Clé de regroupement, ou ``None`` si la requête n'est pas regroupable."""
+        if request.method != 'GET':
+            return None
+        authorization = request.headers.get('Authorization', '')
+        # Portée d'authentification : empreinte du token, jamais le token en clair
+        scope = hashlib.sha256(authorization.encode()).hexdigest() if authorization else ''
+        return (
+            request.method,
+            request.get_full_path(),
+            scope,
+            request.headers.get('Accept-Encoding', ''),
+            request.headers.get('If-None-Match', ''),
+            request.headers.get('If-Modified-Since', ''),
+        )
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def run(self, key, fetch):
+        """Exécute ``fetch()`` une seule fois pour toutes les requêtes de clé ``key``."""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self._stats['leaders'] += 1
+
+        if leader:
+            response = None
+            try:
+                response = fetch()
+                return response
+            finally:
+                flight.result = _share(response)
+                with self._lock:
+                    del self._flights[key]
+                flight.done.set()
+
+        if not flight.done.wait(self.max_wait):
+            self._count('timeouts')
+            return fetch()
+        if flight.result is None:
+            self._count('fallbacks')
+            return fetch()
+        self._count('collapsed')
+        return flight.result.to_response()
+
+    async def arun(self, key, fetch):
+        """Variante asynchrone de ``run`` : ``fetch`` est une fonction coroutine."""
+        flight_key = (id(asyncio.get_running_loop()), key)
+        with self._lock:
+            flight = self._async_flights.get(flight_key)
+            leader = flight is None
+            if leader:
+                flight = self._async_flights[flight_key] = asyncio.get_running_loop().create_future()
+                self._stats['leaders'] += 1
+
+        if leader:
+            response = None
+            try:
+                response = await fetch()
+                return response
+            finally:
+                with self._lock:
+                    del self._async_flights[flight_key]
+                flight.set_result(_share(response))
+
+        try:
+            result = await asyncio.wait_for(asyncio.shield(flight), self.max_wait)
+        except asyncio.TimeoutError:
+            self._count('timeouts')
+            return await fetch()
+        if result is None:
+            self._count('fallbacks')
+            return await fetch()
+        self._count('collapsed')
+        return result.to_response()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['in_flight'] = len(self._flights) + len(self._async_flights)
+        return stats
+
+
+_coalescer = None
+_coalescer_lock = threading.Lock()
+
+
+def get_coalescer():
+    """Retourne le regroupeur du processus, ou ``None`` s'il est désactivé."""
+    global _coalescer
+    config = dict(DEFAULT_COALESCING_SETTINGS)
+    config.update(getattr(settings, 'COALESCING', {}))
+    if not config['ENABLED']:
+        return None
+    if _coalescer is None:
+        with _coalescer_lock:
+            if _coalescer is None:
+                _coalescer = SingleFlight(max_wait=config['MAX_WAIT'])
+    return _coalescer
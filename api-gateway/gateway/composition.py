@@ -0,0 +1,228 @@
+"""
+Page produit composée par la passerelle : ``GET /api/product-page/<id>``.
+
+Le produit (product-service), sa disponibilité agrégée sur tous les magasins
+(inventory-service) et la note de son vendeur (seller-service) sont demandés
+en parallèle ; la page arrive en un aller-retour et sa latence est celle de la
+dépendance la plus lente, non la somme des appels.
+
+Chaque dépendance a son propre délai (``TIMEOUT``) et passe par le
+disjoncteur de son service (``gateway.resilience``). Seul le produit est
+indispensable (``REQUIRED``) : si une autre dépendance échoue ou dépasse son
+délai, la page est rendue sans elle, la section vaut ``null`` et le motif est
+indiqué dans ``errors``. Le stock, la note et le nombre d'avis de la fiche
+produit viennent des services qui les détiennent (``null`` quand la
+dépendance correspondante manque), jamais de valeurs fictives.
+"""
+
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from urllib.parse import quote
+
+import aiohttp
+import requests
+from django.conf import settings
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+from rest_framework import status
+
+from .resilience import get_guard
+from .upstream import get_async_client, get_client
+
+DEFAULT_PRODUCT_PAGE_SETTINGS = {
+    'DEPENDENCIES': {
+        'product': {
+            'SERVICE': 'product',
+            'PATH': '/api/products/{id}/',
+            'TIMEOUT': 2,
+            'REQUIRED': True,
+        },
+        'availability': {
+            'SERVICE': 'inventory',
+            'PATH': '/api/inventory/products/{id}/availability/',
+            'TIMEOUT': 1,
+        },
+        'seller': {
+            'SERVICE': 'seller',
+            'PATH': '/api/sellers/products/{id}/rating/',
+            'TIMEOUT': 1,
+        },
+    },
+}
+
+# Motifs d'échec d'une dépendance
+TIMEOUT = 'timeout'
+UNREACHABLE = 'unreachable'
+NOT_FOUND = 'not_found'
+UPSTREAM_ERROR = 'upstream_error'
+
+# Champs de la fiche produit et la dépendance qui les fournit
+PRODUCT_FIELDS = {
+    'stock_quantity': ('availability', 'available'),
+    'rating': ('seller', 'rating'),
+    'review_count': ('seller', 'review_count'),
+}
+
+
+def get_product_page_settings():
+    config = dict(DEFAULT_PRODUCT_PAGE_SETTINGS)
+    config.update(getattr(settings, 'PRODUCT_PAGE', {}))
+    return config
+
+
+class Dependency:
+    def __init__(self, name, service, path, timeout, required=False):
+        self.name = name
+        self.service = service
+        self.path = path
+        self.timeout = timeout
+        self.required = required
+
+    def path_for(self, product_id):
+        return self.path.format(id=quote(str(product_id), safe=''))
+
+    @classmethod
+    def from_setting(cls, name, entry):
+        return cls(name, entry['SERVICE'], entry['PATH'], entry['TIMEOUT'],
+                   entry.get('REQUIRED', False))
+
+
+def _outcome(status_code, payload):
+    """``(données, None)`` pour un succès, sinon ``(None, motif)``."""
+    if status_code == 200:
+        return payload, None
+    if status_code == 404:
+        return None, NOT_FOUND
+    return None, UPSTREAM_ERROR
+
+
+def fetch_sync(dependency, product_id):
+    client = get_client(dependency.service)
+    guard = get_guard(dependency.service)
+    rejection = guard.enter()
+    if rejection:
+        return None, rejection
+
+    started = time.monotonic()
+    try:
+        response = client.request(
+            'GET', dependency.path_for(product_id),
+            headers={'Accept': 'application/json'},
+            timeout=client.timeout_for(dependency.timeout),
+        )
+        payload = response.json() if response.status_code == 200 else None
+    except requests.exceptions.RequestException as e:
+        guard.exit(False, time.monotonic() - started)
+        return None, TIMEOUT if isinstance(e, requests.exceptions.Timeout) else UNREACHABLE
+    except ValueError:
+        guard.exit(True, time.monotonic() - started)
+        return None, UPSTREAM_ERROR
+    guard.exit(response.status_code < 500, time.monotonic() - started)
+    return _outcome(response.status_code, payload)
+
+
+async def fetch_async(dependency, product_id):
+    client = get_async_client(dependency.service)
+    guard = get_guard(dependency.service)
+    rejection = guard.enter()
+    if rejection:
+        return None, rejection
+
+    started = time.monotonic()
+    try:
+        # Délai total de la dépendance, corps compris
+        timeout = aiohttp.ClientTimeout(total=dependency.timeout,
+                                        sock_connect=client.connect_timeout)
+        async with client.request('GET', dependency.path_for(product_id),
+                                  headers={'Accept': 'application/json'},
+                                  timeout=timeout) as response:
+            payload = await response.json() if response.status == 200 else None
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        guard.exit(False, time.monotonic() - started)
+        return None, TIMEOUT if isinstance(e, asyncio.TimeoutError) else UNREACHABLE
+    except ValueError:
+        guard.exit(True, time.monotonic() - started)
+        return None, UPSTREAM_ERROR
+    except BaseException:
+        guard.abandon()
+        raise
+    guard.exit(response.status < 500, time.monotonic() - started)
+    return _outcome(response.status, payload)
+
+
+def compose(dependencies, results):
+    """Assemble la page à partir de ``{nom: (données, motif)}``."""
+    required = next(d for d in dependencies if d.required)
+    product, reason = results[required.name]
+    if product is None:
+        if reason == NOT_FOUND:
+            return JsonResponse({'error': 'Product not found'}, status=status.HTTP_404_NOT_FOUND)
+        code = status.HTTP_504_GATEWAY_TIMEOUT if reason == TIMEOUT else status.HTTP_502_BAD_GATEWAY
+        return JsonResponse({'error': 'Product unavailable', 'reason': reason}, status=code)
+
+    page = {name: data for name, (data, _) in results.items()}
+    for field, (name, key) in PRODUCT_FIELDS.items():
+        section = page.get(name)
+        product[field] = section.get(key) if section else None
+    page['errors'] = {name: reason for name, (_, reason) in results.items() if reason}
+    return JsonResponse(page)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=32,
+                                               thread_name_prefix='gateway-composition')
+    return _executor
+
+
+def sync_product_page(product_id):
+    config = get_product_page_settings()
+    dependencies = [Dependency.from_setting(name, entry)
+                    for name, entry in config['DEPENDENCIES'].items()]
+    executor = _get_executor()
+    started = time.monotonic()
+    futures = {d.name: executor.submit(contextvars.copy_context().run, fetch_sync, d, product_id)
+               for d in dependencies}
+
+    results = {}
+    for dependency in dependencies:
+        # Le délai de lecture de requests porte sur chaque lecture : la
+        # dépendance est abandonnée à son échéance, même si le service répond lentement
+        remaining = max(0, started + dependency.timeout - time.monotonic())
+        try:
+            results[dependency.name] = futures[dependency.name].result(timeout=remaining)
+        except FutureTimeoutError:
+            results[dependency.name] = (None, TIMEOUT)
+    return compose(dependencies, results)
+
+
+async def async_product_page(product_id):
+    config = get_product_page_settings()
+    dependencies = [Dependency.from_setting(name, entry)
+                    for name, entry in config['DEPENDENCIES'].items()]
+    outcomes = await asyncio.gather(*(fetch_async(d, product_id) for d in dependencies))
+    return compose(dependencies, dict(zip((d.name for d in dependencies), outcomes)))
+
+
+def product_page_view():
+    """Construit la vue de la page produit selon le mode du serveur."""
+    if settings.GATEWAY_ASYNC_PROXY:
+        async def view(request, product_id):
+            return await async_product_page(product_id)
+    else:
+        def view(request, product_id):
+            return sync_product_page(product_id)
+
+    view.__name__ = 'product_page'
+    return require_GET(view)
@@ -0,0 +1,133 @@
+"""
+Compression des réponses de la passerelle (gzip, et brotli si disponible).
+
+L'encodage est négocié d'après ``Accept-Encoding`` (valeurs ``q`` comprises) ;
+brotli est préféré à gzip quand le client accepte les deux. Les petites
+réponses (``MIN_SIZE``), les types non compressibles et les réponses déjà
+encodées par le service amont sont relayés tels quels. Les réponses diffusées
+par morceaux sont compressées au fil de l'eau, morceau par morceau.
+
+Le paquet ``brotli`` est optionnel : sans lui, seul gzip est proposé.
+"""
+
+import zlib
+
+from django.conf import settings
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DEFAULT_COMPRESSION_SETTINGS = {
+    'ENABLED': True,
+    'MIN_SIZE': 1024,
+    'GZIP_LEVEL': 6,
+    'BROTLI_QUALITY': 4,   # bon compromis débit / taille pour des réponses dynamiques
+    'CONTENT_TYPES': [
+        'application/json', 'application/javascript', 'application/xml',
+        'text/', 'image/svg+xml',
+    ],
+}
+
+
+def get_compression_settings():
+    config = dict(DEFAULT_COMPRESSION_SETTINGS)
+    config.update(getattr(settings, 'COMPRESSION', {}))
+    return config
+
+
+def parse_accept_encoding(header):
+    """Retourne ``{codage: q}`` pour un en-tête ``Accept-Encoding``."""
+    weights = {}
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[coding] = q
+    return weights
+
+
+def negotiate(header, available):
+    """Codage préféré parmi ``available`` (dans leur ordre de préférence), ou ``None``."""
+    if not header:
+        return None
+    weights = parse_accept_encoding(header)
+    best, best_q = None, 0.0
+    for coding in available:
+        q = weights.get(coding, weights.get('*', 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+class GzipEncoder:
+    name = 'gzip'
+
+    def __init__(self, level):
+        # wbits=31 : en-tête et somme de contrôle gzip
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        # Vide le tampon sans terminer le flux : chaque morceau part aussitôt
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class BrotliEncoder:
+    name = 'br'
+
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+def available_encodings():
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def build_encoder(name, config):
+    if name == 'br':
+        return BrotliEncoder(config['BROTLI_QUALITY'])
+    return GzipEncoder(config['GZIP_LEVEL'])
+
+
+def compress_bytes(encoder, data):
+    return encoder.compress(data) + encoder.finish()
+
+
+def compress_stream(encoder, chunks):
+    for chunk in chunks:
+        data = encoder.compress(chunk) + encoder.flush()
+        if data:
+            yield data
+    yield encoder.finish()
+
+
+async def acompress_stream(encoder, chunks):
+    async for chunk in chunks:
+        data = encoder.compress(chunk) + encoder.flush()
+        if data:
+            yield data
+    yield encoder.finish()
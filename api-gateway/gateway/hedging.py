@@ -0,0 +1,388 @@
+"""
+Requêtes couvertes (« hedging ») et reprises des appels amont idempotents.
+
+Sur une route qui l'active (``HEDGE`` dans ``settings.GATEWAY_ROUTES``), un GET
+dont la réponse amont tarde au-delà du p95 récent de la route est doublé d'une
+seconde requête, envoyée de préférence à une autre instance du service ; la
+première réponse arrivée est relayée et l'autre abandonnée. Les latences de
+chaque route sont suivies sur une fenêtre glissante d'échantillons.
+
+Les GET qui échouent sur une erreur de connexion sont repris, avec un délai
+aléatoire (« full jitter ») et sur une autre instance si possible, au plus
+``MAX_RETRIES`` fois. Reprises et requêtes couvertes puisent dans le budget du
+service (``settings.RETRIES``) : chaque appel y dépose ``BUDGET_RATIO`` jeton,
+plus ``BUDGET_MIN_PER_SECOND`` jetons par seconde. Au-delà de ce minimum, un
+service en difficulté ne reçoit pas plus de ``BUDGET_RATIO`` appel
+supplémentaire par appel d'origine.
+
+En mode synchrone, ``requests`` ne sait pas interrompre un appel en cours :
+pour que la requête couverte puisse l'emporter, les deux tentatives tournent
+dans un pool de ``MAX_WORKERS`` threads et le thread de la requête attend la
+première réponse. Le pool ne met jamais en file : sans thread libre, la
+tentative part sur le thread de la requête, sans requête couverte. Une
+attente dans la file ne peut donc ni retarder l'appel ni déclencher de
+requête couverte à tort.
+"""
+
+import asyncio
+import contextvars
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import aiohttp
+import requests
+from django.conf import settings
+
+DEFAULT_HEDGING_SETTINGS = {
+    'PERCENTILE': 95,
+    'WINDOW': 200,            # dernières latences conservées par route
+    'MIN_SAMPLES': 20,        # avant cela, INITIAL_DELAY sert de seuil
+    'INITIAL_DELAY': 0.2,
+    'MIN_DELAY': 0.01,
+    'MAX_DELAY': 2,
+    'MAX_WORKERS': 64,        # tentatives en vol dans le pool du moteur synchrone
+}
+
+DEFAULT_RETRY_SETTINGS = {
+    'MAX_RETRIES': 2,
+    'BACKOFF_BASE': 0.025,    # secondes, doublées à chaque reprise
+    'BACKOFF_MAX': 0.25,
+    'BUDGET_RATIO': 0.2,      # reprises et requêtes couvertes par appel
+    'BUDGET_MIN_PER_SECOND': 5,
+}
+
+IDEMPOTENT_METHODS = {'GET'}
+
+
+def get_retry_settings(service):
+    """Retourne la configuration des reprises d'un service."""
+    config = getattr(settings, 'RETRIES', {})
+    merged = dict(DEFAULT_RETRY_SETTINGS)
+    merged.update({key: value for key, value in config.items() if key != 'SERVICES'})
+    merged.update(config.get('SERVICES', {}).get(service, {}))
+    return merged
+
+
+class LatencyTracker:
+    """Latences récentes d'une route et leur percentile, recalculé par lots."""
+
+    RECOMPUTE_EVERY = 20
+
+    def __init__(self, window, percentile):
+        self.percentile = percentile
+        self._samples = deque(maxlen=window)
+        self._since_compute = 0
+        self._value = None
+        self._lock = threading.Lock()
+
+    def record(self, duration):
+        with self._lock:
+            self._samples.append(duration)
+            self._since_compute += 1
+            if self._since_compute >= self.RECOMPUTE_EVERY:
+                self._since_compute = 0
+                self._value = None
+
+    def value(self, min_samples):
+        with self._lock:
+            if len(self._samples) < min_samples:
+                return None
+            if self._value is None:
+                ordered = sorted(self._samples)
+                index = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+                self._value = ordered[index]
+            return self._value
+
+
+class HedgePolicy:
+    def __init__(self, percentile, window, min_samples, initial_delay, min_delay, max_delay):
+        self.min_samples = min_samples
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.latencies = LatencyTracker(window, percentile)
+        self._stats = {'hedged': 0, 'hedge_wins': 0}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_setting(cls, entry):
+        """``HEDGE`` d'une route : ``True`` ou les valeurs à surcharger."""
+        if not entry:
+            return None
+        config = get_hedging_settings()
+        if isinstance(entry, dict):
+            config.update(entry)
+        return cls(config['PERCENTILE'], config['WINDOW'], config['MIN_SAMPLES'],
+                   config['INITIAL_DELAY'], config['MIN_DELAY'], config['MAX_DELAY'])
+
+    def delay(self):
+        """Attente avant d'envoyer la requête couverte."""
+        value = self.latencies.value(self.min_samples)
+        if value is None:
+            return self.initial_delay
+        return min(max(value, self.min_delay), self.max_delay)
+
+    def count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats['delay'] = round(self.delay(), 4)
+        return stats
+
+
+class RetryBudget:
+    """Jetons de reprise d'un service, alimentés par son trafic."""
+
+    def __init__(self, ratio, min_per_second):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        # Plafond : environ dix secondes de reprises au débit minimal
+        self.capacity = max(10 * min_per_second, 1)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._stats = {'deposits': 0, 'withdrawn': 0, 'exhausted': 0}
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity,
+                           self._tokens + (now - self._updated) * self.min_per_second)
+        self._updated = now
+
+    def deposit(self):
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self.capacity, self._tokens + self.ratio)
+            self._stats['deposits'] += 1
+
+    def withdraw(self):
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= 1:
+                self._tokens -= 1
+                self._stats['withdrawn'] += 1
+                return True
+            self._stats['exhausted'] += 1
+            return False
+
+    def stats(self):
+        with self._lock:
+            self._refill(time.monotonic())
+            return dict(self._stats, tokens=round(self._tokens, 2))
+
+
+class RetryPolicy:
+    def __init__(self, max_retries, backoff_base, backoff_max):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    def backoff(self, attempt):
+        # Full jitter : les reprises simultanées ne repartent pas ensemble
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+
+_retries = {}
+_retries_lock = threading.Lock()
+
+
+def get_retries(service):
+    """Retourne ``(politique, budget)`` de reprise d'un service."""
+    retries = _retries.get(service)
+    if retries is not None:
+        return retries
+    with _retries_lock:
+        retries = _retries.get(service)
+        if retries is None:
+            config = get_retry_settings(service)
+            retries = (
+                RetryPolicy(config['MAX_RETRIES'], config['BACKOFF_BASE'], config['BACKOFF_MAX']),
+                RetryBudget(config['BUDGET_RATIO'], config['BUDGET_MIN_PER_SECOND']),
+            )
+            _retries[service] = retries
+        return retries
+
+
+def _is_retryable_async(error):
+    # Un délai de lecture dépassé n'est pas repris : le service est lent, pas absent
+    return isinstance(error, aiohttp.ClientConnectionError) and not isinstance(
+        error, asyncio.TimeoutError)
+
+
+def _attempt_sync(client, route, method, path, tried, kwargs):
+    policy, budget = get_retries(route.service)
+    attempt = 0
+    while True:
+        try:
+            return client.request(method, path, tried=tried, **kwargs)
+        except requests.exceptions.ConnectionError:
+            if attempt >= policy.max_retries or not budget.withdraw():
+                raise
+            attempt += 1
+            time.sleep(policy.backoff(attempt))
+
+
+async def _attempt_async(client, route, method, path, tried, kwargs):
+    policy, budget = get_retries(route.service)
+    attempt = 0
+    while True:
+        try:
+            return await client.request(method, path, tried=tried, **kwargs)
+        except aiohttp.ClientError as e:
+            if (not _is_retryable_async(e) or attempt >= policy.max_retries
+                    or not budget.withdraw()):
+                raise
+            attempt += 1
+            await asyncio.sleep(policy.backoff(attempt))
+
+
+def get_hedging_settings():
+    config = dict(DEFAULT_HEDGING_SETTINGS)
+    config.update(getattr(settings, 'HEDGING', {}))
+    return config
+
+
+class AttemptPool:
+    """Threads des tentatives couvertes ; ``try_submit`` ne met jamais en file."""
+
+    def __init__(self, max_workers):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='gateway-hedge')
+        self._slots = threading.BoundedSemaphore(max_workers)
+
+    def try_submit(self, fn, *args):
+        """Lance ``fn`` sur un thread libre (contexte de la requête compris), sinon ``None``."""
+        if not self._slots.acquire(blocking=False):
+            return None
+        try:
+            future = self.executor.submit(contextvars.copy_context().run, fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = AttemptPool(get_hedging_settings()['MAX_WORKERS'])
+    return _pool
+
+
+def _record(route, started, attempt, response):
+    # Seule la tentative relayée compte : la perdante ne gonfle pas le percentile
+    # requests expose ``status_code``, aiohttp ``status``
+    status = getattr(response, 'status_code', None)
+    if (status if status is not None else response.status) < 500:
+        route.hedge.latencies.record(time.monotonic() - started[attempt])
+    return response
+
+
+def _close_loser(future):
+    # La réponse perdante (flux ouvert) rend sa connexion au pool
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+def send_sync(client, route, method, path, **kwargs):
+    """Appel amont avec reprises et, si la route l'active, requête couverte."""
+    if method not in IDEMPOTENT_METHODS:
+        return client.request(method, path, **kwargs)
+    _, budget = get_retries(route.service)
+    budget.deposit()
+    tried = []
+    if route.hedge is None:
+        return _attempt_sync(client, route, method, path, tried, kwargs)
+
+    pool = _get_pool()
+    started = {}
+    primary = pool.try_submit(_attempt_sync, client, route, method, path, tried, kwargs)
+    if primary is None:
+        # Pool saturé : pas d'attente en file, la tentative part sur ce thread
+        return _attempt_sync(client, route, method, path, tried, kwargs)
+    started[primary] = time.monotonic()
+    try:
+        return _record(route, started, primary, primary.result(timeout=route.hedge.delay()))
+    except FutureTimeoutError:
+        pass
+    if not budget.withdraw():
+        return _record(route, started, primary, primary.result())
+
+    hedge = pool.try_submit(_attempt_sync, client, route, method, path, tried, kwargs)
+    if hedge is None:
+        return _record(route, started, primary, primary.result())
+    route.hedge.count('hedged')
+    started[hedge] = time.monotonic()
+    pending = {primary, hedge}
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        winner = next((future for future in done if future.exception() is None), None)
+        if winner is not None:
+            for future in (done | pending) - {winner}:
+                future.add_done_callback(_close_loser)
+            if winner is hedge:
+                route.hedge.count('hedge_wins')
+            return _record(route, started, winner, winner.result())
+    # Les deux tentatives ont échoué : l'erreur de la première est relayée
+    return primary.result()
+
+
+def _release_loser(task):
+    if not task.cancelled() and task.exception() is None:
+        task.result().release()
+
+
+async def send_async(client, route, method, path, **kwargs):
+    """Variante asynchrone de ``send_sync``."""
+    if method not in IDEMPOTENT_METHODS:
+        return await client.request(method, path, **kwargs)
+    _, budget = get_retries(route.service)
+    budget.deposit()
+    tried = []
+    if route.hedge is None:
+        return await _attempt_async(client, route, method, path, tried, kwargs)
+
+    started = {}
+    primary = asyncio.create_task(_attempt_async(client, route, method, path, tried, kwargs))
+    started[primary] = time.monotonic()
+    pending = {primary}
+    try:
+        done, _ = await asyncio.wait(pending, timeout=route.hedge.delay())
+        if done:
+            return _record(route, started, primary, primary.result())
+        if not budget.withdraw():
+            return _record(route, started, primary, await primary)
+
+        route.hedge.count('hedged')
+        hedge = asyncio.create_task(_attempt_async(client, route, method, path, tried, kwargs))
+        started[hedge] = time.monotonic()
+        pending = {primary, hedge}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            winner = next((task for task in done if task.exception() is None), None)
+            if winner is not None:
+                for task in done - {winner}:
+                    _release_loser(task)
+                if winner is hedge:
+                    route.hedge.count('hedge_wins')
+                return _record(route, started, winner, winner.result())
+        return primary.result()
+    finally:
+        # Tentative restée en vol (perdante, ou client parti) : annulée
+        for task in pending:
+            if not task.done():
+                task.cancel()
+                task.add_done_callback(_release_loser)
+
@@ -0,0 +1,65 @@
+"""
+Accès aux points d'observation de la passerelle (``/metrics``, ``/_gateway/``).
+
+Les routes déclarées ``INTERNAL`` dans ``settings.GATEWAY_ROUTES`` ne sont
+servies qu'aux appelants internes : adresse de connexion comprise dans
+``ALLOWED_IPS`` (réseaux CIDR), ou en-tête ``Authorization: Bearer <SCRAPE_TOKEN>``
+pour un collecteur Prometheus hors de ces réseaux. Seule l'adresse de
+connexion (``REMOTE_ADDR``) est considérée : derrière un proxy, c'est le jeton
+qui sert. Tout autre appelant reçoit une 403.
+"""
+
+import hmac
+import ipaddress
+import threading
+
+from django.conf import settings
+
+DEFAULT_INTERNAL_SETTINGS = {
+    'ALLOWED_IPS': ['127.0.0.1/32', '::1/128'],
+    'SCRAPE_TOKEN': None,  # None : accès par adresse uniquement
+}
+
+
+def get_internal_settings():
+    config = dict(DEFAULT_INTERNAL_SETTINGS)
+    config.update(getattr(settings, 'INTERNAL_ENDPOINTS', {}))
+    return config
+
+
+class InternalAccess:
+    def __init__(self, allowed_ips, scrape_token=None):
+        self.networks = [ipaddress.ip_network(network.strip(), strict=False)
+                         for network in allowed_ips if network.strip()]
+        self.scrape_token = scrape_token
+
+    def allows(self, request):
+        return self._allowed_address(request) or self._valid_token(request)
+
+    def _allowed_address(self, request):
+        try:
+            address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+        except ValueError:
+            return False
+        return any(address in network for network in self.networks)
+
+    def _valid_token(self, request):
+        if not self.scrape_token:
+            return False
+        scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+        return scheme.lower() == 'bearer' and hmac.compare_digest(
+            token.strip().encode(), self.scrape_token.encode())
+
+
+_access = None
+_access_lock = threading.Lock()
+
+
+def get_internal_access():
+    global _access
+    if _access is None:
+        with _access_lock:
+            if _access is None:
+                config = get_internal_settings()
+                _access = InternalAccess(config['ALLOWED_IPS'], config['SCRAPE_TOKEN'])
+    return _access
@@ -0,0 +1,384 @@
+"""
+Métriques de la passerelle au format texte Prometheus (``/metrics``).
+
+Compteurs et histogrammes à seaux fixes, étiquetés par route, service amont
+et classe de statut : durée totale des requêtes, vérification des tokens,
+attente du service amont et consultations du cache de réponses. Une mesure
+coûte une recherche dichotomique et une incrémentation sous verrou.
+
+Avec plusieurs workers (gunicorn, uvicorn ``--workers``), chaque processus
+écrit périodiquement un instantané de ses séries dans
+``METRICS['MULTIPROCESS_DIR']`` ; ``/metrics`` additionne les instantanés de
+tous les processus, ceux des workers arrêtés compris, pour que les compteurs
+restent croissants d'un redémarrage à l'autre. Sans ce répertoire, seules les
+séries du processus qui répond sont exposées.
+
+Un worker issu d'un fork (application préchargée) repart de séries vides,
+avec son propre fichier et son propre thread d'écriture. Les instantanés des
+workers arrêtés sont additionnés périodiquement dans ``aggregate.json`` puis
+supprimés, pour que le nombre de fichiers lus par relevé reste borné.
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from pathlib import Path
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de verrou de fichier, pas d'agrégation
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_METRICS_SETTINGS = {
+    'ENABLED': True,
+    'MULTIPROCESS_DIR': None,  # répertoire partagé par les workers, None = un seul processus
+    'FLUSH_INTERVAL': 5,       # secondes entre deux instantanés d'un worker
+    'BUCKETS': [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10],
+}
+
+AGGREGATE_FILE = 'aggregate.json'
+# Un worker dont le fichier n'a pas été réécrit depuis autant d'intervalles, et
+# dont le processus n'existe plus, est considéré comme arrêté
+STALE_FLUSHES = 3
+
+
+def get_metrics_settings():
+    config = dict(DEFAULT_METRICS_SETTINGS)
+    config.update(getattr(settings, 'METRICS', {}))
+    return config
+
+
+def status_class(status_code):
+    return f'{status_code // 100}xx'
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def reset(self):
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._values)
+
+    @staticmethod
+    def merge(total, value):
+        return value if total is None else total + value
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = list(buckets)
+        self._values = {}  # étiquettes -> [effectif par seau..., +Inf, somme]
+        self._lock = threading.Lock()
+
+    def reset(self):
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                series = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def snapshot(self):
+        with self._lock:
+            return {labels: list(series) for labels, series in self._values.items()}
+
+    @staticmethod
+    def merge(total, value):
+        return list(value) if total is None else [a + b for a, b in zip(total, value)]
+
+
+MERGES = {Counter.kind: Counter.merge, Histogram.kind: Histogram.merge}
+
+
+def _read_json(path):
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        # Fichier supprimé, en cours de remplacement ou illisible : ignoré
+        return None
+
+
+def _write_json(path, data):
+    """Remplacement atomique : un lecteur voit l'ancien contenu ou le nouveau."""
+    temporary = path.with_suffix('.tmp')
+    temporary.write_text(json.dumps(data))
+    os.replace(temporary, path)
+
+
+def _process_exists(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Registry:
+    def __init__(self, multiprocess_dir=None, flush_interval=5):
+        self.metrics = {}
+        self.multiprocess_dir = Path(multiprocess_dir) if multiprocess_dir else None
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._flusher = None
+        self._flush_at_exit = False
+        if self.multiprocess_dir is not None:
+            self.multiprocess_dir.mkdir(parents=True, exist_ok=True)
+            self._path = self._snapshot_path()
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _snapshot_path(self):
+        # Le pid seul peut être réutilisé après l'arrêt d'un worker
+        return self.multiprocess_dir / f'{os.getpid()}-{time.time_ns()}.json'
+
+    def _after_fork(self):
+        # Les séries héritées restent comptées par le parent ; le thread
+        # d'écriture du parent n'existe pas dans le processus enfant
+        self._lock = threading.Lock()
+        for metric in self.metrics.values():
+            metric.reset()
+        self._path = self._snapshot_path()
+        if self._flusher is not None:
+            self._flusher = None
+            self.start_flusher()
+
+    def _register(self, metric):
+        with self._lock:
+            return self.metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, documentation, labelnames):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames, buckets):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def snapshot(self):
+        return {name: {'kind': metric.kind,
+                       'series': [[list(labels), value]
+                                  for labels, value in metric.snapshot().items()]}
+                for name, metric in self.metrics.items()}
+
+    def flush(self):
+        """Écrit l'instantané du processus (remplacement atomique du fichier)."""
+        if self.multiprocess_dir is None:
+            return
+        _write_json(self._path, self.snapshot())
+
+    def start_flusher(self):
+        if self.multiprocess_dir is None or self._flusher is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(self.flush_interval)
+                try:
+                    self.flush()
+                    self.fold_stopped_workers()
+                except OSError:
+                    logger.exception("Instantané des métriques non écrit dans %s", self.multiprocess_dir)
+
+        self._flusher = threading.Thread(target=run, name='gateway-metrics', daemon=True)
+        self._flusher.start()
+        if not self._flush_at_exit:
+            atexit.register(self.flush)
+            self._flush_at_exit = True
+
+    def _worker_files(self):
+        return [path for path in self.multiprocess_dir.glob('*.json') if path.name != AGGREGATE_FILE]
+
+    def _stopped(self, path):
+        try:
+            pid = int(path.name.split('-', 1)[0])
+            age = time.time() - path.stat().st_mtime
+        except (ValueError, OSError):
+            return False
+        return age > STALE_FLUSHES * self.flush_interval and not _process_exists(pid)
+
+    def fold_stopped_workers(self):
+        """Additionne les instantanés des workers arrêtés dans ``aggregate.json`` et les supprime."""
+        if self.multiprocess_dir is None or fcntl is None:
+            return
+        with open(self.multiprocess_dir / 'aggregate.lock', 'a') as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return  # un autre worker s'en charge
+            aggregate_path = self.multiprocess_dir / AGGREGATE_FILE
+            aggregate = _read_json(aggregate_path) or {'series': {}, 'folded': []}
+            folded = set(aggregate['folded'])
+            for name in folded:
+                # Déjà additionné, mais pas supprimé (arrêt pendant l'agrégation précédente)
+                (self.multiprocess_dir / name).unlink(missing_ok=True)
+            stopped = [path for path in self._worker_files()
+                       if path.name not in folded and self._stopped(path)]
+            if not stopped:
+                return
+            totals = aggregate['series']
+            for path in stopped:
+                for name, data in (_read_json(path) or {}).items():
+                    merge = MERGES.get(data['kind'])
+                    if merge is None:
+                        continue
+                    entry = totals.setdefault(name, {'kind': data['kind'], 'series': []})
+                    series = {tuple(labels): value for labels, value in entry['series']}
+                    for labels, value in data['series']:
+                        series[tuple(labels)] = merge(series.get(tuple(labels)), value)
+                    entry['series'] = [[list(labels), value] for labels, value in series.items()]
+                folded.add(path.name)
+            # Les fichiers déjà additionnés restent listés tant qu'ils existent : un
+            # arrêt entre l'écriture et la suppression ne les compte pas deux fois
+            aggregate['folded'] = sorted(name for name in folded
+                                         if (self.multiprocess_dir / name).exists())
+            _write_json(aggregate_path, aggregate)
+            for path in stopped:
+                path.unlink(missing_ok=True)
+
+    def _snapshots(self):
+        if self.multiprocess_dir is None:
+            yield self.snapshot()
+            return
+        self.flush()
+        # Instantanés lus avant l'agrégat : un fichier additionné entre-temps est
+        # listé dans l'agrégat et n'est pas compté deux fois, ni oublié
+        snapshots = {path.name: _read_json(path) for path in self._worker_files()}
+        aggregate = _read_json(self.multiprocess_dir / AGGREGATE_FILE)
+        folded = set()
+        if aggregate is not None:
+            folded = set(aggregate['folded'])
+            yield aggregate['series']
+        for name, snapshot in snapshots.items():
+            if snapshot is not None and name not in folded:
+                yield snapshot
+
+    def collect(self):
+        """Séries additionnées sur tous les processus : ``{nom: {étiquettes: valeur}}``."""
+        merged = {name: {} for name in self.metrics}
+        for snapshot in self._snapshots():
+            for name, data in snapshot.items():
+                metric = self.metrics.get(name)
+                if metric is None or data['kind'] != metric.kind:
+                    continue
+                series = merged[name]
+                for labels, value in data['series']:
+                    labels = tuple(labels)
+                    series[labels] = metric.merge(series.get(labels), value)
+        return merged
+
+    def render(self):
+        """Exposition au format texte Prometheus 0.0.4."""
+        lines = []
+        for name, series in self.collect().items():
+            metric = self.metrics[name]
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            for labels, value in sorted(series.items()):
+                if metric.kind == 'counter':
+                    lines.append(f'{name}{_labels(metric.labelnames, labels)} {_number(value)}')
+                    continue
+                cumulative = 0
+                bounds = [_number(bound) for bound in metric.buckets] + ['+Inf']
+                for bound, count in zip(bounds, value[:-1]):
+                    cumulative += count
+                    le = _labels(metric.labelnames, labels, f'le="{bound}"')
+                    lines.append(f'{name}_bucket{le} {cumulative}')
+                lines.append(f'{name}_sum{_labels(metric.labelnames, labels)} {_number(value[-1])}')
+                lines.append(f'{name}_count{_labels(metric.labelnames, labels)} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+
+class GatewayMetrics:
+    """Séries mesurées par la passerelle."""
+
+    def __init__(self, registry, buckets):
+        self.registry = registry
+        self.requests = registry.counter(
+            'gateway_requests_total', 'Requests handled by the gateway.',
+            ('route', 'method', 'status'))
+        self.request_duration = registry.histogram(
+            'gateway_request_duration_seconds', 'Time spent in the gateway until the response headers.',
+            ('route', 'status'), buckets)
+        self.auth_duration = registry.histogram(
+            'gateway_auth_duration_seconds', 'Token verification time by authentication service.',
+            ('service', 'outcome'), buckets)
+        self.upstream_duration = registry.histogram(
+            'gateway_upstream_duration_seconds', 'Wait for the upstream response headers.',
+            ('route', 'upstream', 'status'), buckets)
+        self.cache_lookups = registry.counter(
+            'gateway_cache_lookups_total', 'Response cache lookups by outcome.',
+            ('route', 'state'))
+
+    def render(self):
+        return self.registry.render()
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics():
+    """Retourne les métriques du processus, ou ``None`` si elles sont désactivées."""
+    global _metrics
+    config = get_metrics_settings()
+    if not config['ENABLED']:
+        return None
+    if _metrics is None:
+        with _metrics_lock:
+            if _metrics is None:
+                registry = Registry(config['MULTIPROCESS_DIR'], config['FLUSH_INTERVAL'])
+                registry.start_flusher()
+                _metrics = GatewayMetrics(registry, config['BUCKETS'])
+    return _metrics
+
+
+def route_label(request):
+    route = getattr(request, 'route', None)
+    return route.prefix if route is not None else 'unmatched'
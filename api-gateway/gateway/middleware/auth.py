@@ -1,70 +1,131 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
 from django.http import JsonResponse
 from rest_framework import status
-import requests
+
+from ..authentication import UNAVAILABLE, get_authenticator
+from ..metrics import get_metrics
+from ..routes import get_route_table
+from ..token_cache import INVALID
 
 class AuthMiddleware:
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        self.routes = get_route_table()
+        self.authenticator = get_authenticator()
+        self.metrics = get_metrics()
+        # En mode ASGI la vérification du token ne doit pas bloquer un thread
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
 
     def __call__(self, request):
-        if not self._requires_auth(request.path):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        service = self._get_auth_service(request)
+        if service is None:
             return self.get_response(request)
 
+        token, error = self._extract_token(request, service)
+        if error:
+            return error
+
+        started = time.perf_counter()
+        identity = self.authenticator.identify(service, token)
+        self._record(service, identity, time.perf_counter() - started)
+        error = self._check_verification(request, identity)
+        if error:
+            return error
+
+        response = self.get_response(request)
+        self._invalidate_on_logout(request, token, response)
+        return response
+
+    async def __acall__(self, request):
+        service = self._get_auth_service(request)
+        if service is None:
+            return await self.get_response(request)
+
+        token, error = self._extract_token(request, service)
+        if error:
+            return error
+
+        started = time.perf_counter()
+        identity = await self.authenticator.aidentify(service, token)
+        self._record(service, identity, time.perf_counter() - started)
+        error = self._check_verification(request, identity)
+        if error:
+            return error
+
+        response = await self.get_response(request)
+        self._invalidate_on_logout(request, token, response)
+        return response
+
+    def _extract_token(self, request, service):
         auth_header = request.headers.get('Authorization')
         if not auth_header:
-            return JsonResponse(
+            return None, JsonResponse(
                 {'error': 'No authorization token provided'}, 
                 status=status.HTTP_401_UNAUTHORIZED
             )
 
         try:
             token = auth_header.split(' ')[1]
-            
-            # Déterminer le service d'authentification en fonction du chemin
-            auth_service_url = self._get_auth_service_url(request.path)
-            if not auth_service_url:
-                return JsonResponse(
-                    {'error': 'Invalid authentication service for this path'}, 
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-
-            # Valider le token auprès du service d'authentification
-            response = requests.post(f"{auth_service_url}/verify_token/", json={'token': token})
-
-            if response.status_code != 200:
-                return JsonResponse(
-                    {'error': 'Invalid or expired token'}, 
-                    status=status.HTTP_401_UNAUTHORIZED
-                )
-
-            # Ajouter les informations utilisateur à la requête
-            user_data = response.json().get('user')
-            if user_data:
-                request.user_id = user_data.get('id')
-
-        except (requests.exceptions.RequestException, IndexError):
+        except IndexError:
+            return None, self._service_unavailable()
+
+        # Le service d'authentification de la route doit savoir vérifier le token
+        if service not in settings.TOKEN_VERIFY_URLS:
+            return None, JsonResponse(
+                {'error': 'Invalid authentication service for this path'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return token, None
+
+    def _check_verification(self, request, identity):
+        if identity is UNAVAILABLE:
+            return self._service_unavailable()
+        if identity is INVALID:
             return JsonResponse(
-                {'error': 'Invalid token or authentication service unavailable'}, 
-                status=status.HTTP_503_SERVICE_UNAVAILABLE
+                {'error': 'Invalid or expired token'}, 
+                status=status.HTTP_401_UNAUTHORIZED
             )
 
-        return self.get_response(request)
-
-    def _requires_auth(self, path):
-        public_paths = [
-            '/api/auth/login',
-            '/api/auth/register',
-            '/api/seller/login',
-            '/api/seller/register',
-            '/api/admin/login',
-            '/api/products',
-        ]
-        return not any(path.startswith(public_path) for public_path in public_paths)
-
-    def _get_auth_service_url(self, path):
-        if path.startswith('/api/seller'):
-            return 'http://localhost:8006/api/seller'
-        elif path.startswith('/api/admin'):
-            return 'http://localhost:8007/api/admin'
+        # Ajouter les informations utilisateur à la requête
+        if identity:
+            request.user_id = identity.get('id')
+        return None
+
+    def _record(self, service, identity, duration):
+        if self.metrics is None:
+            return
+        if identity is UNAVAILABLE:
+            outcome = 'unavailable'
+        elif identity is INVALID:
+            outcome = 'invalid'
         else:
-            return 'http://localhost:8002/api/auth'
+            outcome = 'valid'
+        self.metrics.auth_duration.observe((service, outcome), duration)
+
+    def _invalidate_on_logout(self, request, token, response):
+        # Le token révoqué en amont ne doit plus être servi depuis le cache
+        if (request.method == 'POST' and request.path.rstrip('/').endswith('/logout')
+                and response.status_code < 400):
+            self.authenticator.forget(token)
+
+    def _service_unavailable(self):
+        return JsonResponse(
+            {'error': 'Invalid token or authentication service unavailable'}, 
+            status=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+
+    def _get_auth_service(self, request):
+        # Service qui vérifie le token d'après la table de routage (None = route publique)
+        route = getattr(request, 'route', None) or self.routes.resolve(request.path)
+        return route.auth if route is not None else 'auth'
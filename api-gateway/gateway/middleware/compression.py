@@ -0,0 +1,78 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.utils.cache import patch_vary_headers
+
+from ..compression import (
+    acompress_stream, available_encodings, build_encoder, compress_bytes, compress_stream,
+    get_compression_settings, negotiate,
+)
+
+
+class CompressionMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.config = get_compression_settings()
+        self.encodings = available_encodings()
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self._compress(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self._compress(request, await self.get_response(request))
+
+    def _is_compressible(self, response):
+        if response.status_code < 200 or response.status_code in (204, 206) \
+                or response.status_code >= 300:
+            return False
+        # Déjà encodée en amont (ou par le cache) : relayée sans recompression
+        if response.has_header('Content-Encoding'):
+            return False
+        if 'no-transform' in response.get('Cache-Control', '').lower():
+            return False
+        content_type = response.get('Content-Type', '').lower()
+        return any(content_type.startswith(prefix) for prefix in self.config['CONTENT_TYPES'])
+
+    def _too_small(self, response):
+        if response.streaming:
+            length = response.get('Content-Length')
+            return length is not None and int(length) < self.config['MIN_SIZE']
+        return len(response.content) < self.config['MIN_SIZE']
+
+    def _compress(self, request, response):
+        if not self.config['ENABLED'] or not self._is_compressible(response) \
+                or self._too_small(response):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        coding = negotiate(request.headers.get('Accept-Encoding', ''), self.encodings)
+        if coding is None:
+            return response
+
+        encoder = build_encoder(coding, self.config)
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = acompress_stream(encoder, response.streaming_content)
+            else:
+                response.streaming_content = compress_stream(encoder, response.streaming_content)
+            # Longueur inconnue avant la fin de la compression
+            del response['Content-Length']
+        else:
+            compressed = compress_bytes(encoder, response.content)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        # La représentation change : l'ETag amont ne reste valable qu'en comparaison faible
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = coding
+        return response
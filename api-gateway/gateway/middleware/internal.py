@@ -0,0 +1,38 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.http import JsonResponse
+from rest_framework import status
+
+from ..internal import get_internal_access
+
+
+class InternalOnlyMiddleware:
+    """Refuse les routes ``INTERNAL`` aux appelants externes (voir gateway/internal.py)"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.access = get_internal_access()
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if self._forbidden(request):
+            return self._forbidden_response()
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        if self._forbidden(request):
+            return self._forbidden_response()
+        return await self.get_response(request)
+
+    def _forbidden(self, request):
+        route = getattr(request, 'route', None)
+        return route is not None and route.internal and not self.access.allows(request)
+
+    def _forbidden_response(self):
+        return JsonResponse({'error': 'Forbidden'}, status=status.HTTP_403_FORBIDDEN)
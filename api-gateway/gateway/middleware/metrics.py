@@ -0,0 +1,41 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.core.exceptions import MiddlewareNotUsed
+
+from ..metrics import get_metrics, route_label, status_class
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.metrics = get_metrics()
+        if self.metrics is None:
+            raise MiddlewareNotUsed
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        started = time.perf_counter()
+        response = self.get_response(request)
+        self._record(request, response, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        self._record(request, response, time.perf_counter() - started)
+        return response
+
+    def _record(self, request, response, duration):
+        # La route est posée par le RoutingMiddleware, placé plus bas dans la pile
+        route = route_label(request)
+        status = status_class(response.status_code)
+        self.metrics.requests.inc((route, request.method, status))
+        self.metrics.request_duration.observe((route, status), duration)
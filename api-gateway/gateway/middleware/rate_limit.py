@@ -0,0 +1,57 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.http import JsonResponse
+from rest_framework import status
+
+from ..rate_limit import POST_AUTH_SCOPES, PRE_AUTH_SCOPES, get_rate_limiter
+
+
+class RateLimitMiddleware:
+    """Portées ``ip`` et ``route``, placé avant l'``AuthMiddleware``"""
+
+    sync_capable = True
+    async_capable = True
+    scopes = PRE_AUTH_SCOPES
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.limiter = get_rate_limiter()
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if self.limiter is not None:
+            retry_after = self.limiter.check(request, getattr(request, 'route', None), self.scopes)
+            if retry_after:
+                return self._throttled(retry_after)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        if self.limiter is not None:
+            route = getattr(request, 'route', None)
+            if self.limiter.backend.blocking:
+                # Aller-retour réseau (Redis) : hors de la boucle d'événements
+                retry_after = await sync_to_async(self.limiter.check, thread_sensitive=False)(
+                    request, route, self.scopes
+                )
+            else:
+                retry_after = self.limiter.check(request, route, self.scopes)
+            if retry_after:
+                return self._throttled(retry_after)
+        return await self.get_response(request)
+
+    def _throttled(self, retry_after):
+        response = JsonResponse(
+            {'error': 'Too many requests', 'retry_after': retry_after},
+            status=status.HTTP_429_TOO_MANY_REQUESTS
+        )
+        response['Retry-After'] = str(retry_after)
+        return response
+
+
+class UserRateLimitMiddleware(RateLimitMiddleware):
+    """Portée ``user``, placé après l'``AuthMiddleware`` qui fixe ``request.user_id``"""
+
+    scopes = POST_AUTH_SCOPES
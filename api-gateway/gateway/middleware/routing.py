@@ -1,7 +1,19 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from ..routes import get_route_table
+
+
 class RoutingMiddleware:
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        self.routes = get_route_table()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
-        # Add service routing logic here if needed
-        return self.get_response(request)
\ No newline at end of file
+        # Une seule résolution par requête : service amont, authentification, cache et délai
+        request.route = self.routes.resolve(request.path)
+        return self.get_response(request)
@@ -0,0 +1,50 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.core.exceptions import MiddlewareNotUsed
+
+from ..tracing import activate, deactivate, get_tracing_settings, start_server_span
+
+
+class TracingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        config = get_tracing_settings()
+        if not config['ENABLED']:
+            raise MiddlewareNotUsed
+        self.sample_rate = config['SAMPLE_RATE']
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        span = start_server_span(request, self.sample_rate)
+        token = activate(span)
+        try:
+            return self._finish_response(span, self.get_response(request))
+        finally:
+            self._finish(request, span, token)
+
+    async def __acall__(self, request):
+        span = start_server_span(request, self.sample_rate)
+        token = activate(span)
+        try:
+            return self._finish_response(span, await self.get_response(request))
+        finally:
+            self._finish(request, span, token)
+
+    def _finish_response(self, span, response):
+        span.set('http.status_code', response.status_code)
+        if span.sampled:
+            response['X-Trace-Id'] = span.trace_id
+        return response
+
+    def _finish(self, request, span, token):
+        route = getattr(request, 'route', None)
+        if route is not None:
+            span.set('gateway.route', route.prefix)
+        deactivate(token)
+        span.finish()
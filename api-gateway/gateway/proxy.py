@@ -0,0 +1,376 @@
+"""
+Moteur de proxy de la passerelle.
+
+Une seule vue relaie toutes les routes de ``settings.GATEWAY_ROUTES`` : le
+``RoutingMiddleware`` attache à la requête sa route (service, délai, cache).
+Sous WSGI (``runserver``), ``sync_proxy`` s'appuie sur les sessions
+keep-alive de ``gateway.upstream``. Sous ASGI, ``async_proxy`` diffuse les
+corps de requête et de réponse sans les mettre en mémoire, de sorte qu'un
+seul processus peut garder des milliers d'appels amont en vol.
+
+Dans les deux cas la réponse amont est relayée telle quelle : octets, statut
+et en-têtes utiles (type, encodage, ETag, cache), sans décoder ni réencoder le
+JSON. Les petits corps sont envoyés d'un bloc, les gros par morceaux.
+
+Les GET anonymes des routes publiques passent d'abord par le cache de
+réponses (``gateway.response_cache``) ; les GET identiques simultanés qui
+doivent joindre le service partagent un seul appel (``gateway.coalescing``).
+Chaque appel amont passe par le disjoncteur et le compartiment du service
+(``gateway.resilience``) ; les GET sont repris sur erreur de connexion et,
+sur les routes qui l'activent, couverts par une seconde requête
+(``gateway.hedging``).
+"""
+
+import asyncio
+import threading
+import time
+
+import aiohttp
+import requests
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+
+from .coalescing import get_coalescer
+from .hedging import send_async, send_sync
+from .metrics import get_metrics, status_class
+from .resilience import get_guard
+from .response_cache import MISS, STALE, get_response_cache
+from .routes import get_route_table
+from .upstream import get_async_client, get_client
+
+ALLOWED_METHODS = ['GET', 'POST', 'PUT', 'DELETE']
+
+# En-têtes propres à une connexion, à ne jamais relayer (RFC 9110 §7.6.1)
+HOP_BY_HOP_HEADERS = {
+    'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization',
+    'te', 'trailer', 'transfer-encoding', 'upgrade', 'host',
+}
+
+# En-têtes de réponse amont relayés au client
+PASSTHROUGH_HEADERS = [
+    'Content-Type', 'Content-Encoding', 'Content-Language', 'Content-Disposition',
+    'ETag', 'Last-Modified', 'Cache-Control', 'Expires', 'Vary', 'Location',
+    'Retry-After', 'Link',
+]
+
+# En-têtes conditionnels retirés quand la passerelle remplit son propre cache
+CONDITIONAL_HEADERS = {'if-none-match', 'if-modified-since'}
+
+BODY_CHUNK_SIZE = 64 * 1024
+
+# Rafraîchissements asynchrones en cours (référence forte jusqu'à leur fin)
+_background_tasks = set()
+
+
+def _forward_headers(request, excluded=()):
+    return {key: value for key, value in request.headers.items()
+            if key.lower() not in HOP_BY_HOP_HEADERS and key.lower() not in excluded}
+
+
+def _stream_threshold():
+    return getattr(settings, 'PROXY_STREAM_THRESHOLD', 256 * 1024)
+
+
+def _content_length(headers):
+    try:
+        return int(headers['Content-Length'])
+    except (KeyError, ValueError):
+        return None
+
+
+def _passthrough_headers(upstream_headers):
+    return {header: upstream_headers[header] for header in PASSTHROUGH_HEADERS
+            if header in upstream_headers}
+
+
+def _copy_headers(response, upstream_headers, length):
+    for header, value in _passthrough_headers(upstream_headers).items():
+        response[header] = value
+    if length is not None:
+        response['Content-Length'] = str(length)
+    return response
+
+
+def _should_stream(length):
+    # Longueur inconnue (réponse « chunked » amont) ou corps volumineux
+    return length is None or length > _stream_threshold()
+
+
+def _service_unavailable(service, reason, retry_after):
+    response = JsonResponse(
+        {'error': 'Service temporarily unavailable', 'service': service, 'reason': reason},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE
+    )
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+def _upstream_error(service, timed_out):
+    if timed_out:
+        return JsonResponse({'error': 'Upstream service timed out', 'service': service},
+                            status=status.HTTP_504_GATEWAY_TIMEOUT)
+    return JsonResponse({'error': 'Upstream service unreachable', 'service': service},
+                        status=status.HTTP_502_BAD_GATEWAY)
+
+
+def _record_upstream(route, outcome, duration):
+    metrics = get_metrics()
+    if metrics is not None:
+        metrics.upstream_duration.observe((route.prefix, route.service, outcome), duration)
+
+
+def _record_lookup(route, state):
+    metrics = get_metrics()
+    if metrics is not None:
+        metrics.cache_lookups.inc((route.prefix, (state or MISS).lower()))
+
+
+def _iter_raw(upstream):
+    try:
+        yield from upstream.raw.stream(BODY_CHUNK_SIZE, decode_content=False)
+    finally:
+        upstream.close()
+
+
+def _refresh_sync(cache, key, service, path, headers, entry):
+    try:
+        upstream = get_client(service).request(
+            'GET', path, headers=dict(headers, **{'If-None-Match': entry.etag}), stream=True
+        )
+        with upstream:
+            if upstream.status_code == 304:
+                cache.revalidated(key)
+            elif cache.is_storable(upstream.status_code, upstream.headers,
+                                   _content_length(upstream.headers)):
+                cache.store(key, upstream.status_code, _passthrough_headers(upstream.headers),
+                            upstream.raw.read(decode_content=False), entry.policy)
+    except requests.exceptions.RequestException:
+        pass
+    finally:
+        cache.end_refresh(key)
+
+
+def _forward_sync(request, route, path, headers, cache, policy):
+    service = route.service
+    client = get_client(service)
+    options = {'timeout': client.timeout_for(route.timeout)} if route.timeout else {}
+    guard = get_guard(service)
+    rejection = guard.enter()
+    if rejection:
+        return _service_unavailable(service, rejection, guard.retry_after(rejection))
+
+    started = time.monotonic()
+    try:
+        upstream = send_sync(
+            client, route,
+            method=request.method,
+            path=path,
+            headers=headers,
+            data=request.body if request.body else None,
+            stream=True,
+            **options
+        )
+    except requests.exceptions.RequestException as e:
+        timed_out = isinstance(e, requests.exceptions.Timeout)
+        guard.exit(False, time.monotonic() - started)
+        _record_upstream(route, 'timeout' if timed_out else 'error', time.monotonic() - started)
+        return _upstream_error(service, timed_out)
+    duration = time.monotonic() - started
+    guard.exit(upstream.status_code < 500, duration)
+    _record_upstream(route, status_class(upstream.status_code), duration)
+
+    length = _content_length(upstream.headers)
+    if policy and cache.is_storable(upstream.status_code, upstream.headers, length):
+        with upstream:
+            entry = cache.store(cache.key_for(request), upstream.status_code,
+                                _passthrough_headers(upstream.headers),
+                                upstream.raw.read(decode_content=False), policy)
+        return cache.respond(request, entry, MISS)
+    if route.cache and cache and request.method != 'GET' and upstream.status_code < 400:
+        cache.invalidate(route.cache)
+
+    if _should_stream(length):
+        response = StreamingHttpResponse(_iter_raw(upstream), status=upstream.status_code)
+    else:
+        with upstream:
+            response = HttpResponse(upstream.raw.read(decode_content=False),
+                                    status=upstream.status_code)
+    return _copy_headers(response, upstream.headers, length)
+
+
+def sync_proxy(request, route):
+    """Relaie la requête vers le service de la route avec une session keep-alive."""
+    if request.method not in ALLOWED_METHODS:
+        return HttpResponseNotAllowed(ALLOWED_METHODS)
+
+    path = request.get_full_path()
+    cache = get_response_cache()
+    policy = cache.policy_for(request, route) if cache else None
+    headers = _forward_headers(request, CONDITIONAL_HEADERS if policy else ())
+    if policy:
+        key = cache.key_for(request)
+        entry, state = cache.lookup(key)
+        _record_lookup(route, state)
+        if entry is not None:
+            if state == STALE and cache.begin_refresh(key):
+                threading.Thread(target=_refresh_sync, daemon=True,
+                                 args=(cache, key, route.service, path, headers, entry)).start()
+            return cache.respond(request, entry, state)
+
+    def forward():
+        return _forward_sync(request, route, path, headers, cache, policy)
+
+    coalescer = get_coalescer()
+    flight_key = coalescer.key_for(request) if coalescer else None
+    if flight_key is not None:
+        return coalescer.run(flight_key, forward)
+    return forward()
+
+
+async def _iter_request_body(request):
+    # Sous ASGI le corps est déjà dans un fichier temporaire : on le relit par blocs
+    while True:
+        chunk = request.read(BODY_CHUNK_SIZE)
+        if not chunk:
+            break
+        yield chunk
+
+
+async def _iter_upstream(upstream):
+    try:
+        async for chunk in upstream.content.iter_any():
+            yield chunk
+    finally:
+        upstream.release()
+
+
+async def _refresh_async(cache, key, service, path, headers, entry):
+    try:
+        async with get_async_client(service).request(
+            'GET', path, headers=dict(headers, **{'If-None-Match': entry.etag})
+        ) as upstream:
+            if upstream.status == 304:
+                cache.revalidated(key)
+            elif cache.is_storable(upstream.status, upstream.headers,
+                                   _content_length(upstream.headers)):
+                cache.store(key, upstream.status, _passthrough_headers(upstream.headers),
+                            await upstream.read(), entry.policy)
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        pass
+    finally:
+        cache.end_refresh(key)
+
+
+async def _forward_async(request, route, path, headers, cache, policy):
+    service = route.service
+    client = get_async_client(service)
+    options = {'timeout': client.timeout_for(route.timeout)} if route.timeout else {}
+    guard = get_guard(service)
+    rejection = guard.enter()
+    if rejection:
+        return _service_unavailable(service, rejection, guard.retry_after(rejection))
+
+    has_body = int(request.headers.get('Content-Length') or 0) > 0
+    started = time.monotonic()
+    try:
+        upstream = await send_async(
+            client, route,
+            method=request.method,
+            path=path,
+            headers=headers,
+            data=_iter_request_body(request) if has_body else None,
+            **options
+        )
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        timed_out = isinstance(e, asyncio.TimeoutError)
+        guard.exit(False, time.monotonic() - started)
+        _record_upstream(route, 'timeout' if timed_out else 'error', time.monotonic() - started)
+        return _upstream_error(service, timed_out)
+    except BaseException:
+        # Annulation (client parti) : l'appel n'est pas imputé au service
+        guard.abandon()
+        raise
+    duration = time.monotonic() - started
+    guard.exit(upstream.status < 500, duration)
+    _record_upstream(route, status_class(upstream.status), duration)
+
+    length = _content_length(upstream.headers)
+    if policy and cache.is_storable(upstream.status, upstream.headers, length):
+        async with upstream:
+            entry = cache.store(cache.key_for(request), upstream.status,
+                                _passthrough_headers(upstream.headers), await upstream.read(), policy)
+        return cache.respond(request, entry, MISS)
+    if route.cache and cache and request.method != 'GET' and upstream.status < 400:
+        cache.invalidate(route.cache)
+
+    if _should_stream(length):
+        response = StreamingHttpResponse(_iter_upstream(upstream), status=upstream.status)
+    else:
+        async with upstream:
+            response = HttpResponse(await upstream.read(), status=upstream.status)
+    return _copy_headers(response, upstream.headers, length)
+
+
+async def async_proxy(request, route):
+    """Relaie la requête vers le service de la route en diffusant les corps."""
+    if request.method not in ALLOWED_METHODS:
+        return HttpResponseNotAllowed(ALLOWED_METHODS)
+
+    path = request.get_full_path()
+    cache = get_response_cache()
+    policy = cache.policy_for(request, route) if cache else None
+    headers = _forward_headers(request, CONDITIONAL_HEADERS if policy else ())
+    if policy:
+        key = cache.key_for(request)
+        entry, state = cache.lookup(key)
+        _record_lookup(route, state)
+        if entry is not None:
+            if state == STALE and cache.begin_refresh(key):
+                task = asyncio.create_task(
+                    _refresh_async(cache, key, route.service, path, headers, entry)
+                )
+                _background_tasks.add(task)
+                task.add_done_callback(_background_tasks.discard)
+            return cache.respond(request, entry, state)
+
+    async def forward():
+        return await _forward_async(request, route, path, headers, cache, policy)
+
+    coalescer = get_coalescer()
+    flight_key = coalescer.key_for(request) if coalescer else None
+    if flight_key is not None:
+        return await coalescer.arun(flight_key, forward)
+    return await forward()
+
+
+def _route_not_found(request):
+    return JsonResponse({'error': f'No upstream service for {request.path}'},
+                        status=status.HTTP_404_NOT_FOUND)
+
+
+def _resolve(request):
+    route = getattr(request, 'route', None)
+    if route is None:
+        route = get_route_table().resolve(request.path)
+    return route if route is not None and route.service else None
+
+
+def proxy_view():
+    """Construit la vue proxy de la passerelle selon le mode du serveur."""
+    if settings.GATEWAY_ASYNC_PROXY:
+        async def view(request):
+            route = _resolve(request)
+            if route is None:
+                return _route_not_found(request)
+            return await async_proxy(request, route)
+    else:
+        def view(request):
+            route = _resolve(request)
+            if route is None:
+                return _route_not_found(request)
+            return sync_proxy(request, route)
+
+    view.__name__ = 'gateway_proxy'
+    return csrf_exempt(view)
@@ -0,0 +1,405 @@
+"""
+Push temps réel : abonnements WebSocket et SSE aux événements des microservices.
+
+Un client s'abonne à des sujets :
+
+- ``seller.<id>.notifications`` : notifications et commandes d'un vendeur
+  (token vendeur de ce même vendeur) ;
+- ``tickets.<id>`` : tickets de support d'un demandeur (son token utilisateur
+  ou vendeur) ; ``tickets.all`` : tous les tickets (token admin) ;
+- ``stock.<product_id>`` : stock d'un produit (token utilisateur ou vendeur).
+
+Un token admin peut s'abonner à tous les sujets. Le token est vérifié comme
+sur les routes du proxy (``gateway.authentication``) ; il est lu dans
+l'en-tête ``Authorization`` ou, pour les navigateurs, dans le paramètre
+``token``, et le paramètre ``realm`` (``auth`` par défaut, ``seller`` ou
+``admin``) désigne le service qui le vérifie. Il est revérifié régulièrement
+tant que la connexion reste ouverte.
+
+- ``/ws/events/?topics=a,b`` : WebSocket ; le client envoie ensuite
+  ``{"action": "subscribe" | "unsubscribe", "topic": ...}`` ;
+- ``/api/events/stream/?topics=a,b`` : flux SSE (``text/event-stream``).
+
+Ces deux points d'entrée sont servis par ``gateway.asgi`` (serveur ASGI
+requis). Les services publient par ``POST /_gateway/events/``, route réservée
+aux appelants internes (voir gateway/internal.py), avec la clé partagée
+``X-Push-Key`` ; sans ``PUBLISH_KEY`` configurée, toute publication est
+refusée. L'événement est diffusé au groupe du sujet sur la couche de canaux,
+en mémoire (un seul processus) ou Redis (``CHANNEL_LAYER_BACKEND=redis``)
+pour relier tous les workers.
+"""
+
+import asyncio
+import hmac
+import json
+import re
+import threading
+from urllib.parse import parse_qs
+
+from asgiref.sync import async_to_sync
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+from .authentication import UNAVAILABLE, get_authenticator
+from .token_cache import INVALID
+
+DEFAULT_PUSH_SETTINGS = {
+    'PUBLISH_KEY': '',
+    'MAX_TOPICS': 20,         # abonnements par connexion
+    'HEARTBEAT': 15,          # secondes entre deux commentaires du flux SSE
+    'REVALIDATE': 300,        # secondes entre deux vérifications du token
+}
+
+EVENT_TYPE = 'push.event'
+
+_ID = r'[A-Za-z0-9_-]{1,64}'
+
+# Sujets et services d'authentification autorisés à s'y abonner ; ``owner``
+# doit être l'identifiant du client. Le premier motif reconnu s'applique.
+TOPICS = [
+    (re.compile(rf'^seller\.(?P<owner>{_ID})\.notifications$'), {'seller'}),
+    (re.compile(r'^tickets\.all$'), set()),
+    (re.compile(rf'^tickets\.(?P<owner>{_ID})$'), {'auth', 'seller'}),
+    (re.compile(rf'^stock\.{_ID}$'), {'auth', 'seller'}),
+]
+
+_stats = {'connections': 0, 'subscriptions': 0, 'published': 0, 'delivered': 0, 'rejected': 0}
+_stats_lock = threading.Lock()
+
+
+def get_push_settings():
+    config = dict(DEFAULT_PUSH_SETTINGS)
+    config.update(getattr(settings, 'PUSH', {}))
+    return config
+
+
+def _count(key, amount=1):
+    with _stats_lock:
+        _stats[key] += amount
+
+
+def push_stats():
+    """Connexions et abonnements ouverts, événements publiés et remis (ce processus)."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def group_name(topic):
+    return f'push.{topic}'
+
+
+def _match(topic):
+    for pattern, realms in TOPICS:
+        match = pattern.match(topic)
+        if match:
+            return match, realms
+    return None, None
+
+
+def authorize(realm, identity, topic):
+    """Retourne ``None`` si le client peut s'abonner à ``topic``, sinon l'erreur."""
+    match, realms = _match(topic)
+    if match is None:
+        return 'Unknown topic'
+    if realm == 'admin':
+        return None
+    owner = match.groupdict().get('owner')
+    if realm not in realms or (owner is not None and owner != str(identity.get('id'))):
+        return 'Not allowed to subscribe to this topic'
+    return None
+
+
+def _header(scope, name):
+    for key, value in scope.get('headers', []):
+        if key == name:
+            return value.decode('latin-1')
+    return None
+
+
+def _credentials(scope):
+    """Token, service d'authentification et sujets demandés à l'ouverture."""
+    query = {key: values[-1] for key, values in
+             parse_qs(scope.get('query_string', b'').decode('latin-1')).items()}
+    header = _header(scope, b'authorization') or ''
+    token = header.split(' ', 1)[1].strip() if ' ' in header else query.get('token')
+    topics = [topic for topic in query.get('topics', '').split(',') if topic]
+    return token, query.get('realm', 'auth'), topics
+
+
+def _origin_allowed(scope):
+    origin = _header(scope, b'origin')
+    # Client hors navigateur : seul le token compte
+    if origin is None:
+        return True
+    return (origin in settings.CORS_ALLOWED_ORIGINS
+            or origin.split('://', 1)[-1] == _header(scope, b'host'))
+
+
+async def authenticate(token, realm):
+    """Retourne ``(identité, None)`` ou ``(None, (statut HTTP, erreur))``."""
+    if not token:
+        return None, (401, 'No authorization token provided')
+    if realm not in settings.TOKEN_VERIFY_URLS:
+        return None, (400, 'Invalid authentication realm')
+    identity = await get_authenticator().aidentify(realm, token)
+    if identity is UNAVAILABLE:
+        return None, (503, 'Invalid token or authentication service unavailable')
+    if identity is INVALID:
+        return None, (401, 'Invalid or expired token')
+    return identity or {}, None
+
+
+class Subscriber:
+    """Abonnements d'une connexion, sur son canal de la couche de canaux."""
+
+    def __init__(self, layer, channel, realm, token, identity, max_topics):
+        self.layer = layer
+        self.channel = channel
+        self.realm = realm
+        self.token = token
+        self.identity = identity
+        self.max_topics = max_topics
+        self.topics = set()
+
+    async def subscribe(self, topic):
+        """Retourne ``None`` une fois abonné, sinon l'erreur."""
+        if topic in self.topics:
+            return None
+        error = authorize(self.realm, self.identity, topic)
+        if error is None and len(self.topics) >= self.max_topics:
+            error = 'Too many subscriptions'
+        if error is not None:
+            _count('rejected')
+            return error
+        await self.layer.group_add(group_name(topic), self.channel)
+        self.topics.add(topic)
+        _count('subscriptions')
+        return None
+
+    async def unsubscribe(self, topic):
+        if topic in self.topics:
+            self.topics.discard(topic)
+            _count('subscriptions', -1)
+            await self.layer.group_discard(group_name(topic), self.channel)
+
+    async def close(self):
+        for topic in list(self.topics):
+            await self.unsubscribe(topic)
+
+    async def still_valid(self):
+        # Service injoignable : la connexion est gardée jusqu'à la vérification suivante
+        identity = await get_authenticator().aidentify(self.realm, self.token)
+        return identity is not INVALID
+
+
+def _event_message(message):
+    return {'type': 'event', 'topic': message['topic'], 'event': message['event'],
+            'data': message.get('data')}
+
+
+class PushConsumer(AsyncJsonWebsocketConsumer):
+    """WebSocket ``/ws/events/`` : abonnements et réception des événements."""
+
+    subscriber = None
+    watcher = None
+
+    async def connect(self):
+        if not _origin_allowed(self.scope):
+            # Handshake refusé (403)
+            await self.close()
+            return
+        token, realm, topics = _credentials(self.scope)
+        identity, error = await authenticate(token, realm)
+        await self.accept()
+        if error is not None:
+            # Codes 4xxx : le statut HTTP équivalent, lisible par le client
+            await self.send_json({'type': 'error', 'error': error[1]})
+            await self.close(code=4000 + error[0])
+            return
+
+        config = get_push_settings()
+        self.subscriber = Subscriber(self.channel_layer, self.channel_name, realm, token,
+                                     identity, config['MAX_TOPICS'])
+        _count('connections')
+        for topic in topics:
+            await self._subscribe(topic)
+        self.watcher = asyncio.create_task(self._revalidate(config['REVALIDATE']))
+
+    async def _subscribe(self, topic):
+        error = await self.subscriber.subscribe(topic)
+        if error is None:
+            await self.send_json({'type': 'subscribed', 'topic': topic})
+        else:
+            await self.send_json({'type': 'error', 'topic': topic, 'error': error})
+
+    async def _revalidate(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            if not await self.subscriber.still_valid():
+                await self.close(code=4401)
+                return
+
+    async def receive_json(self, content, **kwargs):
+        if self.subscriber is None:
+            return
+        action = content.get('action') if isinstance(content, dict) else None
+        topic = content.get('topic') if isinstance(content, dict) else None
+        if action not in ('subscribe', 'unsubscribe') or not isinstance(topic, str):
+            await self.send_json({'type': 'error',
+                                  'error': 'Expected {"action": "subscribe"|"unsubscribe", "topic": ...}'})
+        elif action == 'subscribe':
+            await self._subscribe(topic)
+        else:
+            await self.subscriber.unsubscribe(topic)
+            await self.send_json({'type': 'unsubscribed', 'topic': topic})
+
+    async def decode_json(self, text_data):
+        try:
+            return await super().decode_json(text_data)
+        except ValueError:
+            return None
+
+    async def push_event(self, message):
+        await self.send_json(_event_message(message))
+        _count('delivered')
+
+    async def disconnect(self, code):
+        if self.watcher is not None:
+            self.watcher.cancel()
+        if self.subscriber is not None:
+            await self.subscriber.close()
+            self.subscriber = None
+            _count('connections', -1)
+
+
+async def _wait_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def _send_json(send, status, payload, headers):
+    body = json.dumps(payload).encode()
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', b'application/json')] + headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+class EventStream:
+    """Flux SSE ``/api/events/stream/`` des sujets de ``?topics=`` (application ASGI)."""
+
+    async def __call__(self, scope, receive, send):
+        origin = _header(scope, b'origin')
+        cors = ([(b'access-control-allow-origin', origin.encode())]
+                if origin in settings.CORS_ALLOWED_ORIGINS else [])
+        if scope['method'] != 'GET':
+            return await _send_json(send, 405, {'error': 'Event streams use GET'}, cors)
+        token, realm, topics = _credentials(scope)
+        identity, error = await authenticate(token, realm)
+        if error is not None:
+            return await _send_json(send, error[0], {'error': error[1]}, cors)
+        if not topics:
+            return await _send_json(send, 400, {'error': 'Expected a "topics" query parameter'},
+                                    cors)
+
+        config = get_push_settings()
+        layer = get_channel_layer()
+        subscriber = Subscriber(layer, await layer.new_channel(), realm, token, identity,
+                                config['MAX_TOPICS'])
+        try:
+            for topic in topics:
+                error = await subscriber.subscribe(topic)
+                if error is not None:
+                    return await _send_json(send, 403, {'error': error, 'topic': topic}, cors)
+            await send({'type': 'http.response.start', 'status': 200, 'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                # Pas de mise en tampon par un reverse proxy (nginx)
+                (b'x-accel-buffering', b'no'),
+            ] + cors})
+            _count('connections')
+            try:
+                await self._stream(subscriber, receive, send, config)
+            finally:
+                _count('connections', -1)
+        finally:
+            await subscriber.close()
+
+    async def _stream(self, subscriber, receive, send, config):
+        loop = asyncio.get_running_loop()
+        disconnected = asyncio.ensure_future(_wait_disconnect(receive))
+        incoming = None
+        revalidate_at = loop.time() + config['REVALIDATE']
+        try:
+            await send({'type': 'http.response.body', 'body': b': connected\n\n', 'more_body': True})
+            while True:
+                if incoming is None:
+                    incoming = asyncio.ensure_future(subscriber.layer.receive(subscriber.channel))
+                done, _ = await asyncio.wait({incoming, disconnected}, timeout=config['HEARTBEAT'],
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if disconnected in done:
+                    return
+                if incoming in done:
+                    message = _event_message(incoming.result())
+                    incoming = None
+                    chunk = f"event: {message['event']}\ndata: {json.dumps(message)}\n\n"
+                    _count('delivered')
+                else:
+                    # Commentaire : garde la connexion ouverte à travers les proxys
+                    chunk = ': ping\n\n'
+                    if loop.time() >= revalidate_at:
+                        revalidate_at = loop.time() + config['REVALIDATE']
+                        if not await subscriber.still_valid():
+                            return
+                await send({'type': 'http.response.body', 'body': chunk.encode(),
+                            'more_body': True})
+        finally:
+            for task in (incoming, disconnected):
+                if task is not None:
+                    task.cancel()
+
+
+def _parse_event(request):
+    """Événement publié par un service, ou la réponse d'erreur."""
+    key = get_push_settings()['PUBLISH_KEY']
+    given = request.headers.get('X-Push-Key', '')
+    if not key or not hmac.compare_digest(given.encode(), key.encode()):
+        return None, JsonResponse({'error': 'Invalid publish key'}, status=403)
+    try:
+        payload = json.loads(request.body)
+    except ValueError:
+        payload = None
+    if (not isinstance(payload, dict) or not isinstance(payload.get('topic'), str)
+            or _match(payload['topic'])[0] is None
+            or not isinstance(payload.get('event'), str) or not payload['event']):
+        return None, JsonResponse(
+            {'error': 'Expected a JSON object with a known "topic" and an "event"'}, status=400
+        )
+    return {'type': EVENT_TYPE, 'topic': payload['topic'], 'event': payload['event'],
+            'data': payload.get('data')}, None
+
+
+def publish_view():
+    """Construit la vue de publication selon le mode du serveur."""
+    if settings.GATEWAY_ASYNC_PROXY:
+        async def view(request):
+            message, error = _parse_event(request)
+            if error is not None:
+                return error
+            await get_channel_layer().group_send(group_name(message['topic']), message)
+            _count('published')
+            return JsonResponse({'published': message['topic']}, status=202)
+    else:
+        def view(request):
+            message, error = _parse_event(request)
+            if error is not None:
+                return error
+            async_to_sync(get_channel_layer().group_send)(group_name(message['topic']), message)
+            _count('published')
+            return JsonResponse({'published': message['topic']}, status=202)
+
+    view.__name__ = 'publish_event'
+    return csrf_exempt(require_POST(view))
@@ -0,0 +1,250 @@
+"""
+Limitation de débit de la passerelle par seaux à jetons.
+
+Chaque règle définit un débit (jetons par seconde) et une rafale maximale
+(capacité du seau), et une portée :
+
+- ``ip`` : un seau par adresse du client ;
+- ``user`` : un seau par utilisateur authentifié (``request.user_id``) ;
+- ``route`` : un seau partagé par tous les clients de la route.
+
+Les règles globales sont dans ``settings.RATE_LIMITS['RULES']`` ; une route de
+``settings.GATEWAY_ROUTES`` peut ajouter les siennes (``RATE_LIMIT``).
+
+Les portées ``ip`` et ``route`` sont contrôlées avant l'authentification (dès
+le routage), pour qu'un afflux de tokens invalides n'atteigne pas la
+vérification amont ; la portée ``user`` l'est une fois l'utilisateur connu.
+Une requête n'est admise que si tous ses seaux ont un jeton, et n'en consomme
+aucun si l'un d'eux la refuse. L'état
+des seaux vit en mémoire du processus (``memory``) ou, pour partager les
+limites entre les workers, dans Redis (``redis``, paquet optionnel).
+"""
+
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RATE_LIMIT_SETTINGS = {
+    'ENABLED': True,
+    'BACKEND': 'memory',
+    'REDIS_URL': 'redis://localhost:6379/0',
+    'MAX_KEYS': 100000,                 # seaux conservés en mémoire (éviction LRU)
+    'TRUST_X_FORWARDED_FOR': False,     # derrière un proxy de confiance uniquement
+    'RULES': [],
+}
+
+SCOPES = ('ip', 'user', 'route')
+PRE_AUTH_SCOPES = ('ip', 'route')
+POST_AUTH_SCOPES = ('user',)
+
+
+class RateLimitRule:
+    def __init__(self, scope, rate, burst, name):
+        if scope not in SCOPES:
+            raise ImproperlyConfigured(f"Unknown rate limit scope: {scope}")
+        self.scope = scope
+        self.rate = rate
+        self.burst = burst
+        self.name = name
+
+    @classmethod
+    def from_setting(cls, entry, name):
+        return cls(entry['KEY'], entry['RATE'], entry.get('BURST', entry['RATE']), name)
+
+
+class MemoryBackend:
+    """Seaux du processus courant, bornés en nombre."""
+
+    blocking = False
+
+    def __init__(self, max_keys):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # clé -> (jetons, horodatage)
+        self._lock = threading.Lock()
+
+    def take(self, buckets):
+        """Consomme un jeton de chaque seau ``(clé, débit, rafale)`` si tous en ont un.
+
+        Retourne l'attente de chaque seau en secondes : toutes nulles si la
+        requête est admise ; sinon rien n'est consommé.
+        """
+        now = time.monotonic()
+        with self._lock:
+            levels = []
+            for key, rate, burst in buckets:
+                tokens, updated_at = self._buckets.pop(key, (burst, now))
+                levels.append(min(burst, tokens + (now - updated_at) * rate))
+            waits = [0.0 if tokens >= 1 else (1 - tokens) / rate
+                     for tokens, (_, rate, _) in zip(levels, buckets)]
+            admitted = not any(waits)
+            for tokens, (key, _, _) in zip(levels, buckets):
+                self._buckets[key] = (tokens - 1 if admitted else tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return waits
+
+
+# Seaux à jetons atomiques côté Redis : KEYS = seaux, ARGV = maintenant puis
+# (débit, rafale) de chaque seau. Tous consomment un jeton, ou aucun.
+TOKEN_BUCKET_SCRIPT = """
+local now = tonumber(ARGV[1])
+local levels = {}
+local waits = {}
+local admitted = true
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[2 * i])
+    local burst = tonumber(ARGV[2 * i + 1])
+    local bucket = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(bucket[1]) or burst
+    local ts = tonumber(bucket[2]) or now
+    tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+    levels[i] = tokens
+    waits[i] = '0'
+    if tokens < 1 then
+        waits[i] = tostring((1 - tokens) / rate)
+        admitted = false
+    end
+end
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[2 * i])
+    local burst = tonumber(ARGV[2 * i + 1])
+    local tokens = levels[i]
+    if admitted then
+        tokens = tokens - 1
+    end
+    redis.call('HSET', key, 'tokens', tokens, 'ts', now)
+    redis.call('EXPIRE', key, math.ceil(burst / rate) + 1)
+end
+return waits
+"""
+
+
+class RedisBackend:
+    """Seaux partagés par tous les workers de la passerelle."""
+
+    blocking = True
+
+    def __init__(self, url):
+        try:
+            import redis
+        except ImportError:
+            raise ImproperlyConfigured("RATE_LIMITS['BACKEND'] = 'redis' requires the redis package")
+        self._client = redis.Redis.from_url(url, socket_timeout=0.05)
+        self._script = self._client.register_script(TOKEN_BUCKET_SCRIPT)
+        self._errors = (redis.RedisError,)
+
+    def take(self, buckets):
+        args = [time.time()]
+        for _, rate, burst in buckets:
+            args += [rate, burst]
+        try:
+            waits = self._script(keys=[f'ratelimit:{key}' for key, _, _ in buckets], args=args)
+            return [float(wait) for wait in waits]
+        except self._errors as e:
+            # Redis indisponible : on laisse passer plutôt que de bloquer tout le trafic
+            logger.warning("Rate limit backend unavailable: %s", e)
+            return [0.0] * len(buckets)
+
+
+class RateLimiter:
+    def __init__(self, backend, rules, trust_forwarded_for):
+        self.backend = backend
+        self.rules = rules
+        self.trust_forwarded_for = trust_forwarded_for
+        self._route_rules = {}
+        self._throttled = {}
+        self._lock = threading.Lock()
+
+    def client_ip(self, request):
+        if self.trust_forwarded_for and 'X-Forwarded-For' in request.headers:
+            return request.headers['X-Forwarded-For'].split(',')[0].strip()
+        return request.META.get('REMOTE_ADDR', '')
+
+    def _rules_for(self, route):
+        if route is None:
+            return self.rules
+        rules = self._route_rules.get(route.prefix)
+        if rules is None:
+            entries = route.rate_limit or []
+            rules = self.rules + [
+                RateLimitRule.from_setting(entry, f'{route.prefix}#{index}:{entry["KEY"]}')
+                for index, entry in enumerate(entries)
+            ]
+            self._route_rules[route.prefix] = rules
+        return rules
+
+    def _key(self, rule, request):
+        if rule.scope == 'ip':
+            subject = self.client_ip(request)
+        elif rule.scope == 'user':
+            subject = getattr(request, 'user_id', None)
+            if subject is None:
+                return None
+        else:
+            subject = '*'
+        return f'{rule.name}:{subject}'
+
+    def check(self, request, route, scopes=SCOPES):
+        """Retourne ``None`` si la requête passe, sinon le délai ``Retry-After`` en secondes.
+
+        Seules les règles des portées ``scopes`` sont appliquées.
+        """
+        rules = []
+        buckets = []
+        for rule in self._rules_for(route):
+            if rule.scope not in scopes:
+                continue
+            key = self._key(rule, request)
+            if key is not None:
+                rules.append(rule)
+                buckets.append((key, rule.rate, rule.burst))
+        if not buckets:
+            return None
+        waits = self.backend.take(buckets)
+        if not any(waits):
+            return None
+        with self._lock:
+            for rule, wait in zip(rules, waits):
+                if wait > 0:
+                    self._throttled[rule.name] = self._throttled.get(rule.name, 0) + 1
+        return max(1, math.ceil(max(waits)))
+
+    def stats(self):
+        with self._lock:
+            return {'throttled': dict(self._throttled)}
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """Retourne le limiteur du processus, ou ``None`` si la limitation est désactivée."""
+    global _limiter
+    config = dict(DEFAULT_RATE_LIMIT_SETTINGS)
+    config.update(getattr(settings, 'RATE_LIMITS', {}))
+    if not config['ENABLED']:
+        return None
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                if config['BACKEND'] == 'redis':
+                    backend = RedisBackend(config['REDIS_URL'])
+                elif config['BACKEND'] == 'memory':
+                    backend = MemoryBackend(config['MAX_KEYS'])
+                else:
+                    raise ImproperlyConfigured(f"Unknown rate limit backend: {config['BACKEND']}")
+                _limiter = RateLimiter(
+                    backend=backend,
+                    rules=[RateLimitRule.from_setting(entry, f'global#{index}:{entry["KEY"]}')
+                           for index, entry in enumerate(config['RULES'])],
+                    trust_forwarded_for=config['TRUST_X_FORWARDED_FOR'],
+                )
+    return _limiter
@@ -0,0 +1,231 @@
+"""
+Protection de la passerelle contre un microservice lent ou défaillant.
+
+Chaque entrée de ``settings.MICROSERVICES`` dispose :
+
+- d'un compartiment (« bulkhead ») qui borne le nombre d'appels simultanés
+  vers le service : au-delà, la requête est refusée aussitôt au lieu
+  d'immobiliser un worker de plus ;
+- d'un disjoncteur qui s'ouvre quand, sur une fenêtre glissante, le taux
+  d'échecs (erreur réseau, délai dépassé, statut 5xx) ou d'appels lents
+  dépasse son seuil. Ouvert, il répond 503 sans appeler le service ; après
+  ``OPEN_DURATION`` secondes il laisse passer quelques appels d'essai
+  (semi-ouvert) et se referme s'ils réussissent tous.
+
+Les délais de connexion et de lecture sont ceux de ``settings.UPSTREAM_POOL``.
+"""
+
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+
+DEFAULT_RESILIENCE_SETTINGS = {
+    'MAX_CONCURRENT': 100,            # appels simultanés vers le service
+    'WINDOW': 30,                     # secondes de la fenêtre glissante
+    'MIN_CALLS': 20,                  # appels minimum avant de juger le service
+    'FAILURE_RATE_THRESHOLD': 0.5,
+    'SLOW_CALL_DURATION': 5,          # secondes au-delà desquelles un appel est lent
+    'SLOW_CALL_RATE_THRESHOLD': 0.8,
+    'OPEN_DURATION': 15,              # secondes avant les appels d'essai
+    'HALF_OPEN_CALLS': 3,
+}
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# Motifs de refus
+CIRCUIT_OPEN = 'circuit_open'
+BULKHEAD_FULL = 'bulkhead_full'
+
+
+def get_resilience_settings(service):
+    """Retourne la configuration de résilience d'un service."""
+    config = getattr(settings, 'RESILIENCE', {})
+    merged = dict(DEFAULT_RESILIENCE_SETTINGS)
+    merged.update({key: value for key, value in config.items() if key != 'SERVICES'})
+    merged.update(config.get('SERVICES', {}).get(service, {}))
+    return merged
+
+
+class CircuitBreaker:
+    def __init__(self, window, min_calls, failure_rate_threshold, slow_call_duration,
+                 slow_call_rate_threshold, open_duration, half_open_calls):
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_duration = slow_call_duration
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.open_duration = open_duration
+        self.half_open_calls = half_open_calls
+        self.state = CLOSED
+        self._calls = deque()  # (horodatage, échec, lent)
+        self._opened_at = 0.0
+        self._probes = 0
+        self._probe_successes = 0
+        self._lock = threading.Lock()
+        self.times_opened = 0
+        self.rejected = 0
+
+    def allow(self):
+        """Indique si un appel peut partir ; réserve un essai en semi-ouvert."""
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() - self._opened_at < self.open_duration:
+                    self.rejected += 1
+                    return False
+                self.state = HALF_OPEN
+                self._probes = 0
+                self._probe_successes = 0
+            if self.state == HALF_OPEN:
+                if self._probes >= self.half_open_calls:
+                    self.rejected += 1
+                    return False
+                self._probes += 1
+            return True
+
+    def cancel(self):
+        """Rend l'essai réservé par ``allow`` pour un appel qui n'est pas parti."""
+        with self._lock:
+            if self.state == HALF_OPEN and self._probes:
+                self._probes -= 1
+
+    def record(self, success, duration):
+        now = time.monotonic()
+        slow = duration >= self.slow_call_duration
+        with self._lock:
+            if self.state == HALF_OPEN:
+                if not success or slow:
+                    self._open(now)
+                else:
+                    self._probe_successes += 1
+                    if self._probe_successes >= self.half_open_calls:
+                        self.state = CLOSED
+                        self._calls.clear()
+                return
+            if self.state == OPEN:
+                return
+
+            self._calls.append((now, not success, slow))
+            while self._calls and self._calls[0][0] < now - self.window:
+                self._calls.popleft()
+            total = len(self._calls)
+            if total < self.min_calls:
+                return
+            failures = sum(1 for _, failed, _ in self._calls if failed)
+            slow_calls = sum(1 for _, _, is_slow in self._calls if is_slow)
+            if (failures / total >= self.failure_rate_threshold
+                    or slow_calls / total >= self.slow_call_rate_threshold):
+                self._open(now)
+
+    def _open(self, now):
+        self.state = OPEN
+        self._opened_at = now
+        self._calls.clear()
+        self.times_opened += 1
+
+    def retry_after(self):
+        """Secondes restantes avant les prochains appels d'essai."""
+        with self._lock:
+            remaining = self.open_duration - (time.monotonic() - self._opened_at)
+        return max(1, int(remaining + 0.999))
+
+
+class Bulkhead:
+    """Compteur d'appels en vol ; utilisable depuis des threads comme depuis asyncio."""
+
+    def __init__(self, max_concurrent):
+        self.max_concurrent = max_concurrent
+        self.in_flight = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def try_acquire(self):
+        with self._lock:
+            if self.in_flight >= self.max_concurrent:
+                self.rejected += 1
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+
+
+class UpstreamGuard:
+    """Disjoncteur et compartiment d'un microservice."""
+
+    def __init__(self, name, breaker, bulkhead):
+        self.name = name
+        self.breaker = breaker
+        self.bulkhead = bulkhead
+
+    def enter(self):
+        """Retourne ``None`` si l'appel peut partir, sinon le motif du refus."""
+        if not self.breaker.allow():
+            return CIRCUIT_OPEN
+        if not self.bulkhead.try_acquire():
+            # L'appel n'a pas eu lieu : l'essai réservé est rendu sans être jugé
+            self.breaker.cancel()
+            return BULKHEAD_FULL
+        return None
+
+    def exit(self, success, duration):
+        """À appeler une fois les en-têtes de réponse reçus (ou l'appel échoué)."""
+        self.bulkhead.release()
+        self.breaker.record(success, duration)
+
+    def abandon(self):
+        """Appel interrompu côté passerelle (client parti) : rien à imputer au service."""
+        self.bulkhead.release()
+        self.breaker.cancel()
+
+    def retry_after(self, reason):
+        return self.breaker.retry_after() if reason == CIRCUIT_OPEN else 1
+
+    def stats(self):
+        return {
+            'state': self.breaker.state,
+            'times_opened': self.breaker.times_opened,
+            'rejected_open': self.breaker.rejected,
+            'in_flight': self.bulkhead.in_flight,
+            'max_concurrent': self.bulkhead.max_concurrent,
+            'rejected_full': self.bulkhead.rejected,
+        }
+
+
+_guards = {}
+_guards_lock = threading.Lock()
+
+
+def get_guard(service):
+    """Retourne le disjoncteur et le compartiment partagés d'un service."""
+    guard = _guards.get(service)
+    if guard is not None:
+        return guard
+    with _guards_lock:
+        guard = _guards.get(service)
+        if guard is None:
+            config = get_resilience_settings(service)
+            guard = UpstreamGuard(
+                name=service,
+                breaker=CircuitBreaker(
+                    window=config['WINDOW'],
+                    min_calls=config['MIN_CALLS'],
+                    failure_rate_threshold=config['FAILURE_RATE_THRESHOLD'],
+                    slow_call_duration=config['SLOW_CALL_DURATION'],
+                    slow_call_rate_threshold=config['SLOW_CALL_RATE_THRESHOLD'],
+                    open_duration=config['OPEN_DURATION'],
+                    half_open_calls=config['HALF_OPEN_CALLS'],
+                ),
+                bulkhead=Bulkhead(config['MAX_CONCURRENT']),
+            )
+            _guards[service] = guard
+        return guard
+
+
+def guards_stats():
+    return {service: get_guard(service).stats() for service in settings.MICROSERVICES}
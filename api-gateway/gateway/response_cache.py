@@ -0,0 +1,223 @@
+"""
+Cache de réponses partagé pour les GET anonymes (catalogue public).
+
+Seules les requêtes GET sans en-tête ``Authorization`` vers une route dont
+l'entrée de ``settings.GATEWAY_ROUTES`` porte une politique ``CACHE`` sont mises
+en cache, avec le TTL et la fenêtre ``stale-while-revalidate`` de la route. Pendant cette fenêtre la
+copie périmée est servie immédiatement et rafraîchie en arrière-plan (en
+revalidant par ``If-None-Match`` auprès du service). Le cache est borné en
+octets (éviction LRU) et répond ``304`` aux clients dont l'``If-None-Match``
+correspond. Une requête POST/PUT/DELETE réussie sur une route purge ses entrées.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+
+DEFAULT_RESPONSE_CACHE_SETTINGS = {
+    'ENABLED': True,
+    'MAX_BYTES': 64 * 1024 * 1024,
+    'MAX_ENTRY_BYTES': 1024 * 1024,
+}
+
+# Surcoût mémoire approximatif d'une entrée, en plus de son corps
+ENTRY_OVERHEAD = 512
+
+FRESH = 'HIT'
+STALE = 'STALE'
+MISS = 'MISS'
+
+
+class CachePolicy:
+    def __init__(self, prefix, ttl, stale_while_revalidate=0):
+        self.prefix = prefix
+        self.ttl = ttl
+        self.stale_while_revalidate = stale_while_revalidate
+
+
+class CacheEntry:
+    def __init__(self, status, headers, body, etag, policy):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.etag = etag
+        self.policy = policy
+        self.size = len(body) + ENTRY_OVERHEAD
+        self.refresh()
+
+    def refresh(self):
+        self.stored_at = time.monotonic()
+        self.fresh_until = self.stored_at + self.policy.ttl
+        self.stale_until = self.fresh_until + self.policy.stale_while_revalidate
+
+
+def _etag_matches(if_none_match, etag):
+    if if_none_match.strip() == '*':
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    # Comparaison faible (RFC 9110 §13.1.2)
+    weak = etag[2:] if etag.startswith('W/') else etag
+    return any((tag[2:] if tag.startswith('W/') else tag) == weak for tag in candidates)
+
+
+class ResponseCache:
+    def __init__(self, max_bytes, max_entry_bytes):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'stale_hits': 0,
+            'misses': 0,
+            'not_modified': 0,
+            'stores': 0,
+            'evictions': 0,
+            'revalidations': 0,
+            'bytes_served': 0,
+            'bytes_saved': 0,
+        }
+
+    @staticmethod
+    def policy_for(request, route):
+        """Politique applicable à la requête, ou ``None`` si elle n'est pas cacheable."""
+        if request.method != 'GET' or 'Authorization' in request.headers:
+            return None
+        return route.cache
+
+    @staticmethod
+    def key_for(request):
+        # L'encodage fait partie de la clé : le corps amont est relayé compressé ou non
+        return (request.get_full_path(), request.headers.get('Accept-Encoding', ''))
+
+    def lookup(self, key):
+        """Retourne ``(entrée, FRESH|STALE)`` ou ``(None, None)``."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None, None
+            if now >= entry.stale_until:
+                self._remove(key)
+                self._stats['misses'] += 1
+                return None, None
+            self._entries.move_to_end(key)
+            if now < entry.fresh_until:
+                self._stats['hits'] += 1
+                return entry, FRESH
+            self._stats['stale_hits'] += 1
+            return entry, STALE
+
+    def is_storable(self, status, headers, length):
+        if status != 200 or length is None or length > self.max_entry_bytes:
+            return False
+        if 'Set-Cookie' in headers:
+            return False
+        cache_control = headers.get('Cache-Control', '').lower()
+        return 'no-store' not in cache_control and 'private' not in cache_control
+
+    def store(self, key, status, headers, body, policy):
+        etag = headers.get('ETag') or '"%s"' % hashlib.blake2b(body, digest_size=16).hexdigest()
+        headers = dict(headers, ETag=etag)
+        entry = CacheEntry(status, headers, body, etag, policy)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = entry
+            self._size += entry.size
+            self._stats['stores'] += 1
+            while self._size > self.max_bytes and self._entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._stats['evictions'] += 1
+        return entry
+
+    def revalidated(self, key):
+        """L'amont a confirmé la copie (304) : elle redevient fraîche."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.refresh()
+                self._stats['revalidations'] += 1
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= entry.size
+
+    def invalidate(self, policy):
+        """Purge les entrées d'une route après une écriture."""
+        with self._lock:
+            for key in [key for key in self._entries if key[0].startswith(policy.prefix)]:
+                self._remove(key)
+
+    def begin_refresh(self, key):
+        """Réserve le rafraîchissement d'une entrée ; faux s'il est déjà en cours."""
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def end_refresh(self, key):
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def respond(self, request, entry, state):
+        """Réponse au client depuis le cache : 304 si son ETag correspond, sinon 200."""
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match and _etag_matches(if_none_match, entry.etag):
+            response = HttpResponseNotModified()
+            for header in ('ETag', 'Cache-Control', 'Expires', 'Vary', 'Last-Modified'):
+                if header in entry.headers:
+                    response[header] = entry.headers[header]
+            with self._lock:
+                self._stats['not_modified'] += 1
+                self._stats['bytes_saved'] += len(entry.body)
+        else:
+            response = HttpResponse(entry.body, status=entry.status)
+            for header, value in entry.headers.items():
+                response[header] = value
+            with self._lock:
+                self._stats['bytes_served'] += len(entry.body)
+                if state != MISS:
+                    self._stats['bytes_saved'] += len(entry.body)
+        response['Age'] = str(int(time.monotonic() - entry.stored_at))
+        response['X-Cache'] = state
+        return response
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+            stats['size_bytes'] = self._size
+        lookups = stats['hits'] + stats['stale_hits'] + stats['misses']
+        stats['hit_ratio'] = (stats['hits'] + stats['stale_hits']) / lookups if lookups else 0.0
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Retourne le cache du processus, ou ``None`` s'il est désactivé."""
+    global _cache
+    config = dict(DEFAULT_RESPONSE_CACHE_SETTINGS)
+    config.update(getattr(settings, 'RESPONSE_CACHE', {}))
+    if not config['ENABLED']:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache(
+                    max_bytes=config['MAX_BYTES'],
+                    max_entry_bytes=config['MAX_ENTRY_BYTES'],
+                )
+    return _cache
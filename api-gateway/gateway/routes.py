@@ -0,0 +1,110 @@
+"""
+Table de routage déclarative de la passerelle.
+
+``settings.GATEWAY_ROUTES`` décrit chaque préfixe d'URL : service amont,
+service qui vérifie le token (``AUTH``, ``None`` pour une route publique),
+politique du cache de réponses (``CACHE``), délai de lecture amont
+(``TIMEOUT``), limites de débit propres à la route (``RATE_LIMIT``),
+requêtes couvertes (``HEDGE``, voir ``gateway.hedging``) et accès réservé
+aux appelants internes (``INTERNAL``, voir ``gateway.internal``). La
+table est compilée une fois en un arbre de préfixes par segment de chemin ;
+``resolve`` renvoie la route du plus long préfixe correspondant en une seule
+descente, quel que soit le nombre de routes.
+"""
+
+import threading
+
+from django.conf import settings
+
+from .hedging import HedgePolicy
+from .response_cache import CachePolicy
+
+
+class Route:
+    def __init__(self, prefix, service=None, auth=None, cache=None, timeout=None,
+                 rate_limit=None, hedge=None, internal=False):
+        self.prefix = prefix
+        self.service = service
+        self.auth = auth
+        self.cache = cache
+        self.timeout = timeout
+        self.rate_limit = rate_limit
+        self.hedge = hedge
+        self.internal = internal
+
+    @property
+    def is_public(self):
+        return self.auth is None
+
+    def __repr__(self):
+        return f'<Route {self.prefix} -> {self.service}>'
+
+
+def _segments(path):
+    return [segment for segment in path.split('/') if segment]
+
+
+class _Node:
+    __slots__ = ('children', 'route')
+
+    def __init__(self):
+        self.children = {}
+        self.route = None
+
+
+class RouteTable:
+    def __init__(self, routes):
+        self._root = _Node()
+        self.routes = []
+        for route in routes:
+            self.add(route)
+
+    def add(self, route):
+        node = self._root
+        for segment in _segments(route.prefix):
+            node = node.children.setdefault(segment, _Node())
+        if node.route is not None:
+            raise ValueError(f"Duplicate gateway route for {route.prefix}")
+        node.route = route
+        self.routes.append(route)
+
+    def resolve(self, path):
+        """Route du plus long préfixe de ``path``, ou ``None``."""
+        node = self._root
+        match = node.route
+        for segment in _segments(path):
+            node = node.children.get(segment)
+            if node is None:
+                break
+            if node.route is not None:
+                match = node.route
+        return match
+
+
+def build_route(entry):
+    cache = entry.get('CACHE')
+    return Route(
+        prefix=entry['PREFIX'],
+        service=entry.get('SERVICE'),
+        auth=entry.get('AUTH'),
+        cache=CachePolicy(entry['PREFIX'], cache['TTL'], cache.get('STALE_WHILE_REVALIDATE', 0))
+        if cache else None,
+        timeout=entry.get('TIMEOUT'),
+        rate_limit=entry.get('RATE_LIMIT'),
+        hedge=HedgePolicy.from_setting(entry.get('HEDGE')),
+        internal=entry.get('INTERNAL', False),
+    )
+
+
+_table = None
+_table_lock = threading.Lock()
+
+
+def get_route_table():
+    """Retourne la table compilée depuis ``settings.GATEWAY_ROUTES``."""
+    global _table
+    if _table is None:
+        with _table_lock:
+            if _table is None:
+                _table = RouteTable(build_route(entry) for entry in settings.GATEWAY_ROUTES)
+    return _table
@@ -4,9 +4,13 @@ Django settings for gateway project.
 
 from pathlib import Path
 import os
+import sys
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Modules communs à la passerelle et aux services (shared/tracing.py)
+sys.path.insert(0, str(BASE_DIR.parent))
+
 SECRET_KEY = 'django-insecure-your-secret-key-here'
 
 DEBUG = True
@@ -26,7 +30,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'gateway.middleware.tracing.TracingMiddleware',
+    'gateway.middleware.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'gateway.middleware.compression.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -34,8 +41,12 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'gateway.middleware.auth.AuthMiddleware',
     'gateway.middleware.routing.RoutingMiddleware',
+    'gateway.middleware.internal.InternalOnlyMiddleware',
+    # ip et route avant la vérification des tokens, user une fois l'utilisateur connu
+    'gateway.middleware.rate_limit.RateLimitMiddleware',
+    'gateway.middleware.auth.AuthMiddleware',
+    'gateway.middleware.rate_limit.UserRateLimitMiddleware',
 ]
 
 ROOT_URLCONF = 'gateway.urls'
@@ -59,11 +70,24 @@ TEMPLATES = [
 WSGI_APPLICATION = 'gateway.wsgi.application'
 ASGI_APPLICATION = 'gateway.asgi.application'
 
-CHANNEL_LAYERS = {
-    'default': {
-        'BACKEND': 'channels.layers.InMemoryChannelLayer',
-    },
-}
+# Couche de canaux du push temps réel (voir gateway/push.py). En mémoire, un
+# événement n'atteint que les abonnés du processus qui l'a reçu ; 'redis'
+# (paquet channels_redis requis) le diffuse à tous les workers de la passerelle.
+if os.environ.get('CHANNEL_LAYER_BACKEND', 'memory') == 'redis':
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.pubsub.RedisPubSubChannelLayer',
+            'CONFIG': {
+                'hosts': [os.environ.get('CHANNEL_LAYER_REDIS_URL', 'redis://localhost:6379/1')],
+            },
+        },
+    }
+else:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels.layers.InMemoryChannelLayer',
+        },
+    }
 
 DATABASES = {
     'default': {
@@ -72,6 +96,21 @@ DATABASES = {
     }
 }
 
+# Profil sans état pour la production (GATEWAY_STATELESS=1) : la passerelle n'est
+# qu'un proxy, sans admin, sessions, messages, CSRF ni base de données sur le
+# chemin des requêtes. Seuls les middlewares de la passerelle et CORS restent, et
+# aucun MiddlewareMixin n'impose de saut de thread en ASGI. Les vues de la
+# passerelle n'utilisent de DRF que les codes de statut.
+GATEWAY_STATELESS = os.environ.get('GATEWAY_STATELESS', '0') == '1'
+if GATEWAY_STATELESS:
+    INSTALLED_APPS = ['corsheaders', 'channels']
+    MIDDLEWARE = [
+        middleware for middleware in MIDDLEWARE
+        if middleware.startswith('gateway.') or middleware == 'corsheaders.middleware.CorsMiddleware'
+    ]
+    TEMPLATES = []
+    DATABASES = {}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -100,7 +139,12 @@ CORS_ALLOWED_ORIGINS = [
     "http://localhost:5173",
 ]
 
+# Lisibles par le navigateur : pages voisines du catalogue (pagination par curseur)
+CORS_EXPOSE_HEADERS = ['Link']
+
 # Microservices URLs
+# Une liste d'URL répartit la charge entre plusieurs instances (voir gateway/balancing.py),
+# ex. 'product': ['http://localhost:8005', 'http://localhost:8015']
 MICROSERVICES = {
     'auth': 'http://localhost:8002',
     'product': 'http://localhost:8005',
@@ -111,7 +155,246 @@ MICROSERVICES = {
     'admin': 'http://localhost:8001',
 }
 
+# Table de routage (voir gateway/routes.py) : le plus long préfixe l'emporte.
+# AUTH : service qui vérifie le token (None = route publique) ; CACHE : cache de
+# réponses des GET anonymes ; TIMEOUT : délai de lecture amont en secondes ;
+# RATE_LIMIT : seaux à jetons propres à la route (voir RATE_LIMITS) ; HEDGE :
+# GET doublé quand la réponse dépasse le p95 de la route (voir HEDGING) ;
+# INTERNAL : réservé aux appelants internes (voir INTERNAL_ENDPOINTS).
+GATEWAY_ROUTES = [
+    {'PREFIX': '/', 'AUTH': 'auth'},
+    {'PREFIX': '/_gateway/', 'AUTH': None, 'INTERNAL': True},
+    {'PREFIX': '/metrics', 'AUTH': None, 'INTERNAL': True},
+    # Les sous-requêtes du batch sont authentifiées une à une (voir gateway/batch.py)
+    {'PREFIX': '/api/batch/', 'AUTH': None},
+    # Page produit composée par la passerelle (voir gateway/composition.py)
+    {'PREFIX': '/api/product-page/', 'AUTH': None},
+    # Le flux SSE vérifie lui-même le token de ses abonnements (voir gateway/push.py)
+    {'PREFIX': '/api/events/', 'AUTH': None},
+    {'PREFIX': '/api/auth/', 'SERVICE': 'auth', 'AUTH': 'auth'},
+    {'PREFIX': '/api/auth/login/', 'SERVICE': 'auth', 'AUTH': None},
+    {'PREFIX': '/api/auth/register/', 'SERVICE': 'auth', 'AUTH': None},
+    # Les lectures SQLite attendent parfois un verrou : la latence de queue est couverte
+    {'PREFIX': '/api/products/', 'SERVICE': 'product', 'AUTH': None,
+     'CACHE': {'TTL': 30, 'STALE_WHILE_REVALIDATE': 60}, 'HEDGE': True},
+    # La recherche parcourt la table produits (icontains) : débit réduit par client
+    {'PREFIX': '/api/products/search/', 'SERVICE': 'product', 'AUTH': None,
+     'CACHE': {'TTL': 30, 'STALE_WHILE_REVALIDATE': 60},
+     'RATE_LIMIT': [{'KEY': 'ip', 'RATE': 2, 'BURST': 10}, {'KEY': 'route', 'RATE': 50, 'BURST': 100}]},
+    # Liste et arbre des catégories (avec comptes de produits), peu changeants
+    {'PREFIX': '/api/categories/', 'SERVICE': 'product', 'AUTH': None,
+     'CACHE': {'TTL': 60, 'STALE_WHILE_REVALIDATE': 300}},
+    {'PREFIX': '/api/orders/', 'SERVICE': 'order', 'AUTH': 'auth'},
+    {'PREFIX': '/api/inventory/', 'SERVICE': 'inventory', 'AUTH': 'auth', 'HEDGE': True},
+    {'PREFIX': '/api/sellers/', 'SERVICE': 'seller', 'AUTH': 'seller'},
+    {'PREFIX': '/api/sellers/login/', 'SERVICE': 'seller', 'AUTH': None},
+    {'PREFIX': '/api/sellers/register/', 'SERVICE': 'seller', 'AUTH': None},
+    {'PREFIX': '/api/stores/', 'SERVICE': 'store', 'AUTH': 'auth'},
+    # L'admin agrège des appels à d'autres services
+    {'PREFIX': '/api/admin/', 'SERVICE': 'admin', 'AUTH': 'admin', 'TIMEOUT': 20},
+    {'PREFIX': '/api/admin/auth/login/', 'SERVICE': 'admin', 'AUTH': None},
+    {'PREFIX': '/api/support/', 'SERVICE': 'admin', 'AUTH': 'auth'},  # Support tickets via admin service
+]
+
+# Limitation de débit (voir gateway/rate_limit.py). KEY : ip, user ou route ;
+# RATE en requêtes par seconde, BURST en rafale. BACKEND 'redis' partage les
+# seaux entre les workers (paquet redis requis).
+RATE_LIMITS = {
+    'ENABLED': os.environ.get('RATE_LIMIT_ENABLED', '1') == '1',
+    'BACKEND': os.environ.get('RATE_LIMIT_BACKEND', 'memory'),
+    'REDIS_URL': os.environ.get('RATE_LIMIT_REDIS_URL', 'redis://localhost:6379/0'),
+    'MAX_KEYS': 100000,
+    'TRUST_X_FORWARDED_FOR': False,
+    'RULES': [
+        {'KEY': 'ip', 'RATE': 50, 'BURST': 100},
+        {'KEY': 'user', 'RATE': 20, 'BURST': 50},
+    ],
+}
+
+# Vérification des tokens opaques par service d'authentification
+TOKEN_VERIFY_URLS = {
+    'auth': 'http://localhost:8002/api/auth/verify-token/',
+    'seller': 'http://localhost:8006/api/sellers/verify-token/',
+    'admin': 'http://localhost:8001/api/admin/auth/verify-token/',
+}
+
 # JWT Settings
 JWT_SECRET_KEY = 'your-jwt-secret-key'
 JWT_ALGORITHM = 'HS256'
-JWT_EXPIRATION_DELTA = 24 * 60 * 60  # 24 hours in seconds
\ No newline at end of file
+JWT_EXPIRATION_DELTA = 24 * 60 * 60  # 24 hours in seconds
+
+# Tokens signés vérifiés localement par l'AuthMiddleware (voir gateway/signed_tokens.py).
+# KEYS associe chaque identifiant de clé (kid) au secret HMAC partagé avec les services.
+SIGNED_TOKENS = {
+    'ENABLED': os.environ.get('SIGNED_TOKENS_ENABLED', '0') == '1',
+    'KEYS': {
+        os.environ.get('SIGNED_TOKENS_KEY_ID', 'gw-1'): os.environ.get('SIGNED_TOKENS_SECRET', JWT_SECRET_KEY),
+    },
+    'ALGORITHM': JWT_ALGORITHM,
+    'DENY_LIST_SYNC_INTERVAL': 30,  # délai maximal de prise en compte d'une révocation
+    'DENY_LIST_URLS': {
+        'auth': 'http://localhost:8002/api/auth/revoked-tokens/',
+        'seller': 'http://localhost:8006/api/sellers/revoked-tokens/',
+        'admin': 'http://localhost:8001/api/admin/auth/revoked-tokens/',
+    },
+}
+
+# Pools de connexions keep-alive vers les microservices (voir gateway/upstream.py)
+UPSTREAM_POOL = {
+    'POOL_SIZE': 20,
+    'POOL_BLOCK': False,
+    'IDLE_TIMEOUT': 60,
+    'CONNECT_TIMEOUT': 2,
+    'READ_TIMEOUT': 10,
+    'ASYNC_MAX_CONNECTIONS': 1000,
+    # Surcharges par service, ex. {'admin': {'READ_TIMEOUT': 60}}
+    'SERVICES': {},
+}
+
+# Répartition entre les instances d'un service et vérifications de santé actives
+LOAD_BALANCING = {
+    'BALANCER': 'round_robin',  # ou least_outstanding, power_of_two, chemin d'import
+    'HEALTH_CHECK_PATH': '/',
+    'HEALTH_CHECK_INTERVAL': 5,
+    'HEALTH_CHECK_TIMEOUT': 1,
+    'UNHEALTHY_THRESHOLD': 2,
+    'HEALTHY_THRESHOLD': 2,
+    'SERVICES': {
+        'product': {'BALANCER': 'least_outstanding'},
+    },
+}
+
+# Disjoncteur et compartiment par microservice (voir gateway/resilience.py)
+RESILIENCE = {
+    'MAX_CONCURRENT': 100,
+    'WINDOW': 30,
+    'MIN_CALLS': 20,
+    'FAILURE_RATE_THRESHOLD': 0.5,
+    'SLOW_CALL_DURATION': 5,
+    'SLOW_CALL_RATE_THRESHOLD': 0.8,
+    'OPEN_DURATION': 15,
+    'HALF_OPEN_CALLS': 3,
+    # Surcharges par service ; l'admin appelle lui-même d'autres services
+    'SERVICES': {
+        'admin': {'MAX_CONCURRENT': 20},
+    },
+}
+
+# Moteur de proxy asynchrone et en streaming (activé par gateway/asgi.py)
+GATEWAY_ASYNC_PROXY = os.environ.get('GATEWAY_ASYNC_PROXY', '0') == '1'
+
+# Cache des vérifications de token de l'AuthMiddleware (voir gateway/token_cache.py).
+# TTL borne le délai de prise en compte d'une révocation dans les autres processus.
+TOKEN_CACHE = {
+    'MAX_SIZE': 10000,
+    'TTL': 60,
+    'NEGATIVE_TTL': 10,
+}
+
+# Requêtes couvertes des routes HEDGE (voir gateway/hedging.py) : seuil = percentile
+# des latences récentes de la route, borné par MIN_DELAY et MAX_DELAY
+HEDGING = {
+    'PERCENTILE': 95,
+    'WINDOW': 200,
+    'MIN_SAMPLES': 20,
+    'INITIAL_DELAY': 0.2,
+    'MIN_DELAY': 0.01,
+    'MAX_DELAY': 2,
+    # Moteur synchrone : tentatives en vol au plus ; au-delà, appel direct sans requête couverte
+    'MAX_WORKERS': int(os.environ.get('HEDGING_MAX_WORKERS', '64')),
+}
+
+# Reprises des GET sur erreur de connexion, avec délai aléatoire ; reprises et
+# requêtes couvertes consomment le budget du service
+RETRIES = {
+    'MAX_RETRIES': 2,
+    'BACKOFF_BASE': 0.025,
+    'BACKOFF_MAX': 0.25,
+    'BUDGET_RATIO': 0.2,
+    'BUDGET_MIN_PER_SECOND': 5,
+}
+
+# Cache de réponses pour les GET anonymes (voir gateway/response_cache.py) ;
+# les routes concernées et leurs TTL sont déclarés dans GATEWAY_ROUTES
+RESPONSE_CACHE = {
+    'ENABLED': True,
+    'MAX_BYTES': 64 * 1024 * 1024,
+    'MAX_ENTRY_BYTES': 1024 * 1024,
+}
+
+# Regroupement des GET identiques simultanés (voir gateway/coalescing.py)
+COALESCING = {
+    'ENABLED': True,
+    'MAX_WAIT': 5,
+}
+
+# Compression des réponses (voir gateway/compression.py) ; brotli si le paquet
+# optionnel brotli est installé, gzip sinon
+COMPRESSION = {
+    'ENABLED': True,
+    'MIN_SIZE': 1024,
+    'GZIP_LEVEL': 6,
+    'BROTLI_QUALITY': 4,
+}
+
+# Point d'entrée /api/batch (voir gateway/batch.py)
+BATCH = {
+    'MAX_REQUESTS': 20,
+    'MAX_CONCURRENCY': 10,
+    'MAX_BODY_BYTES': 256 * 1024,
+    'TIMEOUT': 10,
+}
+
+# Page produit /api/product-page/<id> (voir gateway/composition.py) : dépendances
+# appelées en parallèle, chacune avec son délai ; seul le produit est indispensable
+PRODUCT_PAGE = {
+    'DEPENDENCIES': {
+        'product': {'SERVICE': 'product', 'PATH': '/api/products/{id}/', 'TIMEOUT': 2,
+                    'REQUIRED': True},
+        'availability': {'SERVICE': 'inventory',
+                         'PATH': '/api/inventory/products/{id}/availability/', 'TIMEOUT': 1},
+        'seller': {'SERVICE': 'seller', 'PATH': '/api/sellers/products/{id}/rating/',
+                   'TIMEOUT': 1},
+    },
+}
+
+# Métriques Prometheus sur /metrics (voir gateway/metrics.py). Avec plusieurs
+# workers, MULTIPROCESS_DIR doit désigner un répertoire commun à tous.
+METRICS = {
+    'ENABLED': True,
+    'MULTIPROCESS_DIR': os.environ.get('GATEWAY_METRICS_DIR') or None,
+    'FLUSH_INTERVAL': 5,
+    'BUCKETS': [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10],
+}
+
+# Points d'observation /metrics et /_gateway/ (voir gateway/internal.py) : servis
+# aux adresses de ALLOWED_IPS (réseaux CIDR, séparés par des virgules) ou sur
+# présentation de « Authorization: Bearer <SCRAPE_TOKEN> » (bearer_token de Prometheus)
+INTERNAL_ENDPOINTS = {
+    'ALLOWED_IPS': os.environ.get('GATEWAY_INTERNAL_IPS', '127.0.0.1/32,::1/128').split(','),
+    'SCRAPE_TOKEN': os.environ.get('GATEWAY_SCRAPE_TOKEN') or None,
+}
+
+# Traçage des requêtes (voir gateway/tracing.py) : spans de la passerelle et des
+# microservices ajoutés au même collecteur, lu par trace_waterfall.py.
+# Désactivé par défaut : TRACING_ENABLED=1 (et TRACE_SAMPLE_RATE=1 pour tout tracer)
+TRACING = {
+    'ENABLED': os.environ.get('TRACING_ENABLED', '0') == '1',
+    'SERVICE_NAME': 'api-gateway',
+    'COLLECTOR_FILE': os.environ.get('TRACE_COLLECTOR_FILE', str(BASE_DIR.parent / 'traces.jsonl')),
+    'SAMPLE_RATE': float(os.environ.get('TRACE_SAMPLE_RATE', '0.1')),
+}
+
+# Push temps réel (voir gateway/push.py) : /ws/events/ et /api/events/stream/,
+# alimentés par les services via POST /_gateway/events/ (route interne) avec
+# PUBLISH_KEY, la même clé que EVENTS['PUBLISH_KEY'] de chaque service. Sans
+# PUSH_PUBLISH_KEY, toute publication est refusée.
+PUSH = {
+    'PUBLISH_KEY': os.environ.get('PUSH_PUBLISH_KEY', ''),
+    'MAX_TOPICS': 20,
+    'HEARTBEAT': 15,
+    'REVALIDATE': 300,
+}
+
+# Au-delà de cette taille (ou si elle est inconnue), la réponse amont est relayée par morceaux
+PROXY_STREAM_THRESHOLD = 256 * 1024
@@ -0,0 +1,151 @@
+"""
+Vérification locale des tokens signés émis par auth, seller et admin.
+
+Un token signé est un JWT HMAC dont l'en-tête porte l'identifiant de clé
+(``kid``) et dont les claims contiennent ``jti``, ``svc`` (service émetteur),
+``exp`` et l'identité ``user``. La passerelle le vérifie en quelques
+microsecondes, sans appel réseau. Les révocations sont connues grâce à une
+liste de ``jti`` synchronisée depuis chaque service émetteur par un thread
+d'arrière-plan, toutes les ``DENY_LIST_SYNC_INTERVAL`` secondes.
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+import jwt
+from django.conf import settings
+
+from .upstream import get_client
+
+logger = logging.getLogger(__name__)
+
+
+def is_signed_token(token):
+    return token.count('.') == 2
+
+
+class DenyList:
+    """Ensemble des ``jti`` révoqués, resynchronisé toutes les ``interval`` secondes.
+
+    La synchronisation tourne dans un thread propre au processus, indépendant
+    du trafic : une révocation est prise en compte au plus ``interval``
+    secondes (plus la durée de l'appel) après avoir été publiée par le service.
+    """
+
+    def __init__(self, urls, interval):
+        self.urls = urls
+        self.interval = interval
+        self._revoked = {}  # jti -> expiration (timestamp)
+        self._since = {}    # service -> horodatage serveur de la dernière synchronisation
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def __contains__(self, jti):
+        return jti in self._revoked
+
+    def add(self, jti, expires_at):
+        with self._lock:
+            self._revoked[jti] = expires_at
+
+    def sync(self):
+        """Récupère les révocations récentes de chaque service émetteur."""
+        for service, url in self.urls.items():
+            params = {'since': self._since[service]} if service in self._since else None
+            try:
+                response = get_client(service).send('GET', url, params=params)
+                response.raise_for_status()
+                payload = response.json()
+            except Exception as e:
+                # La liste précédente reste en vigueur jusqu'à la prochaine tentative
+                logger.warning("Deny-list sync failed for %s: %s", service, e)
+                continue
+            with self._lock:
+                for entry in payload.get('revoked', []):
+                    expires_at = datetime.fromisoformat(entry['expires_at']).timestamp()
+                    self._revoked[entry['jti']] = expires_at
+                self._since[service] = payload.get('server_time')
+        self._prune()
+
+    def _prune(self):
+        now = time.time()
+        with self._lock:
+            for jti in [jti for jti, expires_at in self._revoked.items() if expires_at < now]:
+                del self._revoked[jti]
+
+    def start(self):
+        """Démarre le thread de synchronisation, une fois par processus."""
+        # Un processus issu d'un fork n'hérite pas du thread : il démarre le sien
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._stopped = threading.Event()
+                threading.Thread(target=self._run, args=(self._stopped,),
+                                 name='deny-list-sync', daemon=True).start()
+                self._pid = os.getpid()
+
+    def stop(self):
+        if self._pid == os.getpid():
+            self._stopped.set()
+            self._pid = None
+
+    def _run(self, stopped):
+        while not stopped.wait(self.interval):
+            try:
+                self.sync()
+            except Exception:
+                logger.exception("Deny-list sync failed")
+
+
+class SignedTokenVerifier:
+    def __init__(self, keys, algorithm, deny_list):
+        self.keys = keys
+        self.algorithm = algorithm
+        self.deny_list = deny_list
+
+    def verify(self, token, service):
+        """Retourne les claims d'un token valide émis par ``service``, sinon ``None``."""
+        self.deny_list.start()
+        try:
+            key = self.keys.get(jwt.get_unverified_header(token).get('kid'))
+            if key is None:
+                return None
+            claims = jwt.decode(token, key, algorithms=[self.algorithm],
+                                options={'require': ['exp', 'jti', 'svc']})
+        except jwt.PyJWTError:
+            return None
+        if claims['svc'] != service or claims['jti'] in self.deny_list:
+            return None
+        return claims
+
+    def revoke(self, token):
+        """Révocation locale immédiate (déconnexion passée par ce processus)."""
+        try:
+            claims = jwt.decode(token, options={'verify_signature': False})
+            self.deny_list.add(claims['jti'], claims['exp'])
+        except (jwt.PyJWTError, KeyError):
+            pass
+
+
+_verifier = None
+_verifier_lock = threading.Lock()
+
+
+def get_verifier():
+    """Retourne le vérificateur du processus, ou ``None`` si les tokens signés sont désactivés."""
+    global _verifier
+    config = settings.SIGNED_TOKENS
+    if not config['ENABLED']:
+        return None
+    if _verifier is None:
+        with _verifier_lock:
+            if _verifier is None:
+                deny_list = DenyList(config['DENY_LIST_URLS'], config['DENY_LIST_SYNC_INTERVAL'])
+                # Première synchronisation bloquante : pas de fenêtre sans liste au démarrage
+                deny_list.sync()
+                deny_list.start()
+                _verifier = SignedTokenVerifier(config['KEYS'], config['ALGORITHM'], deny_list)
+    return _verifier
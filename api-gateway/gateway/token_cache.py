@@ -0,0 +1,106 @@
+"""
+Cache en mémoire des vérifications de token de l'``AuthMiddleware``.
+
+Un token vérifié est associé à l'identité renvoyée par ``/verify-token/``
+pendant ``TTL`` secondes ; un token refusé est mémorisé ``NEGATIVE_TTL``
+secondes pour ne pas marteler le service d'authentification. Le cache est
+borné (éviction LRU) et les clés sont des empreintes SHA-256 : aucun token
+en clair ne reste en mémoire.
+
+Une déconnexion passant par ce processus invalide immédiatement le token
+(``Authenticator.forget``) ; dans les autres processus de la passerelle, une
+révocation prend effet au plus tard après ``TTL`` secondes.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+DEFAULT_TOKEN_CACHE_SETTINGS = {
+    'MAX_SIZE': 10000,
+    'TTL': 60,
+    'NEGATIVE_TTL': 10,
+}
+
+# Marqueur d'un token refusé par le service d'authentification
+INVALID = object()
+
+
+class TokenCache:
+    def __init__(self, max_size, ttl, negative_ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _digest(token):
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, service, token):
+        """Retourne l'identité en cache, ``INVALID`` ou ``None`` si absente."""
+        key = (service, self._digest(token))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, user_data = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return user_data
+
+    def _store(self, service, token, user_data, ttl):
+        if not ttl or not self.max_size:
+            return
+        key = (service, self._digest(token))
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, user_data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def set_valid(self, service, token, user_data):
+        self._store(service, token, user_data or {}, self.ttl)
+
+    def set_invalid(self, service, token):
+        self._store(service, token, INVALID, self.negative_ttl)
+
+    def invalidate(self, token):
+        """Oublie un token pour tous les services (déconnexion, révocation)."""
+        digest = self._digest(token)
+        with self._lock:
+            for key in [key for key in self._entries if key[1] == digest]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_token_cache():
+    """Retourne le cache partagé du processus, configuré par ``settings.TOKEN_CACHE``."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                config = dict(DEFAULT_TOKEN_CACHE_SETTINGS)
+                config.update(getattr(settings, 'TOKEN_CACHE', {}))
+                _cache = TokenCache(
+                    max_size=config['MAX_SIZE'],
+                    ttl=config['TTL'],
+                    negative_ttl=config['NEGATIVE_TTL'],
+                )
+    return _cache
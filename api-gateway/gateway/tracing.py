@@ -0,0 +1,56 @@
+"""
+Traçage des requêtes de bout en bout (W3C Trace Context).
+
+La passerelle démarre la trace de chaque requête (ou reprend le
+``traceparent`` reçu) et enregistre un span serveur. Tous les appels vers les
+microservices passent par ``gateway.upstream`` : proxy, vérification des
+tokens de l'``AuthMiddleware``, batch et page produit y reçoivent un span
+client et l'en-tête ``traceparent`` de ce span, que le ``TracingMiddleware``
+de chaque service reprend à son tour. En mode ASGI, la propagation passe par
+le ``TraceConfig`` de la session aiohttp. L'identifiant de trace est renvoyé
+au client dans ``X-Trace-Id``.
+
+Spans, propagation et écriture en arrière-plan vers le collecteur commun sont
+ceux de ``shared/tracing.py``, partagés avec les microservices ; ce module y
+ajoute les crochets aiohttp.
+"""
+
+import aiohttp
+
+from shared.tracing import (  # noqa: F401
+    Span, activate, client_span, current_span, deactivate, get_tracing_settings, get_writer,
+    parse_traceparent, start_client_span, start_server_span,
+)
+
+
+async def _on_request_start(session, context, params):
+    name = context.trace_request_ctx or f'{params.method} {params.url.host}:{params.url.port}'
+    span = start_client_span(name, {'http.url': str(params.url)})
+    context.span = span
+    if span is not None:
+        params.headers['traceparent'] = span.traceparent
+
+
+async def _on_request_end(session, context, params):
+    span = getattr(context, 'span', None)
+    if span is not None:
+        span.set('http.status_code', params.response.status)
+        span.finish()
+
+
+async def _on_request_exception(session, context, params):
+    span = getattr(context, 'span', None)
+    if span is not None:
+        span.set('error', type(params.exception).__name__)
+        span.finish()
+
+
+def aiohttp_trace_configs():
+    """``trace_configs`` des sessions aiohttp : propagation et spans clients."""
+    if not get_tracing_settings()['ENABLED']:
+        return []
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(_on_request_start)
+    trace_config.on_request_end.append(_on_request_end)
+    trace_config.on_request_exception.append(_on_request_exception)
+    return [trace_config]
@@ -0,0 +1,252 @@
+"""
+Clients HTTP partagés vers les microservices.
+
+Chaque entrée de ``settings.MICROSERVICES`` dispose de sa propre session
+``requests`` avec un pool borné de connexions keep-alive, afin que la
+passerelle ne rouvre pas une connexion TCP à chaque requête proxifiée.
+En mode ASGI, une ``aiohttp.ClientSession`` par service et par boucle d'événements
+joue le même rôle pour le moteur de proxy asynchrone.
+
+Quand un service a plusieurs instances, ``request`` envoie chaque appel sur
+l'instance choisie par son répartiteur (voir ``gateway.balancing``).
+"""
+
+import asyncio
+import threading
+import time
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+from .balancing import get_instance_pool
+from .tracing import aiohttp_trace_configs, client_span
+
+DEFAULT_POOL_SETTINGS = {
+    'POOL_SIZE': 20,         # connexions keep-alive conservées par service
+    'POOL_BLOCK': False,     # attendre une connexion libre plutôt qu'en ouvrir une en plus
+    'IDLE_TIMEOUT': 60,      # secondes d'inactivité avant de fermer le pool
+    'CONNECT_TIMEOUT': 2,
+    'READ_TIMEOUT': 10,
+    'ASYNC_MAX_CONNECTIONS': 1000,  # appels simultanés par service en mode ASGI
+}
+
+
+def get_pool_settings(service):
+    """Retourne la configuration du pool pour un service."""
+    config = getattr(settings, 'UPSTREAM_POOL', {})
+    merged = dict(DEFAULT_POOL_SETTINGS)
+    merged.update({key: value for key, value in config.items() if key != 'SERVICES'})
+    merged.update(config.get('SERVICES', {}).get(service, {}))
+    return merged
+
+
+class UpstreamClient:
+    """Session keep-alive vers un microservice."""
+
+    def __init__(self, name, instances, pool_size, pool_block, idle_timeout,
+                 connect_timeout, read_timeout):
+        self.name = name
+        self.instances = instances
+        self.pool_size = pool_size
+        self.pool_block = pool_block
+        self.idle_timeout = idle_timeout
+        self.timeout = (connect_timeout, read_timeout)
+        self._lock = threading.Lock()
+        self._last_used = time.monotonic()
+        self._session = self._build_session()
+
+    def _build_session(self):
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            # Un pool de connexions par instance du service
+            pool_connections=len(self.instances.instances),
+            pool_maxsize=self.pool_size,
+            pool_block=self.pool_block,
+            max_retries=0,
+        )
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        # Les en-têtes sont transmis tels quels par les vues proxy
+        session.trust_env = False
+        return session
+
+    def _evict_if_idle(self):
+        now = time.monotonic()
+        with self._lock:
+            if self.idle_timeout and now - self._last_used > self.idle_timeout:
+                # Les connexions inactives ont probablement été fermées côté amont
+                self._session.close()
+                self._session = self._build_session()
+            self._last_used = now
+            return self._session
+
+    def timeout_for(self, read_timeout):
+        """Délais du service avec un délai de lecture propre à une route."""
+        return (self.timeout[0], read_timeout)
+
+    def send(self, method, url, **kwargs):
+        """Envoie une requête vers une URL absolue avec les délais du service."""
+        kwargs.setdefault('timeout', self.timeout)
+        session = self._evict_if_idle()
+        with client_span(f'{method} {self.name}', **{'http.url': url}) as span:
+            kwargs['headers'] = span.inject(kwargs.get('headers'))
+            response = session.request(method=method, url=url, **kwargs)
+            span.set('http.status_code', response.status_code)
+            return response
+
+    def request(self, method, path, tried=None, **kwargs):
+        """Envoie une requête vers un chemin du service, sur l'instance choisie.
+
+        ``tried`` liste les instances déjà essayées pour ce même appel (reprise,
+        requête couverte) : elles sont évitées, et l'instance choisie y est ajoutée.
+        """
+        instance = self.instances.acquire(tried or ())
+        if tried is not None:
+            tried.append(instance)
+        try:
+            return self.send(method, f"{instance.url}{path}", **kwargs)
+        except requests.exceptions.ConnectionError:
+            self.instances.record_check(instance, False)
+            raise
+        finally:
+            self.instances.release(instance)
+
+    def close(self):
+        with self._lock:
+            self._session.close()
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+_async_clients = {}
+
+
+def get_client(service):
+    """Retourne le client partagé d'un service de ``settings.MICROSERVICES``."""
+    client = _clients.get(service)
+    if client is not None:
+        return client
+    with _clients_lock:
+        client = _clients.get(service)
+        if client is None:
+            config = get_pool_settings(service)
+            client = UpstreamClient(
+                name=service,
+                instances=get_instance_pool(service),
+                pool_size=config['POOL_SIZE'],
+                pool_block=config['POOL_BLOCK'],
+                idle_timeout=config['IDLE_TIMEOUT'],
+                connect_timeout=config['CONNECT_TIMEOUT'],
+                read_timeout=config['READ_TIMEOUT'],
+            )
+            _clients[service] = client
+        return client
+
+
+class _BalancedRequest:
+    """Appel vers l'instance choisie, à utiliser avec ``await`` ou ``async with``."""
+
+    def __init__(self, client, method, path, tried, kwargs):
+        self._client = client
+        self._method = method
+        self._path = path
+        self._tried = tried
+        self._kwargs = kwargs
+        self._response = None
+
+    async def _send(self):
+        instances = self._client.instances
+        instance = instances.acquire(self._tried or ())
+        if self._tried is not None:
+            self._tried.append(instance)
+        try:
+            return await self._client.send(self._method, f"{instance.url}{self._path}",
+                                           **self._kwargs)
+        except aiohttp.ClientConnectionError:
+            instances.record_check(instance, False)
+            raise
+        finally:
+            instances.release(instance)
+
+    def __await__(self):
+        return self._send().__await__()
+
+    async def __aenter__(self):
+        self._response = await self._send()
+        return self._response
+
+    async def __aexit__(self, *exc_info):
+        self._response.release()
+
+
+class AsyncUpstreamClient:
+    """Session aiohttp keep-alive vers un microservice, liée à une boucle."""
+
+    def __init__(self, name, instances, max_connections, idle_timeout,
+                 connect_timeout, read_timeout):
+        self.name = name
+        self.instances = instances
+        self.connect_timeout = connect_timeout
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=max_connections,
+                limit_per_host=0,
+                keepalive_timeout=idle_timeout,
+            ),
+            timeout=aiohttp.ClientTimeout(
+                sock_connect=connect_timeout,
+                sock_read=read_timeout,
+            ),
+            # Le corps est relayé tel quel, sans décompression ni en-têtes ajoutés
+            auto_decompress=False,
+            skip_auto_headers=('User-Agent', 'Accept-Encoding'),
+            # Spans clients et en-tête traceparent (voir gateway.tracing)
+            trace_configs=aiohttp_trace_configs(),
+        )
+
+    def timeout_for(self, read_timeout):
+        """Délais du service avec un délai de lecture propre à une route."""
+        return aiohttp.ClientTimeout(sock_connect=self.connect_timeout, sock_read=read_timeout)
+
+    def send(self, method, url, **kwargs):
+        """Prépare une requête vers une URL absolue (à utiliser avec ``async with``)."""
+        return self.session.request(method, url, trace_request_ctx=f'{method} {self.name}', **kwargs)
+
+    def request(self, method, path, tried=None, **kwargs):
+        """Prépare une requête vers un chemin du service, sur l'instance choisie."""
+        return _BalancedRequest(self, method, path, tried, kwargs)
+
+    @property
+    def is_closed(self):
+        return self.session.closed
+
+
+def get_async_client(service):
+    """Retourne le client asynchrone d'un service pour la boucle courante."""
+    loop = asyncio.get_running_loop()
+    key = (service, id(loop))
+    client = _async_clients.get(key)
+    if client is None or client.is_closed:
+        config = get_pool_settings(service)
+        client = AsyncUpstreamClient(
+            name=service,
+            instances=get_instance_pool(service),
+            max_connections=config['ASYNC_MAX_CONNECTIONS'],
+            idle_timeout=config['IDLE_TIMEOUT'],
+            connect_timeout=config['CONNECT_TIMEOUT'],
+            read_timeout=config['READ_TIMEOUT'],
+        )
+        _async_clients[key] = client
+    return client
+
+
+def close_all():
+    """Ferme toutes les connexions (tests, arrêt du processus)."""
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
+        # Les clients asynchrones se ferment depuis leur propre boucle
+        _async_clients.clear()
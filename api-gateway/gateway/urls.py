@@ -1,15 +1,24 @@
-from django.contrib import admin
-from django.urls import path, include
+from django.conf import settings
+from django.urls import path, re_path, include
 from . import views
 
 urlpatterns = [
-    path('admin/', admin.site.urls),
-    path('api/auth/', views.auth_proxy),
-    path('api/products/', views.product_proxy),
-    path('api/orders/', views.order_proxy),
-    path('api/inventory/', views.inventory_proxy),
-    path('api/sellers/', views.seller_proxy),
-    path('api/stores/', views.store_proxy),
-    path('api/admin/', views.admin_proxy),
-    path('api/support/', views.admin_proxy),  # Support tickets via admin service
-]
\ No newline at end of file
+    re_path(r'^api/batch/?$', views.batch),
+    re_path(r'^api/product-page/(?P<product_id>[^/]+)/?$', views.product_page),
+    re_path(r'^api/events/stream/?$', views.event_stream),
+    re_path(r'^api/', views.gateway_proxy),  # Service amont choisi par settings.GATEWAY_ROUTES
+    path('metrics', views.metrics),
+    path('_gateway/cache/', views.cache_stats),
+    path('_gateway/coalescing/', views.coalescing_stats),
+    path('_gateway/upstreams/', views.upstream_stats),
+    path('_gateway/rate-limits/', views.rate_limit_stats),
+    path('_gateway/hedging/', views.hedging_stats),
+    path('_gateway/events/', views.publish_event),
+    path('_gateway/push/', views.push_connection_stats),
+]
+
+# L'admin Django n'existe pas dans le profil sans état (GATEWAY_STATELESS)
+if 'django.contrib.admin' in settings.INSTALLED_APPS:
+    from django.contrib import admin
+
+    urlpatterns.insert(0, path('admin/', admin.site.urls))
@@ -1,82 +1,82 @@
-import requests
 from django.conf import settings
-from rest_framework.decorators import api_view
-from rest_framework.response import Response
-from django.http import JsonResponse
-
-@api_view(['GET', 'POST', 'PUT', 'DELETE'])
-def auth_proxy(request):
-    response = requests.request(
-        method=request.method,
-        url=f"{settings.MICROSERVICES['auth']}{request.path}",
-        headers={key: value for key, value in request.headers.items()
-                if key.lower() not in ['host']},
-        data=request.body if request.body else None,
-    )
-    return JsonResponse(response.json(), status=response.status_code)
-
-@api_view(['GET', 'POST', 'PUT', 'DELETE'])
-def product_proxy(request):
-    response = requests.request(
-        method=request.method,
-        url=f"{settings.MICROSERVICES['product']}{request.path}",
-        headers={key: value for key, value in request.headers.items()
-                if key.lower() not in ['host']},
-        data=request.body if request.body else None,
-    )
-    return JsonResponse(response.json(), status=response.status_code)
-
-@api_view(['GET', 'POST', 'PUT', 'DELETE'])
-def order_proxy(request):
-    response = requests.request(
-        method=request.method,
-        url=f"{settings.MICROSERVICES['order']}{request.path}",
-        headers={key: value for key, value in request.headers.items()
-                if key.lower() not in ['host']},
-        data=request.body if request.body else None,
-    )
-    return JsonResponse(response.json(), status=response.status_code)
-
-@api_view(['GET', 'POST', 'PUT', 'DELETE'])
-def inventory_proxy(request):
-    response = requests.request(
-        method=request.method,
-        url=f"{settings.MICROSERVICES['inventory']}{request.path}",
-        headers={key: value for key, value in request.headers.items()
-                if key.lower() not in ['host']},
-        data=request.body if request.body else None,
-    )
-    return JsonResponse(response.json(), status=response.status_code)
-
-@api_view(['GET', 'POST', 'PUT', 'DELETE'])
-def seller_proxy(request):
-    response = requests.request(
-        method=request.method,
-        url=f"{settings.MICROSERVICES['seller']}{request.path}",
-        headers={key: value for key, value in request.headers.items()
-                if key.lower() not in ['host']},
-        data=request.body if request.body else None,
-    )
-    return JsonResponse(response.json(), status=response.status_code)
-
-@api_view(['GET', 'POST', 'PUT', 'DELETE'])
-def store_proxy(request):
-    response = requests.request(
-        method=request.method,
-        url=f"{settings.MICROSERVICES['store']}{request.path}",
-        headers={key: value for key, value in request.headers.items()
-                if key.lower() not in ['host']},
-        data=request.body if request.body else None,
-    )
-    return JsonResponse(response.json(), status=response.status_code)
-
-@api_view(['GET', 'POST', 'PUT', 'DELETE'])
-def admin_proxy(request):
-    response = requests.request(
-        method=request.method,
-        url=f"{settings.MICROSERVICES['admin']}{request.path}",
-        headers={key: value for key, value in request.headers.items()
-                if key.lower() not in ['host']},
-        data=request.body if request.body else None,
-    )
-    return JsonResponse(response.json(), status=response.status_code)
\ No newline at end of file
+from django.http import HttpResponse, JsonResponse
+
+from .balancing import pools_stats
+from .batch import batch_view
+from .coalescing import get_coalescer
+from .composition import product_page_view
+from .hedging import get_retries
+from .metrics import get_metrics
+from .proxy import proxy_view
+from .push import publish_view, push_stats
+from .rate_limit import get_rate_limiter
+from .resilience import guards_stats
+from .response_cache import get_response_cache
+from .routes import get_route_table
+
+# Une seule vue pour toutes les routes de settings.GATEWAY_ROUTES (voir gateway/proxy.py)
+gateway_proxy = proxy_view()
+
+# Plusieurs sous-requêtes exécutées en parallèle (voir gateway/batch.py)
+batch = batch_view()
+
+# Produit, disponibilité et note du vendeur en un aller-retour (voir gateway/composition.py)
+product_page = product_page_view()
+
+# Événements des microservices diffusés aux abonnés (voir gateway/push.py)
+publish_event = publish_view()
+
+
+def event_stream(request):
+    """Le flux SSE n'est servi que par l'application ASGI (gateway/asgi.py)"""
+    return JsonResponse({'error': 'Event streams require the ASGI server'}, status=501)
+
+
+def metrics(request):
+    """Compteurs et histogrammes de latence au format texte Prometheus"""
+    registry = get_metrics()
+    if registry is None:
+        return JsonResponse({'error': 'Metrics are disabled'}, status=404)
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def cache_stats(request):
+    """Ratios de succès et octets économisés par le cache de réponses"""
+    cache = get_response_cache()
+    return JsonResponse({'enabled': cache is not None, 'stats': cache.stats() if cache else {}})
+
+
+def coalescing_stats(request):
+    """Nombre de requêtes regroupées sur l'appel amont d'un meneur"""
+    coalescer = get_coalescer()
+    return JsonResponse({'enabled': coalescer is not None, 'stats': coalescer.stats() if coalescer else {}})
+
+
+def upstream_stats(request):
+    """État des disjoncteurs, appels en vol et santé des instances par microservice"""
+    instances = pools_stats()
+    return JsonResponse({'upstreams': {
+        service: dict(stats, instances=instances[service])
+        for service, stats in guards_stats().items()
+    }})
+
+
+def rate_limit_stats(request):
+    """Requêtes refusées par règle de limitation de débit"""
+    limiter = get_rate_limiter()
+    return JsonResponse({'enabled': limiter is not None, 'stats': limiter.stats() if limiter else {}})
+
+
+def hedging_stats(request):
+    """Requêtes couvertes par route et budgets de reprise par microservice"""
+    return JsonResponse({
+        'routes': {route.prefix: route.hedge.stats()
+                   for route in get_route_table().routes if route.hedge is not None},
+        'retry_budgets': {service: get_retries(service)[1].stats()
+                          for service in settings.MICROSERVICES},
+    })
+
+
+def push_connection_stats(request):
+    """Connexions et abonnements push ouverts, événements publiés et remis"""
+    return JsonResponse({'stats': push_stats()})
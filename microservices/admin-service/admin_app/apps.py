@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class AdminAppConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'admin_app'
+
+    def ready(self):
+        # Publication des événements temps réel vers la passerelle
+        from . import events  # noqa: F401
@@ -0,0 +1,54 @@
+"""
+Événements temps réel publiés vers la passerelle.
+
+Les créations et changements des tickets de support, et leurs nouveaux
+messages, sont publiés par ``POST /_gateway/events/`` sur ``tickets.<id>``
+(le demandeur) et ``tickets.all`` (les admins) ; les notes internes ne vont
+qu'aux admins. La passerelle les relaie à ses abonnés WebSocket ou SSE (voir
+gateway/push.py), ce qui évite aux tableaux de bord d'interroger les listes
+en boucle.
+
+L'envoi, après validation de la transaction et hors de la requête, est
+assuré par ``shared.events.publish``.
+"""
+
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from shared.events import publish
+
+
+def _ticket_topics(ticket, internal=False):
+    return ['tickets.all'] if internal else [f'tickets.{ticket.requester_id}', 'tickets.all']
+
+
+@receiver(post_save, sender='admin_app.SupportTicket')
+def ticket_saved(sender, instance, created, **kwargs):
+    data = {
+        'id': instance.id,
+        'ticket_number': instance.ticket_number,
+        'subject': instance.subject,
+        'status': instance.status,
+        'priority': instance.priority,
+        'assigned_to': instance.assigned_to_id,
+        'updated_at': instance.updated_at,
+    }
+    for topic in _ticket_topics(instance):
+        publish(topic, 'ticket.created' if created else 'ticket.updated', data)
+
+
+@receiver(post_save, sender='admin_app.TicketMessage')
+def message_saved(sender, instance, created, **kwargs):
+    if not created:
+        return
+    internal = instance.is_internal or instance.message_type == 'internal_note'
+    data = {
+        'id': instance.id,
+        'ticket_id': instance.ticket_id,
+        'message_type': instance.message_type,
+        'author_name': instance.author_name,
+        'content': instance.content,
+        'created_at': instance.created_at,
+    }
+    for topic in _ticket_topics(instance.ticket, internal):
+        publish(topic, 'ticket.message', data)
@@ -0,0 +1,25 @@
+# Generated by Django 5.0.1 on 2026-10-18 19:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_app', '0002_adminuser_salt_admintoken'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevokedAdminToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('jti', models.CharField(max_length=64, unique=True)),
+                ('expires_at', models.DateTimeField()),
+                ('revoked_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'db_table': 'revoked_admin_tokens',
+            },
+        ),
+    ]
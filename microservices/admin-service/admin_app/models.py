@@ -49,6 +49,15 @@ class AdminToken(models.Model):
     def is_expired(self):
         return self.expires_at < timezone.now()
 
+class RevokedAdminToken(models.Model):
+    """Token signé révoqué avant son expiration."""
+    jti = models.CharField(max_length=64, unique=True)
+    expires_at = models.DateTimeField()
+    revoked_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        db_table = 'revoked_admin_tokens'
+
 class SupportTicket(models.Model):
     """Tickets de support des utilisateurs et vendeurs"""
     TICKET_TYPES = [
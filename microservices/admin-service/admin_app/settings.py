@@ -4,9 +4,13 @@ Django settings for admin_app project.
 
 from pathlib import Path
 import os
+import sys
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Modules communs à la passerelle et aux services (shared/tracing.py)
+sys.path.insert(0, str(BASE_DIR.parent.parent))
+
 SECRET_KEY = 'django-insecure-admin-service-key'
 
 DEBUG = True
@@ -28,6 +32,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'shared.tracing.TracingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -99,4 +104,33 @@ CORS_ALLOWED_ORIGINS = [
 # JWT Settings
 JWT_SECRET_KEY = 'admin-jwt-secret-key'
 JWT_ALGORITHM = 'HS256'
-JWT_EXPIRATION_DELTA = 24 * 60 * 60  # 24 hours in seconds
\ No newline at end of file
+JWT_EXPIRATION_DELTA = 24 * 60 * 60  # 24 hours in seconds
+
+# Tokens signés (HMAC, avec expiration et identifiant de clé) que la passerelle
+# vérifie localement. KEY_ID/SECRET doivent figurer dans SIGNED_TOKENS['KEYS'] de la passerelle.
+SIGNED_TOKENS = {
+    'ENABLED': os.environ.get('SIGNED_TOKENS_ENABLED', '0') == '1',
+    'KEY_ID': os.environ.get('SIGNED_TOKENS_KEY_ID', 'gw-1'),
+    'SECRET': os.environ.get('SIGNED_TOKENS_SECRET', 'your-jwt-secret-key'),
+    'ALGORITHM': 'HS256',
+}
+
+# Traçage des requêtes (voir shared/tracing.py) : spans ajoutés au collecteur
+# commun à tous les services, lu par trace_waterfall.py.
+# Désactivé par défaut : TRACING_ENABLED=1 (et TRACE_SAMPLE_RATE=1 pour tout tracer)
+TRACING = {
+    'ENABLED': os.environ.get('TRACING_ENABLED', '0') == '1',
+    'SERVICE_NAME': 'admin-service',
+    'COLLECTOR_FILE': os.environ.get('TRACE_COLLECTOR_FILE', str(BASE_DIR.parent.parent / 'traces.jsonl')),
+    'SAMPLE_RATE': float(os.environ.get('TRACE_SAMPLE_RATE', '0.1')),
+}
+
+# Événements temps réel publiés vers la passerelle (voir admin_app/events.py et
+# shared/events.py), qui les relaie aux clients abonnés ; PUBLISH_KEY est la même
+# que PUSH['PUBLISH_KEY'] de la passerelle
+EVENTS = {
+    'ENABLED': os.environ.get('EVENTS_ENABLED', '1') == '1',
+    'GATEWAY_URL': os.environ.get('GATEWAY_URL', 'http://localhost:8000'),
+    'PUBLISH_KEY': os.environ.get('PUSH_PUBLISH_KEY', ''),  # sans clé, rien n'est publié
+    'TIMEOUT': 2,
+}
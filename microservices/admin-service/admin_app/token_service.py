@@ -1,5 +1,8 @@
-from .models import AdminToken
-from .security_utils import generate_token
+from .models import AdminToken, RevokedAdminToken
+from .security_utils import (
+    generate_token, generate_signed_token, decode_signed_token, is_signed_token
+)
+from django.conf import settings
 from django.utils import timezone
 from datetime import timedelta
 
@@ -15,7 +18,7 @@ def create_admin_token(admin):
 def validate_admin_token(token_string):
     """Valide un token et retourne l'administrateur associé."""
     try:
-        token = AdminToken.objects.get(token=token_string)
+        token = AdminToken.objects.get(token=_stored_token(token_string))
         if token.is_expired():
             token.delete()
             return None
@@ -28,7 +31,10 @@ def validate_admin_token(token_string):
 def revoke_admin_token(token_string):
     """Révoque un token."""
     try:
-        token = AdminToken.objects.get(token=token_string)
+        token = AdminToken.objects.get(token=_stored_token(token_string))
+        if is_signed_token(token_string):
+            # Publié dans la liste de révocation synchronisée par la passerelle
+            RevokedAdminToken.objects.get_or_create(jti=token.token, defaults={'expires_at': token.expires_at})
         token.delete()
         return True
     except AdminToken.DoesNotExist:
@@ -37,3 +43,44 @@ def revoke_admin_token(token_string):
 def cleanup_expired_tokens():
     """Supprime tous les tokens expirés."""
     AdminToken.objects.filter(expires_at__lt=timezone.now()).delete()
+    RevokedAdminToken.objects.filter(expires_at__lt=timezone.now()).delete()
+
+def signed_tokens_enabled():
+    return settings.SIGNED_TOKENS['ENABLED']
+
+def _identity(admin):
+    return {
+        'id': str(admin.id),
+        'username': admin.username,
+        'email': admin.email,
+        'role': admin.role
+    }
+
+def client_token(token):
+    """Valeur remise au client : le token opaque, ou sa version signée si activée."""
+    if not signed_tokens_enabled():
+        return token.token
+    config = settings.SIGNED_TOKENS
+    claims = {
+        'jti': token.token,
+        'svc': 'admin',
+        'iat': int(token.created_at.timestamp()),
+        'exp': int(token.expires_at.timestamp()),
+        'user': _identity(token.user),
+    }
+    return generate_signed_token(claims, config['KEY_ID'], config['SECRET'], config['ALGORITHM'])
+
+def _stored_token(token_string):
+    """Retourne la valeur stockée en base (le jti pour un token signé)."""
+    if not is_signed_token(token_string):
+        return token_string
+    config = settings.SIGNED_TOKENS
+    claims = decode_signed_token(token_string, config['KEY_ID'], config['SECRET'], config['ALGORITHM'])
+    return claims['jti'] if claims else None
+
+def revoked_tokens(since=None):
+    """Tokens signés révoqués et non expirés, pour la liste de révocation de la passerelle."""
+    revoked = RevokedAdminToken.objects.filter(expires_at__gte=timezone.now())
+    if since:
+        revoked = revoked.filter(revoked_at__gt=since)
+    return revoked.order_by('revoked_at')
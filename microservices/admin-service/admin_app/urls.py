@@ -9,6 +9,8 @@ urlpatterns = [
     path('api/admin/auth/login/', views.admin_login, name='admin_login'),
     path('api/admin/auth/logout/', views.admin_logout, name='admin_logout'),
     path('api/admin/auth/profile/', views.admin_profile, name='admin_profile'),
+    path('api/admin/auth/verify-token/', views.verify_token, name='verify_token'),
+    path('api/admin/auth/revoked-tokens/', views.revoked_tokens, name='revoked_tokens'),
     
     # Dashboard
     path('api/admin/dashboard/', views.admin_dashboard, name='admin_dashboard'),
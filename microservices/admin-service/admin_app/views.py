@@ -13,6 +13,7 @@ import requests
 
 from .models import AdminUser, SupportTicket, TicketMessage, TicketActivity, AdminDashboardStats
 from . import token_service
+from shared import tracing
 
 @csrf_exempt
 @api_view(['POST'])
@@ -35,7 +36,7 @@ def admin_login(request):
         
         return Response({
             'message': 'Connexion réussie',
-            'token': token.token,
+            'token': token_service.client_token(token),
             'admin': {
                 'id': str(admin.id),
                 'username': admin.username,
@@ -613,7 +614,9 @@ def user_management(request):
         
         # Récupérer les utilisateurs depuis le service auth
         try:
-            response = requests.get('http://localhost:8001/api/auth/users/')
+            with tracing.client_span('GET auth-service /api/auth/users/') as span:
+                response = requests.get('http://localhost:8001/api/auth/users/', headers=span.inject())
+                span.set('http.status_code', response.status_code)
             if response.status_code == 200:
                 users = response.json()
             else:
@@ -636,7 +639,9 @@ def seller_management(request):
         
         # Récupérer les vendeurs depuis le service seller
         try:
-            response = requests.get('http://localhost:8005/api/sellers/')
+            with tracing.client_span('GET seller-service /api/sellers/') as span:
+                response = requests.get('http://localhost:8005/api/sellers/', headers=span.inject())
+                span.set('http.status_code', response.status_code)
             if response.status_code == 200:
                 sellers = response.json()
             else:
@@ -702,4 +707,46 @@ def get_admin_from_token(request):
         token_string = auth_header.split(' ')[1]
         return token_service.validate_admin_token(token_string)
     except:
-        return None
\ No newline at end of file
+        return None
+
+@csrf_exempt
+@api_view(['POST'])
+def verify_token(request):
+    """Vérification de token (appelée par la passerelle)"""
+    try:
+        data = json.loads(request.body)
+        admin = token_service.validate_admin_token(data['token'])
+
+        if not admin or not admin.is_active:
+            return Response({'valid': False, 'error': 'Invalid or expired token'}, status=status.HTTP_401_UNAUTHORIZED)
+
+        return Response({
+            'valid': True,
+            'user': {
+                'id': str(admin.id),
+                'username': admin.username,
+                'email': admin.email,
+                'role': admin.role
+            }
+        })
+
+    except Exception as e:
+        return Response({'valid': False, 'error': str(e)}, status=status.HTTP_401_UNAUTHORIZED)
+
+@api_view(['GET'])
+def revoked_tokens(request):
+    """Liste de révocation des tokens signés (synchronisée par la passerelle)"""
+    try:
+        since = request.GET.get('since')
+        revoked = token_service.revoked_tokens(datetime.fromisoformat(since) if since else None)
+
+        return Response({
+            'revoked': [{
+                'jti': token.jti,
+                'expires_at': token.expires_at.isoformat()
+            } for token in revoked],
+            'server_time': timezone.now().isoformat()
+        })
+
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
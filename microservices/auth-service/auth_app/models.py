@@ -42,4 +42,13 @@ class UserToken(models.Model):
         super().save(*args, **kwargs)
 
     def is_expired(self):
-        return self.expires_at < timezone.now()
\ No newline at end of file
+        return self.expires_at < timezone.now()
+
+class RevokedUserToken(models.Model):
+    """Token signé révoqué avant son expiration."""
+    jti = models.CharField(max_length=64, unique=True)
+    expires_at = models.DateTimeField()
+    revoked_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        db_table = 'revoked_user_tokens'
\ No newline at end of file
@@ -1,6 +1,8 @@
 import hashlib
 import os
 
+import jwt
+
 def generate_salt():
     """Génère un salt aléatoire de 8 octets."""
     return os.urandom(8).hex()
@@ -16,3 +18,21 @@ def check_password(salt, password, hashed_password):
 def generate_token():
     """Génère un token aléatoire de 32 octets."""
     return os.urandom(32).hex()
+
+def generate_signed_token(claims, key_id, secret, algorithm='HS256'):
+    """Signe des claims (HMAC) en indiquant l'identifiant de clé dans l'en-tête."""
+    return jwt.encode(claims, secret, algorithm=algorithm, headers={'kid': key_id})
+
+def decode_signed_token(token_string, key_id, secret, algorithm='HS256'):
+    """Vérifie la signature et l'expiration d'un token signé, retourne ses claims."""
+    try:
+        if jwt.get_unverified_header(token_string).get('kid') != key_id:
+            return None
+        return jwt.decode(token_string, secret, algorithms=[algorithm],
+                          options={'require': ['exp', 'jti']})
+    except jwt.PyJWTError:
+        return None
+
+def is_signed_token(token_string):
+    """Un token signé a la forme en-tête.claims.signature."""
+    return token_string.count('.') == 2
@@ -9,4 +9,5 @@ urlpatterns = [
     path('api/auth/logout/', views.logout_user, name='logout'),
     path('api/auth/profile/', views.user_profile, name='profile'),
     path('api/auth/verify-token/', views.verify_token, name='verify_token'),
+    path('api/auth/revoked-tokens/', views.revoked_tokens, name='revoked_tokens'),
 ]
\ No newline at end of file
@@ -8,6 +8,8 @@ from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
 from django.contrib.auth import get_user_model
+from django.utils import timezone
+from datetime import datetime
 import json
 
 from .models import User
@@ -38,7 +40,7 @@ def register_user(request):
         
         return Response({
             'message': 'User registered successfully',
-            'token': token.token,
+            'token': token_service.client_token(token),
             'user': {
                 'id': user.id,
                 'email': user.email,
@@ -70,7 +72,7 @@ def login_user(request):
         
         return Response({
             'message': 'Login successful',
-            'token': token.token,
+            'token': token_service.client_token(token),
             'user': {
                 'id': user.id,
                 'email': user.email,
@@ -143,4 +145,22 @@ def verify_token(request):
         })
         
     except Exception as e:
-        return Response({'valid': False, 'error': str(e)}, status=status.HTTP_401_UNAUTHORIZED)
\ No newline at end of file
+        return Response({'valid': False, 'error': str(e)}, status=status.HTTP_401_UNAUTHORIZED)
+
+@api_view(['GET'])
+def revoked_tokens(request):
+    """Liste de révocation des tokens signés (synchronisée par la passerelle)"""
+    try:
+        since = request.GET.get('since')
+        revoked = token_service.revoked_tokens(datetime.fromisoformat(since) if since else None)
+
+        return Response({
+            'revoked': [{
+                'jti': token.jti,
+                'expires_at': token.expires_at.isoformat()
+            } for token in revoked],
+            'server_time': timezone.now().isoformat()
+        })
+
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,33 @@
+"""
+Événements temps réel publiés vers la passerelle.
+
+Chaque changement de stock d'un produit publie sa disponibilité agrégée sur
+tous les magasins (comme ``product_availability``) sur ``stock.<product_id>``
+par ``POST /_gateway/events/`` ; la passerelle la relaie à ses abonnés
+WebSocket ou SSE (voir gateway/push.py), ce qui évite aux pages produit et
+aux tableaux de bord d'interroger le stock en boucle.
+
+L'envoi, après validation de la transaction et hors de la requête, est
+assuré par ``shared.events.publish``.
+"""
+
+from django.db.models import F, Sum, Value
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from shared.events import publish
+
+
+@receiver(post_save, sender='inventory_app.Inventory')
+@receiver(post_delete, sender='inventory_app.Inventory')
+def inventory_changed(sender, instance, **kwargs):
+    available = sender.objects.filter(product_id=instance.product_id).aggregate(
+        available=Sum(Greatest(F('quantity') - F('reserved'), Value(0)))
+    )['available'] or 0
+    publish(f'stock.{instance.product_id}', 'stock.changed', {
+        'product_id': instance.product_id,
+        'store_id': instance.store_id,
+        'available': available,
+        'in_stock': available > 0,
+    })
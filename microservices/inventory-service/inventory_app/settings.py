@@ -4,9 +4,13 @@ Django settings for inventory_app project.
 
 from pathlib import Path
 import os
+import sys
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Modules communs à la passerelle et aux services (shared/tracing.py)
+sys.path.insert(0, str(BASE_DIR.parent.parent))
+
 SECRET_KEY = 'django-insecure-inventory-service-key'
 
 DEBUG = True
@@ -26,6 +30,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'shared.tracing.TracingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -90,4 +95,24 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 CORS_ALLOW_ALL_ORIGINS = False
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:5173",
-]
\ No newline at end of file
+]
+
+# Traçage des requêtes (voir shared/tracing.py) : spans ajoutés au collecteur
+# commun à tous les services, lu par trace_waterfall.py.
+# Désactivé par défaut : TRACING_ENABLED=1 (et TRACE_SAMPLE_RATE=1 pour tout tracer)
+TRACING = {
+    'ENABLED': os.environ.get('TRACING_ENABLED', '0') == '1',
+    'SERVICE_NAME': 'inventory-service',
+    'COLLECTOR_FILE': os.environ.get('TRACE_COLLECTOR_FILE', str(BASE_DIR.parent.parent / 'traces.jsonl')),
+    'SAMPLE_RATE': float(os.environ.get('TRACE_SAMPLE_RATE', '0.1')),
+}
+
+# Événements temps réel publiés vers la passerelle (voir inventory_app/events.py et
+# shared/events.py), qui les relaie aux clients abonnés ; PUBLISH_KEY est la même
+# que PUSH['PUBLISH_KEY'] de la passerelle
+EVENTS = {
+    'ENABLED': os.environ.get('EVENTS_ENABLED', '1') == '1',
+    'GATEWAY_URL': os.environ.get('GATEWAY_URL', 'http://localhost:8000'),
+    'PUBLISH_KEY': os.environ.get('PUSH_PUBLISH_KEY', ''),  # sans clé, rien n'est publié
+    'TIMEOUT': 2,
+}
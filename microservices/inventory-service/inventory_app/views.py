@@ -4,6 +4,7 @@ from django.views.decorators.csrf import csrf_exempt
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
+from django.core.exceptions import ValidationError
 from .models import Store, Inventory, InventoryLog, TransferRequest
 import json
 
@@ -83,6 +84,28 @@ def inventory_detail(request, store_id, product_id):
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+@api_view(['GET'])
+def product_availability(request, product_id):
+    """Disponibilité agrégée d'un produit sur tous les magasins (page produit de la passerelle)"""
+    try:
+        inventories = Inventory.objects.filter(product_id=product_id).select_related('store')
+        stores = [{
+            'store_id': str(inventory.store.id),
+            'store_name': inventory.store.name,
+            'quantity_available': inventory.quantity - inventory.reserved
+        } for inventory in inventories]
+    except ValidationError:
+        # Identifiant qui n'est pas un UUID (produits du catalogue) : ce service
+        # n'en connaît pas le stock, plutôt que d'annoncer une rupture
+        return Response({'error': 'Product not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    return Response({
+        'product_id': str(product_id),
+        'available': sum(max(store['quantity_available'], 0) for store in stores),
+        'in_stock': any(store['quantity_available'] > 0 for store in stores),
+        'stores': [store for store in stores if store['quantity_available'] > 0]
+    })
+
 @api_view(['GET', 'POST'])
 def store_list(request):
     """Liste des magasins ou création d'un nouveau magasin"""
@@ -4,9 +4,13 @@ Django settings for order_app project.
 
 from pathlib import Path
 import os
+import sys
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Modules communs à la passerelle et aux services (shared/tracing.py)
+sys.path.insert(0, str(BASE_DIR.parent.parent))
+
 SECRET_KEY = 'django-insecure-order-service-key'  # Ne pas utiliser en production
 
 DEBUG = True  # Mettre à False en production
@@ -25,6 +29,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'shared.tracing.TracingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -86,4 +91,14 @@ STATIC_URL = '/static/'  # Correction pour cohérence Django
 # Optionnel : à ajouter si vous avez des fichiers statiques personnalisés
 # STATICFILES_DIRS = [BASE_DIR / "static"]
 
-DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
\ No newline at end of file
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Traçage des requêtes (voir shared/tracing.py) : spans ajoutés au collecteur
+# commun à tous les services, lu par trace_waterfall.py.
+# Désactivé par défaut : TRACING_ENABLED=1 (et TRACE_SAMPLE_RATE=1 pour tout tracer)
+TRACING = {
+    'ENABLED': os.environ.get('TRACING_ENABLED', '0') == '1',
+    'SERVICE_NAME': 'order-service',
+    'COLLECTOR_FILE': os.environ.get('TRACE_COLLECTOR_FILE', str(BASE_DIR.parent.parent / 'traces.jsonl')),
+    'SAMPLE_RATE': float(os.environ.get('TRACE_SAMPLE_RATE', '0.1')),
+}
@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class ProductAppConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'product_app'
+
+    def ready(self):
+        # Index de recherche plein texte et hiérarchie des catégories tenus à jour par signaux
+        from . import hierarchy, search  # noqa: F401
@@ -0,0 +1,104 @@
+"""
+Filtres du catalogue et comptes par facette.
+
+Filtres de la requête : ``category`` (catégorie et ses descendantes),
+``min_price``/``max_price`` et ``min_weight``/``max_weight``. Avec ``facets=1``,
+la réponse devient ``{"results": [...], "facets": {...}}`` et porte le nombre
+de produits par catégorie (descendantes comprises) et par tranche de prix.
+
+Comme dans toute navigation à facettes, chaque facette est comptée avec les
+autres filtres mais sans le sien : choisir une catégorie ne fait pas
+disparaître les autres. Chaque facette coûte une requête agrégée (GROUP BY sur la
+table de fermeture des catégories, ou COUNT filtrés) servie par les index.
+"""
+
+from decimal import Decimal, InvalidOperation
+from functools import cached_property
+
+from django.conf import settings
+from django.db.models import Count, Q
+from rest_framework.exceptions import ValidationError
+
+from . import hierarchy
+from .models import Category
+
+DEFAULT_FACETS_SETTINGS = {
+    # Bornes des tranches de prix ; la dernière tranche est ouverte
+    'PRICE_BUCKETS': [0, 25, 50, 100, 250, 500, 1000],
+    'QUERY_PARAM': 'facets',
+}
+
+RANGE_FILTERS = {
+    'min_price': ('price', 'gte'),
+    'max_price': ('price', 'lte'),
+    'min_weight': ('weight', 'gte'),
+    'max_weight': ('weight', 'lte'),
+}
+
+
+def get_facets_settings():
+    config = dict(DEFAULT_FACETS_SETTINGS)
+    config.update(getattr(settings, 'CATALOG_FACETS', {}))
+    return config
+
+
+class CatalogFilter:
+    """Filtres lus dans les paramètres de la requête, appliqués à un queryset de produits"""
+
+    def __init__(self, params):
+        self.config = get_facets_settings()
+        self.category = self._parse(params, 'category', int)
+        self.ranges = {name: self._parse(params, name, Decimal) for name in RANGE_FILTERS}
+        self.with_facets = params.get(self.config['QUERY_PARAM']) in ('1', 'true')
+
+    @staticmethod
+    def _parse(params, name, kind):
+        value = params.get(name)
+        if value in (None, ''):
+            return None
+        try:
+            parsed = kind(value)
+        except (ValueError, InvalidOperation):
+            raise ValidationError({name: ['A valid number is required.']})
+        if kind is Decimal and not parsed.is_finite():
+            raise ValidationError({name: ['A valid number is required.']})
+        return parsed
+
+    @cached_property
+    def categories(self):
+        """``{id: (nom, parent_id)}`` de toutes les catégories, en une requête"""
+        return {pk: (name, parent_id)
+                for pk, name, parent_id in Category.objects.values_list('id', 'name', 'parent_id')}
+
+    def apply(self, queryset, exclude=()):
+        if self.category is not None and 'category' not in exclude:
+            queryset = hierarchy.under(queryset, self.category)
+        for name, value in self.ranges.items():
+            field, lookup = RANGE_FILTERS[name]
+            if value is not None and field not in exclude:
+                queryset = queryset.filter(**{f'{field}__{lookup}': value})
+        return queryset
+
+    def category_counts(self, queryset):
+        counts = hierarchy.subtree_counts(self.apply(queryset, exclude=('category',)))
+        return [{'id': pk, 'name': name, 'parent_id': parent_id, 'count': counts[pk]}
+                for pk, (name, parent_id) in self.categories.items() if counts.get(pk)]
+
+    def price_counts(self, queryset):
+        bounds = self.config['PRICE_BUCKETS']
+        buckets = [(low, bounds[i + 1] if i + 1 < len(bounds) else None) for i, low in enumerate(bounds)]
+        conditions = {
+            f'bucket_{i}': Q(price__gte=low) & (Q(price__lt=high) if high is not None else Q())
+            for i, (low, high) in enumerate(buckets)
+        }
+        totals = self.apply(queryset, exclude=('price',)).aggregate(
+            **{key: Count('id', filter=condition) for key, condition in conditions.items()}
+        )
+        return [{'min': low, 'max': high, 'count': totals[f'bucket_{i}']}
+                for i, (low, high) in enumerate(buckets)]
+
+    def facets(self, queryset):
+        return {
+            'categories': self.category_counts(queryset),
+            'price': self.price_counts(queryset),
+        }
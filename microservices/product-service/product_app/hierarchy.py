@@ -0,0 +1,111 @@
+"""
+Hiérarchie des catégories, matérialisée dans une table de fermeture.
+
+``category_closure`` contient un lien ``(ancêtre, descendant, profondeur)`` pour
+chaque couple de l'arbre, la catégorie elle-même comprise (profondeur 0).
+« Tous les produits sous Électronique » devient une seule jointure indexée,
+sans parcourir l'arbre niveau par niveau :
+
+    Product.objects.filter(category__ancestor_links__ancestor_id=electronique_id)
+
+La table suit ``Category`` par signaux : création (liens du parent + lien à
+soi), déplacement sous un autre parent (liens du sous-arbre vers ses anciens
+ancêtres remplacés), suppression (en cascade). Un déplacement sous sa propre
+descendance est refusé. Les écritures en masse ne déclenchent pas les
+signaux : ``manage.py rebuild_category_tree`` reconstruit alors la table.
+"""
+
+from django.db import connection, transaction
+from django.db.models import Count
+from django.db.models.signals import post_init, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import Category, CategoryClosure, Product
+
+
+def under(queryset, category_id, field='category'):
+    """Filtre ``queryset`` sur la catégorie ``category_id`` et ses descendantes."""
+    return queryset.filter(**{f'{field}__ancestor_links__ancestor_id': category_id})
+
+
+def subtree_counts(products):
+    """``{catégorie: nombre de produits}``, descendantes comprises, en une requête groupée."""
+    return dict(products.values_list('category__ancestor_links__ancestor_id')
+                .annotate(count=Count('id')).order_by())
+
+
+def category_tree():
+    """Arbre imbriqué des catégories avec le nombre de produits actifs de chaque sous-arbre."""
+    counts = subtree_counts(Product.objects.filter(is_active=True))
+    nodes = {
+        pk: {'id': pk, 'name': name, 'description': description, 'parent_id': parent_id,
+             'product_count': counts.get(pk, 0), 'children': []}
+        for pk, name, description, parent_id
+        in Category.objects.order_by('name', 'id').values_list('id', 'name', 'description', 'parent_id')
+    }
+    roots = []
+    for node in nodes.values():
+        parent = nodes.get(node['parent_id'])
+        (parent['children'] if parent else roots).append(node)
+    return roots
+
+
+def rebuild(conn=connection):
+    """Recalcule toute la table depuis ``categories.parent_id`` ; retourne le nombre de liens."""
+    with conn.cursor() as cursor:
+        cursor.execute("DELETE FROM category_closure")
+        cursor.execute(
+            "INSERT INTO category_closure (ancestor_id, descendant_id, depth) "
+            "WITH RECURSIVE tree (ancestor_id, descendant_id, depth) AS ("
+            " SELECT id, id, 0 FROM categories"
+            " UNION ALL"
+            " SELECT tree.ancestor_id, categories.id, tree.depth + 1"
+            " FROM tree JOIN categories ON categories.parent_id = tree.descendant_id"
+            ") SELECT ancestor_id, descendant_id, depth FROM tree"
+        )
+        return cursor.rowcount
+
+
+def _ancestors(category_id):
+    return list(CategoryClosure.objects.filter(descendant_id=category_id).values_list('ancestor_id', 'depth'))
+
+
+def _link(ancestors, descendants):
+    CategoryClosure.objects.bulk_create([
+        CategoryClosure(ancestor_id=ancestor, descendant_id=descendant, depth=up + down + 1)
+        for ancestor, up in ancestors for descendant, down in descendants
+    ])
+
+
+@receiver(post_init, sender=Category)
+def category_loaded(sender, instance, **kwargs):
+    # Parent connu au chargement, pour repérer un déplacement à l'enregistrement
+    instance._saved_parent_id = instance.parent_id
+
+
+@receiver(pre_save, sender=Category)
+def category_saving(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding or instance.parent_id == instance._saved_parent_id:
+        return
+    if instance.parent_id is not None and CategoryClosure.objects.filter(
+            ancestor_id=instance.id, descendant_id=instance.parent_id).exists():
+        raise ValueError('A category cannot be moved under itself or one of its descendants')
+
+
+@receiver(post_save, sender=Category)
+def category_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        CategoryClosure.objects.create(ancestor_id=instance.id, descendant_id=instance.id, depth=0)
+        if instance.parent_id is not None:
+            _link(_ancestors(instance.parent_id), [(instance.id, 0)])
+    elif instance.parent_id != instance._saved_parent_id:
+        with transaction.atomic():
+            subtree = list(instance.descendant_links.values_list('descendant_id', 'depth'))
+            ids = [pk for pk, _ in subtree]
+            # Liens entre le sous-arbre déplacé et ses anciens ancêtres
+            CategoryClosure.objects.filter(descendant_id__in=ids).exclude(ancestor_id__in=ids).delete()
+            if instance.parent_id is not None:
+                _link(_ancestors(instance.parent_id), subtree)
+    instance._saved_parent_id = instance.parent_id
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from product_app import hierarchy
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the category closure table from the category parents'
+
+    def handle(self, *args, **kwargs):
+        count = hierarchy.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Stored {count} category links'))
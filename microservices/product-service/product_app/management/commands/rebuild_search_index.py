@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from product_app import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index from the products table'
+
+    def handle(self, *args, **kwargs):
+        if not search.is_supported():
+            raise CommandError('Full-text search requires the SQLite FTS5 backend')
+        count = search.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} products'))
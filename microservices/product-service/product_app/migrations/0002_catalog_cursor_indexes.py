@@ -0,0 +1,21 @@
+# Generated by Django 5.0.1 on 2026-10-18 19:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['created_at', 'id'], name='products_active_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['category', 'created_at', 'id'], name='products_category_created_idx'),
+        ),
+    ]
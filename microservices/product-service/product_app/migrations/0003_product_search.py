@@ -0,0 +1,24 @@
+from django.db import migrations
+
+from product_app import search
+
+
+def create_search_index(apps, schema_editor):
+    if search.is_supported(schema_editor.connection):
+        search.rebuild(schema_editor.connection)
+
+
+def drop_search_index(apps, schema_editor):
+    if search.is_supported(schema_editor.connection):
+        schema_editor.execute(f"DROP TABLE IF EXISTS {search.SEARCH_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product_app', '0002_catalog_cursor_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.1 on 2026-10-18 19:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product_app', '0003_product_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['category', 'price', 'weight'], name='products_active_facets_idx'),
+        ),
+    ]
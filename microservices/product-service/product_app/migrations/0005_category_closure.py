@@ -0,0 +1,34 @@
+# Generated by Django 5.0.1 on 2026-10-18 19:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_closure(apps, schema_editor):
+    # SQL seul : la table est remplie sans charger les modèles
+    from product_app import hierarchy
+    hierarchy.rebuild(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product_app', '0004_catalog_facets_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryClosure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.PositiveIntegerField()),
+                ('ancestor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='descendant_links', to='product_app.category')),
+                ('descendant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ancestor_links', to='product_app.category')),
+            ],
+            options={
+                'db_table': 'category_closure',
+                'unique_together': {('ancestor', 'descendant')},
+            },
+        ),
+        migrations.RunPython(build_closure, migrations.RunPython.noop),
+    ]
@@ -12,6 +12,16 @@ class Category(models.Model):
     class Meta:
         db_table = 'categories'
 
+class CategoryClosure(models.Model):
+    """Table de fermeture de l'arbre des catégories : un lien par couple ancêtre/descendant"""
+    ancestor = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='descendant_links')
+    descendant = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='ancestor_links')
+    depth = models.PositiveIntegerField()  # 0 : la catégorie elle-même
+
+    class Meta:
+        db_table = 'category_closure'
+        unique_together = ('ancestor', 'descendant')
+
 class Product(models.Model):
     id = models.AutoField(primary_key=True)  # Identifiants incrémentaux
     name = models.CharField(max_length=255)
@@ -30,6 +40,15 @@ class Product(models.Model):
 
     class Meta:
         db_table = 'products'
+        # Pagination par curseur (voir pagination.py) : pages lues dans l'ordre de l'index
+        indexes = [
+            models.Index(fields=['created_at', 'id'], condition=models.Q(is_active=True),
+                         name='products_active_created_idx'),
+            models.Index(fields=['category', 'created_at', 'id'], name='products_category_created_idx'),
+            # Index couvrant des comptes par facette (voir facets.py)
+            models.Index(fields=['category', 'price', 'weight'], condition=models.Q(is_active=True),
+                         name='products_active_facets_idx'),
+        ]
 
 class ProductImage(models.Model):
     id = models.BigAutoField(primary_key=True)
@@ -0,0 +1,126 @@
+"""
+Pagination par curseur (keyset) du catalogue.
+
+Les produits sont ordonnés du plus récent au plus ancien sur ``(created_at, id)``
+et chaque page reprend strictement après la dernière ligne de la précédente :
+``WHERE (created_at, id) < (t, n)``, servi par l'index du modèle. Une page
+profonde coûte donc autant que la première, là où un OFFSET relit et jette
+toutes les lignes qui la précèdent.
+
+Le corps reste une liste de produits ; les pages voisines sont annoncées dans
+l'en-tête ``Link`` (RFC 8288), ``rel="next"`` et ``rel="prev"``, avec un
+paramètre ``cursor`` opaque pour le client.
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+
+DEFAULT_CATALOG_PAGINATION_SETTINGS = {
+    'PAGE_SIZE': 20,
+    'MAX_PAGE_SIZE': 100,
+    'PAGE_SIZE_QUERY_PARAM': 'page_size',
+    'CURSOR_QUERY_PARAM': 'cursor',
+}
+
+NEXT, PREVIOUS = 'n', 'p'
+
+
+def get_pagination_settings():
+    config = dict(DEFAULT_CATALOG_PAGINATION_SETTINGS)
+    config.update(getattr(settings, 'CATALOG_PAGINATION', {}))
+    return config
+
+
+def encode_cursor(product, direction):
+    raw = json.dumps([product.created_at.isoformat(), product.id, direction], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Retourne ``(created_at, id, direction)`` ; ``ValueError`` si le curseur est invalide."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        created_at, pk, direction = json.loads(raw)
+        created_at = datetime.fromisoformat(created_at)
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError) as e:
+        raise ValueError(cursor) from e
+    if not isinstance(pk, int) or direction not in (NEXT, PREVIOUS):
+        raise ValueError(cursor)
+    return created_at, pk, direction
+
+
+class CatalogCursorPagination(BasePagination):
+    """Pages de ``(created_at, id)`` décroissants, pour les vues génériques comme pour les vues fonctions"""
+
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self):
+        self.config = get_pagination_settings()
+        self.links = {}
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.config['PAGE_SIZE_QUERY_PARAM']])
+        except (KeyError, ValueError):
+            return self.config['PAGE_SIZE']
+        return min(max(size, 1), self.config['MAX_PAGE_SIZE'])
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        size = self.get_page_size(request)
+        cursor = request.query_params.get(self.config['CURSOR_QUERY_PARAM'])
+        if cursor:
+            try:
+                created_at, pk, direction = decode_cursor(cursor)
+            except ValueError:
+                raise NotFound(self.invalid_cursor_message)
+        else:
+            direction = NEXT
+
+        if direction == NEXT:
+            queryset = queryset.order_by('-created_at', '-id')
+            if cursor:
+                # created_at__lte borne le parcours de l'index, le Q départage les égalités
+                queryset = queryset.filter(Q(created_at__lt=created_at) | Q(id__lt=pk),
+                                           created_at__lte=created_at)
+        else:
+            queryset = queryset.order_by('created_at', 'id').filter(
+                Q(created_at__gt=created_at) | Q(id__gt=pk), created_at__gte=created_at)
+
+        # Une ligne de plus indique s'il reste une page dans ce sens
+        page = list(queryset[:size + 1])
+        more = len(page) > size
+        page = page[:size]
+        if direction == PREVIOUS:
+            page.reverse()
+            has_next, has_previous = True, more
+        else:
+            has_next, has_previous = more, bool(cursor)
+
+        self.links = {}
+        if page and has_next:
+            self.links['next'] = self._url(encode_cursor(page[-1], NEXT))
+        if page and has_previous:
+            self.links['prev'] = self._url(encode_cursor(page[0], PREVIOUS))
+        return page
+
+    def _url(self, cursor):
+        # Lien relatif (RFC 8288 §3.2) : valable derrière la passerelle comme en direct
+        params = self.request.query_params.copy()
+        params[self.config['CURSOR_QUERY_PARAM']] = cursor
+        return f'{self.request.path}?{urlencode(sorted(params.items()))}'
+
+    def get_paginated_response(self, data):
+        response = Response(data)
+        if self.links:
+            response['Link'] = ', '.join(f'<{url}>; rel="{rel}"' for rel, url in self.links.items())
+        return response
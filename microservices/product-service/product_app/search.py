@@ -0,0 +1,135 @@
+"""
+Recherche plein texte du catalogue, sur une table virtuelle SQLite FTS5.
+
+``product_search`` indexe le nom, la description, la référence (SKU), le code-barres
+et le nom de catégorie de chaque produit, avec ``rowid`` = ``products.id``. Le
+tokenizer ``unicode61 remove_diacritics 2`` replie casse et accents des deux
+côtés (« electronique » trouve « Électronique », « piece » trouve « pièce »),
+les index de préfixes servent la saisie partielle (« smart » trouve
+« Smartphone ») et les résultats sont classés par BM25, pondéré par colonne.
+
+La table suit ``Product`` par signaux (enregistrement, suppression, renommage
+de catégorie) dans la transaction de l'écriture. Les écritures en masse
+(``update()``, ``bulk_create()``) ne déclenchent pas les signaux :
+``manage.py rebuild_search_index`` reconstruit alors l'index.
+
+Hors SQLite, la recherche retombe sur ``name__icontains``.
+"""
+
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+DEFAULT_SEARCH_SETTINGS = {
+    'LIMIT': 20,
+    # Poids BM25 par colonne, dans l'ordre de SEARCH_COLUMNS
+    'WEIGHTS': {'name': 10.0, 'description': 1.0, 'sku': 5.0, 'barcode': 5.0, 'category': 3.0},
+}
+
+SEARCH_TABLE = 'product_search'
+SEARCH_COLUMNS = ('name', 'description', 'sku', 'barcode', 'category')
+
+CREATE_SEARCH_TABLE = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+    f"{', '.join(SEARCH_COLUMNS)}, "
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+)
+
+# Mots de la requête ; la ponctuation (guillemets, opérateurs FTS5) est ignorée
+WORD_RE = re.compile(r'\w+')
+
+
+def get_search_settings():
+    config = dict(DEFAULT_SEARCH_SETTINGS)
+    config.update(getattr(settings, 'SEARCH', {}))
+    return config
+
+
+def is_supported(conn=connection):
+    return conn.vendor == 'sqlite'
+
+
+def match_expression(query):
+    """Chaque mot devient un préfixe entre guillemets ; tous doivent correspondre."""
+    return ' '.join(f'"{word}"*' for word in WORD_RE.findall(query))
+
+
+def _row(product):
+    return (product.id, product.name, product.description or '', product.sku or '',
+            product.barcode or '', product.category.name if product.category_id else '')
+
+
+def index_products(products, conn=connection):
+    with conn.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT OR REPLACE INTO {SEARCH_TABLE} (rowid, {', '.join(SEARCH_COLUMNS)}) "
+            f"VALUES (%s, {', '.join(['%s'] * len(SEARCH_COLUMNS))})",
+            [_row(product) for product in products],
+        )
+
+
+def unindex_products(ids, conn=connection):
+    with conn.cursor() as cursor:
+        cursor.executemany(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [(pk,) for pk in ids])
+
+
+def rebuild(conn=connection):
+    """Vide et remplit l'index depuis ``products`` ; retourne le nombre de produits indexés."""
+    with conn.cursor() as cursor:
+        cursor.execute(CREATE_SEARCH_TABLE)
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+        cursor.execute(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, {', '.join(SEARCH_COLUMNS)}) "
+            "SELECT p.id, p.name, COALESCE(p.description, ''), COALESCE(p.sku, ''), "
+            "COALESCE(p.barcode, ''), COALESCE(c.name, '') "
+            "FROM products p LEFT JOIN categories c ON c.id = p.category_id"
+        )
+        return cursor.rowcount
+
+
+def search_ids(query, limit=None):
+    """Identifiants des produits actifs correspondant à ``query``, du plus pertinent au moins pertinent."""
+    config = get_search_settings()
+    expression = match_expression(query)
+    if not expression:
+        return []
+    weights = ', '.join(str(float(config['WEIGHTS'].get(column, 1.0))) for column in SEARCH_COLUMNS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT {SEARCH_TABLE}.rowid FROM {SEARCH_TABLE} JOIN products p ON p.id = {SEARCH_TABLE}.rowid "
+            f"WHERE {SEARCH_TABLE} MATCH %s AND p.is_active "
+            f"ORDER BY bm25({SEARCH_TABLE}, {weights}) LIMIT %s",
+            [expression, limit or config['LIMIT']],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def search(queryset, query, limit=None):
+    """Produits de ``queryset`` correspondant à ``query``, classés par pertinence."""
+    if not is_supported():
+        return list(queryset.filter(name__icontains=query)[:limit or get_search_settings()['LIMIT']])
+    ids = search_ids(query, limit)
+    products = queryset.in_bulk(ids)
+    return [products[pk] for pk in ids if pk in products]
+
+
+@receiver(post_save, sender='product_app.Product')
+def product_saved(sender, instance, raw=False, **kwargs):
+    if is_supported() and not raw:
+        index_products([instance])
+
+
+@receiver(post_delete, sender='product_app.Product')
+def product_deleted(sender, instance, **kwargs):
+    if is_supported():
+        unindex_products([instance.id])
+
+
+@receiver(post_save, sender='product_app.Category')
+def category_saved(sender, instance, created, raw=False, **kwargs):
+    # Le nom de catégorie est indexé avec chaque produit
+    if is_supported() and not created and not raw:
+        index_products(instance.product_set.select_related('category'))
@@ -4,9 +4,13 @@ Django settings for product_app project.
 
 from pathlib import Path
 import os
+import sys
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Modules communs à la passerelle et aux services (shared/tracing.py)
+sys.path.insert(0, str(BASE_DIR.parent.parent))
+
 SECRET_KEY = 'django-insecure-product-service-key'
 
 DEBUG = True
@@ -26,6 +30,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'shared.tracing.TracingMiddleware',
     'corsheaders.middleware.CorsMiddleware',  # Doit être en premier!
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -111,4 +116,33 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
-DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
\ No newline at end of file
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Traçage des requêtes (voir shared/tracing.py) : spans ajoutés au collecteur
+# commun à tous les services, lu par trace_waterfall.py.
+# Désactivé par défaut : TRACING_ENABLED=1 (et TRACE_SAMPLE_RATE=1 pour tout tracer)
+TRACING = {
+    'ENABLED': os.environ.get('TRACING_ENABLED', '0') == '1',
+    'SERVICE_NAME': 'product-service',
+    'COLLECTOR_FILE': os.environ.get('TRACE_COLLECTOR_FILE', str(BASE_DIR.parent.parent / 'traces.jsonl')),
+    'SAMPLE_RATE': float(os.environ.get('TRACE_SAMPLE_RATE', '0.1')),
+}
+
+# Pagination par curseur du catalogue (voir product_app/pagination.py)
+CATALOG_PAGINATION = {
+    'PAGE_SIZE': int(os.environ.get('CATALOG_PAGE_SIZE', '20')),
+    'MAX_PAGE_SIZE': 100,
+}
+
+# Les curseurs des pages voisines sont dans l'en-tête Link
+CORS_EXPOSE_HEADERS = ['Link']
+
+# Recherche plein texte FTS5 (voir product_app/search.py)
+SEARCH = {
+    'LIMIT': 20,
+}
+
+# Filtres et facettes du catalogue (voir product_app/facets.py)
+CATALOG_FACETS = {
+    'PRICE_BUCKETS': [0, 25, 50, 100, 250, 500, 1000],
+}
@@ -0,0 +1,58 @@
+from django.test import TestCase, override_settings
+from rest_framework.test import APIRequestFactory
+
+from . import views
+from .models import Category, Product, ProductImage
+
+IMAGES_PER_PRODUCT = 3
+
+
+@override_settings(TRACING={'ENABLED': False})
+class CatalogQueryCountTests(TestCase):
+    """Le nombre de requêtes d'une page du catalogue ne dépend pas de sa taille"""
+
+    def build_catalog(self, size):
+        parent = Category.objects.create(name='Électronique')
+        category = Category.objects.create(name='Téléphones', parent=parent)
+        for i in range(size):
+            product = Product.objects.create(
+                name=f'Smartphone {size}-{i}', description='Téléphone', category=category,
+                sku=f'SKU-{size}-{i}', price=100 + i, cost=50, unit='pièce',
+            )
+            for j in range(IMAGES_PER_PRODUCT):
+                ProductImage.objects.create(product=product, url=f'https://img.test/{product.id}/{j}.jpg',
+                                            is_primary=j == 1)
+        return category, product
+
+    def assertConstantQueries(self, expected, request):
+        """``request(catégorie, produit)`` exécute ``expected`` requêtes pour 3 comme pour 30 produits"""
+        for size in (3, 30):
+            with self.subTest(size=size):
+                Product.objects.all().delete()
+                Category.objects.all().delete()
+                category, product = self.build_catalog(size)
+                with self.assertNumQueries(expected):
+                    response = request(category, product)
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response.data)
+
+    def test_product_list(self):
+        factory = APIRequestFactory()
+        self.assertConstantQueries(
+            2, lambda category, product: views.product_list(factory.get('/api/products/')))
+
+    def test_product_list_api_view(self):
+        self.assertConstantQueries(2, lambda category, product: self.client.get('/api/products/'))
+
+    def test_product_detail(self):
+        factory = APIRequestFactory()
+        self.assertConstantQueries(2, lambda category, product: views.product_detail(
+            factory.get(f'/api/products/{product.id}/'), product_id=product.id))
+
+    def test_products_by_category(self):
+        self.assertConstantQueries(3, lambda category, product: self.client.get(
+            f'/api/products/category/{category.parent_id}/'))
+
+    def test_search_products(self):
+        self.assertConstantQueries(3, lambda category, product: self.client.get(
+            '/api/products/search/', {'q': 'smartphone'}))
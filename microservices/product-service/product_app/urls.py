@@ -8,5 +8,6 @@ urlpatterns = [
     path('api/products/<int:pk>/', views.ProductDetailAPIView.as_view(), name='product-detail'),
     path('api/products/category/<int:category_id>/', views.products_by_category, name='products_by_category'),
     path('api/categories/', views.category_list, name='category_list'),
+    path('api/categories/tree/', views.category_tree, name='category_tree'),
     path('api/products/search/', views.search_products, name='search_products'),
 ]
\ No newline at end of file
@@ -4,46 +4,85 @@ from django.views.decorators.csrf import csrf_exempt
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status, generics
+from django.db.models import Prefetch
 from .models import Product, Category, ProductImage
 from .serializers import ProductSerializer
+from .pagination import CatalogCursorPagination
+from .facets import CatalogFilter
+from . import hierarchy, search
 import json
 
+
+def with_catalog_relations(queryset):
+    """Catégorie jointe et images préchargées : nombre de requêtes fixe, quelle que soit la page"""
+    return queryset.select_related('category').prefetch_related(
+        Prefetch('images', queryset=ProductImage.objects.order_by('id'))
+    )
+
+
+def catalog_products():
+    return with_catalog_relations(Product.objects.filter(is_active=True))
+
+
+def primary_image(images):
+    """Image principale choisie parmi les images préchargées, sinon la première"""
+    return next((img for img in images if img.is_primary), images[0] if images else None)
+
+
+def product_payload(product):
+    images = list(product.images.all())  # Préchargées par with_catalog_relations
+    primary = primary_image(images)
+    return {
+        'id': product.id,
+        'name': product.name,
+        'description': product.description,
+        'price': float(product.price),
+        'category': {
+            'id': product.category.id,
+            'name': product.category.name
+        },
+        'images': [{'url': img.url, 'is_primary': img.is_primary} for img in images],
+        'sku': product.sku,
+        'weight': float(product.weight) if product.weight else None,
+        'dimensions': product.dimensions,
+        'created_at': product.created_at.isoformat(),
+        # Added fields for frontend compatibility
+        'image_url': primary.url if primary else None,
+        'rating': 4.5,  # Mock value
+        'review_count': 12,  # Mock value
+        'category_name': product.category.name,
+        'stock_quantity': 10,  # Mock value
+    }
+
+
+def with_facets(response, catalog_filter):
+    """Ajoute les comptes par facette à la page, si la requête les demande"""
+    if catalog_filter.with_facets:
+        response.data = {
+            'results': response.data,
+            'facets': catalog_filter.facets(Product.objects.filter(is_active=True)),
+        }
+    return response
+
+
+def product_summary(product):
+    return {
+        'id': product.id,
+        'name': product.name,
+        'price': float(product.price),
+        'images': [{'url': img.url, 'is_primary': img.is_primary} for img in product.images.all()]
+    }
+
+
 @api_view(['GET', 'POST'])
 def product_list(request):
     """Liste des produits ou création d'un nouveau produit"""
     if request.method == 'GET':
-        products = Product.objects.filter(is_active=True)
-        print("DEBUG: Number of active products:", products.count())  # Debug log
-        if products.count() == 0:
-            print("WARNING: No products found in the database.")
-        product_data = []
-        
-        for product in products:
-            images = product.images.all()  # Utilise la relation Django
-            primary_image = images.filter(is_primary=True).first() or images.first()
-            product_data.append({
-                'id': product.id,
-                'name': product.name,
-                'description': product.description,
-                'price': float(product.price),
-                'category': {
-                    'id': product.category.id,
-                    'name': product.category.name
-                },
-                'images': [{'url': img.url, 'is_primary': img.is_primary} for img in images],
-                'sku': product.sku,
-                'weight': float(product.weight) if product.weight else None,
-                'dimensions': product.dimensions,
-                'created_at': product.created_at.isoformat(),
-                # Added fields for frontend compatibility
-                'image_url': primary_image.url if primary_image else None,
-                'rating': 4.5,  # Mock value
-                'review_count': 12,  # Mock value
-                'category_name': product.category.name,
-                'stock_quantity': 10,  # Mock value
-            })
-        
-        return Response(product_data)
+        catalog_filter = CatalogFilter(request.query_params)
+        paginator = CatalogCursorPagination()
+        page = paginator.paginate_queryset(catalog_filter.apply(catalog_products()), request)
+        response = paginator.get_paginated_response([product_payload(product) for product in page])
+        return with_facets(response, catalog_filter)
     
     elif request.method == 'POST':
         try:
@@ -75,33 +114,10 @@ def product_list(request):
 @api_view(['GET', 'PUT', 'DELETE'])
 def product_detail(request, product_id):
     """Détails, modification ou suppression d'un produit"""
-    product = get_object_or_404(Product, id=product_id)
+    product = get_object_or_404(with_catalog_relations(Product.objects), id=product_id)
     
     if request.method == 'GET':
-        images = product.images.all()  # Utilise la relation Django
-        primary_image = images.filter(is_primary=True).first() or images.first()
-        return Response({
-            'id': product.id,
-            'name': product.name,
-            'description': product.description,
-            'price': float(product.price),
-            'category': {
-                'id': product.category.id,
-                'name': product.category.name
-            },
-            'images': [{'url': img.url, 'is_primary': img.is_primary} for img in images],
-            'sku': product.sku,
-            'weight': float(product.weight) if product.weight else None,
-            'dimensions': product.dimensions,
-            'is_active': product.is_active,
-            'created_at': product.created_at.isoformat(),
-            # Added fields for frontend compatibility
-            'image_url': primary_image.url if primary_image else None,
-            'rating': 4.5,  # Mock value
-            'review_count': 12,  # Mock value
-            'category_name': product.category.name,
-            'stock_quantity': 10,  # Mock value
-        })
+        return Response(dict(product_payload(product), is_active=product.is_active))
     
     elif request.method == 'PUT':
         try:
@@ -124,21 +140,11 @@ def product_detail(request, product_id):
 
 @api_view(['GET'])
 def products_by_category(request, category_id):
-    """Produits par catégorie"""
+    """Produits de la catégorie et de ses sous-catégories"""
     category = get_object_or_404(Category, id=category_id)
-    products = Product.objects.filter(category=category, is_active=True)
-    
-    product_data = []
-    for product in products:
-        images = ProductImage.objects.filter(product=product)
-        product_data.append({
-            'id': product.id,
-            'name': product.name,
-            'price': float(product.price),
-            'images': [{'url': img.url, 'is_primary': img.is_primary} for img in images]
-        })
-    
-    return Response(product_data)
+    paginator = CatalogCursorPagination()
+    page = paginator.paginate_queryset(hierarchy.under(catalog_products(), category.id), request)
+    return paginator.get_paginated_response([product_summary(product) for product in page])
 
 @api_view(['GET'])
 def category_list(request):
@@ -151,11 +157,16 @@ def category_list(request):
             'id': category.id,
             'name': category.name,
             'description': category.description,
-            'parent_id': category.parent.id if category.parent else None
+            'parent_id': category.parent_id
         })
     
     return Response(category_data)
 
+@api_view(['GET'])
+def category_tree(request):
+    """Arbre des catégories, avec le nombre de produits de chaque sous-arbre"""
+    return Response(hierarchy.category_tree())
+
 @api_view(['GET'])
 def search_products(request):
     """Recherche de produits"""
@@ -163,27 +174,21 @@ def search_products(request):
     if not query:
         return Response([])
     
-    products = Product.objects.filter(
-        name__icontains=query,
-        is_active=True
-    )[:20]  # Limiter à 20 résultats
-    
-    product_data = []
-    for product in products:
-        images = ProductImage.objects.filter(product=product)
-        product_data.append({
-            'id': product.id,
-            'name': product.name,
-            'price': float(product.price),
-            'images': [{'url': img.url, 'is_primary': img.is_primary} for img in images]
-        })
-    
-    return Response(product_data)
+    products = search.search(catalog_products(), query)  # Classés par pertinence (BM25)
+    return Response([product_summary(product) for product in products])
 
 class ProductListAPIView(generics.ListAPIView):
-    queryset = Product.objects.filter(is_active=True)
+    queryset = catalog_products()
     serializer_class = ProductSerializer
+    pagination_class = CatalogCursorPagination
+
+    def get_queryset(self):
+        self.catalog_filter = CatalogFilter(self.request.query_params)
+        return self.catalog_filter.apply(super().get_queryset())
+
+    def list(self, request, *args, **kwargs):
+        return with_facets(super().list(request, *args, **kwargs), self.catalog_filter)
 
 class ProductDetailAPIView(generics.RetrieveAPIView):
-    queryset = Product.objects.filter(is_active=True)
+    queryset = catalog_products()
     serializer_class = ProductSerializer
\ No newline at end of file
@@ -3,4 +3,8 @@ from django.apps import AppConfig
 
 class SellerAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'seller_app'
\ No newline at end of file
+    name = 'seller_app'
+
+    def ready(self):
+        # Publication des événements temps réel vers la passerelle
+        from . import events  # noqa: F401
@@ -0,0 +1,43 @@
+"""
+Événements temps réel publiés vers la passerelle.
+
+Les notifications et commandes d'un vendeur sont publiées sur le sujet
+``seller.<id>.notifications`` par ``POST /_gateway/events/`` ; la passerelle
+les relaie à ses abonnés WebSocket ou SSE (voir gateway/push.py), ce qui
+évite aux tableaux de bord d'interroger les listes en boucle.
+
+L'envoi, après validation de la transaction et hors de la requête, est
+assuré par ``shared.events.publish``.
+"""
+
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from shared.events import publish
+
+
+@receiver(post_save, sender='seller_app.SellerNotification')
+def notification_saved(sender, instance, created, **kwargs):
+    if not created:
+        return
+    publish(f'seller.{instance.seller_id}.notifications', 'notification.created', {
+        'id': instance.id,
+        'notification_type': instance.notification_type,
+        'message': instance.message,
+        'related_object_id': instance.related_object_id,
+        'created_at': instance.created_at,
+    })
+
+
+@receiver(post_save, sender='seller_app.SellerOrder')
+def order_saved(sender, instance, created, **kwargs):
+    publish(f'seller.{instance.seller_id}.notifications',
+            'order.created' if created else 'order.updated', {
+                'id': instance.id,
+                'product_id': instance.product_id,
+                'status': instance.status,
+                'quantity': instance.quantity,
+                'total_amount': instance.total_amount,
+                'tracking_number': instance.tracking_number,
+                'updated_at': instance.updated_at,
+            })
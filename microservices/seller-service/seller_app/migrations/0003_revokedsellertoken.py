@@ -0,0 +1,25 @@
+# Generated by Django 5.0.1 on 2026-10-18 19:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('seller_app', '0002_seller_salt_sellernotification_sellertoken'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevokedSellerToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('jti', models.CharField(max_length=64, unique=True)),
+                ('expires_at', models.DateTimeField()),
+                ('revoked_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'db_table': 'revoked_seller_tokens',
+            },
+        ),
+    ]
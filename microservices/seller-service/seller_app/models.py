@@ -61,6 +61,15 @@ class SellerToken(models.Model):
     def is_expired(self):
         return self.expires_at < timezone.now()
 
+class RevokedSellerToken(models.Model):
+    """Token signé révoqué avant son expiration."""
+    jti = models.CharField(max_length=64, unique=True)
+    expires_at = models.DateTimeField()
+    revoked_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        db_table = 'revoked_seller_tokens'
+
 class SellerProduct(models.Model):
     CATEGORIES = [
         ('electronics', 'Electronics'),
@@ -12,10 +12,13 @@ urlpatterns = [
         path('products/', views.seller_products, name='seller_products'),
         path('products/create/', views.create_product, name='create_product'),
         path('products/<uuid:product_id>/', views.product_detail, name='product_detail'),
+        path('products/<str:product_id>/rating/', views.product_seller_rating, name='product_seller_rating'),
         path('products/<uuid:product_id>/update/', views.update_product, name='update_product'),
         path('products/<uuid:product_id>/delete/', views.delete_product, name='delete_product'),
         path('orders/', views.seller_orders, name='seller_orders'),
         path('analytics/', views.seller_analytics, name='seller_analytics'),
         path('password-reset/', views.seller_password_reset, name='seller_password_reset'),  # <-- Ajouté ici
+        path('verify-token/', views.verify_token, name='verify_token'),
+        path('revoked-tokens/', views.revoked_tokens, name='revoked_tokens'),
     ])),
 ]
\ No newline at end of file
@@ -5,12 +5,13 @@ from django.contrib.auth import authenticate
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
-from django.db.models import Sum, Count, Q
+from django.core.exceptions import ValidationError
+from django.db.models import Sum, Count, Q, Avg
 from django.utils import timezone
 from datetime import datetime, timedelta
 import json
 
-from .models import Seller, SellerProduct, SellerOrder, SellerAnalytics
+from .models import Seller, SellerProduct, SellerOrder, SellerAnalytics, SellerRating
 from .serializers import SellerSerializer, SellerProductSerializer, SellerOrderSerializer
 from . import token_service
 
@@ -39,7 +40,7 @@ def seller_register(request):
         
         return Response({
             'message': 'Seller registered successfully',
-            'token': token.token,
+            'token': token_service.client_token(token),
             'seller': SellerSerializer(seller).data
         }, status=status.HTTP_201_CREATED)
         
@@ -67,7 +68,7 @@ def seller_login(request):
         
         return Response({
             'message': 'Login successful',
-            'token': token.token,
+            'token': token_service.client_token(token),
             'seller': SellerSerializer(seller).data
         }, status=status.HTTP_200_OK)
         
@@ -223,6 +224,25 @@ def product_detail(request, product_id):
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+@api_view(['GET'])
+def product_seller_rating(request, product_id):
+    """Vendeur d'un produit et sa note moyenne (page produit de la passerelle)"""
+    try:
+        product = SellerProduct.objects.select_related('seller').get(id=product_id, is_active=True)
+    except (SellerProduct.DoesNotExist, ValidationError):
+        return Response({'error': 'Product not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    ratings = SellerRating.objects.filter(seller=product.seller).aggregate(
+        average=Avg('rating'), count=Count('id')
+    )
+
+    return Response({
+        'seller_id': str(product.seller.id),
+        'seller_name': product.seller.company_name or product.seller.name,
+        'rating': round(ratings['average'], 2) if ratings['average'] is not None else None,
+        'review_count': ratings['count']
+    })
+
 @api_view(['PUT'])
 def update_product(request, product_id):
     """Mettre à jour un produit"""
@@ -344,4 +364,45 @@ def get_seller_from_token(request):
         token_string = auth_header.split(' ')[1]
         return token_service.validate_seller_token(token_string)
     except:
-        return None
\ No newline at end of file
+        return None
+
+@csrf_exempt
+@api_view(['POST'])
+def verify_token(request):
+    """Vérification de token (appelée par la passerelle)"""
+    try:
+        data = json.loads(request.body)
+        seller = token_service.validate_seller_token(data['token'])
+
+        if not seller or not seller.is_active:
+            return Response({'valid': False, 'error': 'Invalid or expired token'}, status=status.HTTP_401_UNAUTHORIZED)
+
+        return Response({
+            'valid': True,
+            'user': {
+                'id': str(seller.id),
+                'email': seller.email,
+                'name': seller.name
+            }
+        })
+
+    except Exception as e:
+        return Response({'valid': False, 'error': str(e)}, status=status.HTTP_401_UNAUTHORIZED)
+
+@api_view(['GET'])
+def revoked_tokens(request):
+    """Liste de révocation des tokens signés (synchronisée par la passerelle)"""
+    try:
+        since = request.GET.get('since')
+        revoked = token_service.revoked_tokens(datetime.fromisoformat(since) if since else None)
+
+        return Response({
+            'revoked': [{
+                'jti': token.jti,
+                'expires_at': token.expires_at.isoformat()
+            } for token in revoked],
+            'server_time': timezone.now().isoformat()
+        })
+
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
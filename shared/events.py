@@ -0,0 +1,71 @@
+"""
+Publication d'événements temps réel vers la passerelle, commune aux microservices.
+
+``publish(topic, event, data)`` envoie l'événement par ``POST /_gateway/events/``
+avec la clé partagée ``X-Push-Key`` ; la passerelle le relaie à ses abonnés
+WebSocket ou SSE (voir gateway/push.py). Chaque service ne garde, dans son
+propre ``events.py``, que les récepteurs de signaux qui choisissent sujets et
+données.
+
+L'envoi a lieu après validation de la transaction, hors de la requête, dans
+un thread ; un échec est seulement journalisé, les clients se resynchronisant
+par les endpoints de liste. Sans ``PUBLISH_KEY``, rien n'est publié.
+"""
+
+import json
+import logging
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EVENTS_SETTINGS = {
+    'ENABLED': True,
+    'GATEWAY_URL': 'http://localhost:8000',
+    'PUBLISH_KEY': '',
+    'TIMEOUT': 2,
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_events_settings():
+    config = dict(DEFAULT_EVENTS_SETTINGS)
+    config.update(getattr(settings, 'EVENTS', {}))
+    return config
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='events')
+    return _executor
+
+
+def _send(config, body):
+    request = urllib.request.Request(
+        config['GATEWAY_URL'].rstrip('/') + '/_gateway/events/', data=body, method='POST',
+        headers={'Content-Type': 'application/json', 'X-Push-Key': config['PUBLISH_KEY']},
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=config['TIMEOUT']):
+            pass
+    except OSError as e:
+        logger.warning("Événement non publié vers la passerelle : %s", e)
+
+
+def publish(topic, event, data):
+    """Publie ``event`` sur ``topic`` une fois la transaction en cours validée."""
+    config = get_events_settings()
+    if not config['ENABLED'] or not config['PUBLISH_KEY']:
+        return
+    body = json.dumps({'topic': topic, 'event': event, 'data': data}, cls=DjangoJSONEncoder).encode()
+    transaction.on_commit(lambda: _get_executor().submit(_send, config, body))
@@ -0,0 +1,304 @@
+"""
+Traçage des requêtes de bout en bout (W3C Trace Context), commun à la
+passerelle et aux microservices.
+
+Le ``TracingMiddleware`` des microservices reprend le contexte ``traceparent``
+transmis par la passerelle (ou en démarre un) et enregistre un span par
+requête, avec le temps passé en base de données mesuré par
+``connection.execute_wrapper``. Les appels sortants passent par
+``client_span``, qui propage le contexte et mesure l'appel. La passerelle
+(gateway/tracing.py) y ajoute son middleware sync/async et les crochets aiohttp.
+
+Les spans de tous les services sont ajoutés, une ligne JSON chacun, au même
+fichier collecteur (``settings.TRACING['COLLECTOR_FILE']``) ; le script
+``trace_waterfall.py`` à la racine du projet en affiche la cascade. L'écriture
+n'a jamais lieu dans la requête : ``Span.finish`` dépose l'enregistrement dans
+une file, vidée par lots par un thread d'écriture propre à chaque processus.
+Quand la file est pleine, les spans sont perdus plutôt que de ralentir les
+requêtes. Au-delà de ``MAX_BYTES``, le collecteur est renommé en ``.1``.
+
+Le traçage est désactivé par défaut (``TRACING_ENABLED=1`` pour l'activer) et
+n'échantillonne qu'une partie des traces démarrées localement.
+"""
+
+import atexit
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TRACING_SETTINGS = {
+    'ENABLED': False,
+    'SERVICE_NAME': 'service',
+    'COLLECTOR_FILE': 'traces.jsonl',
+    'SAMPLE_RATE': 0.1,
+    'MAX_BYTES': 50 * 1024 * 1024,  # Rotation du collecteur
+    'QUEUE_SIZE': 10000,            # Spans en attente d'écriture, au-delà ils sont perdus
+    'BATCH_SIZE': 500,
+    'FLUSH_INTERVAL': 1.0,          # secondes d'attente au plus avant d'écrire un lot
+}
+
+_current_span = contextvars.ContextVar('tracing_span', default=None)
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_tracing_settings():
+    config = dict(DEFAULT_TRACING_SETTINGS)
+    config.update(getattr(settings, 'TRACING', {}))
+    return config
+
+
+class SpanWriter:
+    """File des spans terminés et thread qui les ajoute au collecteur par lots"""
+
+    def __init__(self, config):
+        self.path = config['COLLECTOR_FILE']
+        self.max_bytes = config['MAX_BYTES']
+        self.queue_size = config['QUEUE_SIZE']
+        self.batch_size = config['BATCH_SIZE']
+        self.flush_interval = config['FLUSH_INTERVAL']
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def submit(self, record):
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self):
+        """Attend l'écriture des spans en file (arrêt du processus, tests)."""
+        if self._pid == os.getpid() and self._thread.is_alive():
+            self._queue.join()
+
+    def _ensure_started(self):
+        # Un processus issu d'un fork n'hérite pas du thread : il démarre le sien
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue(self.queue_size)
+                self._thread = threading.Thread(target=self._run, name='span-writer', daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+            except Exception:
+                logger.exception("Spans non écrits dans %s", self.path)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, batch):
+        try:
+            if os.path.getsize(self.path) > self.max_bytes:
+                os.replace(self.path, f'{self.path}.1')
+        except FileNotFoundError:
+            pass
+        lines = ''.join(json.dumps(record) + '\n' for record in batch)
+        # Un seul ajout par lot : les lignes des autres processus ne s'y intercalent pas
+        with open(self.path, 'a', encoding='utf-8') as collector:
+            collector.write(lines)
+
+
+def get_writer():
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = SpanWriter(get_tracing_settings())
+                atexit.register(_writer.flush)
+    return _writer
+
+
+def _new_id(size):
+    return os.urandom(size).hex()
+
+
+def parse_traceparent(header):
+    """Retourne ``(trace_id, span_id parent, échantillonné)`` ou ``None``."""
+    parts = (header or '').strip().split('-')
+    if len(parts) != 4 or parts[0] != '00':
+        return None
+    trace_id, parent_id, flags = parts[1], parts[2], parts[3]
+    try:
+        if len(trace_id) != 32 or len(parent_id) != 16 or len(flags) != 2:
+            return None
+        if int(trace_id, 16) == 0 or int(parent_id, 16) == 0:
+            return None
+        return trace_id, parent_id, bool(int(flags, 16) & 1)
+    except ValueError:
+        return None
+
+
+class Span:
+    def __init__(self, name, kind, trace_id, parent_id, sampled, attributes=None):
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = _new_id(8)
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.attributes = attributes or {}
+        self.start = time.time()
+        self._started = time.perf_counter()
+
+    @property
+    def traceparent(self):
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def set(self, key, value):
+        self.attributes[key] = value
+
+    def inject(self, headers=None):
+        """En-têtes de l'appel sortant, avec le contexte de ce span."""
+        headers = {key: value for key, value in (headers or {}).items()
+                   if key.lower() != 'traceparent'}
+        headers['traceparent'] = self.traceparent
+        return headers
+
+    def finish(self):
+        if not self.sampled:
+            return
+        get_writer().submit({
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'service': get_tracing_settings()['SERVICE_NAME'],
+            'name': self.name,
+            'kind': self.kind,
+            'start': self.start,
+            'duration_ms': round((time.perf_counter() - self._started) * 1000, 3),
+            'attributes': self.attributes,
+        })
+
+
+class _NoSpan:
+    """Appel sortant hors d'une requête tracée : rien n'est propagé ni enregistré."""
+
+    def set(self, key, value):
+        pass
+
+    def inject(self, headers=None):
+        return dict(headers or {})
+
+
+def current_span():
+    return _current_span.get()
+
+
+def start_client_span(name, attributes):
+    parent = _current_span.get()
+    if parent is None:
+        return None
+    return Span(name, 'client', parent.trace_id, parent.span_id, parent.sampled, attributes)
+
+
+@contextmanager
+def client_span(name, **attributes):
+    """Span d'un appel sortant ; ``span.inject(headers)`` propage le contexte."""
+    span = start_client_span(name, attributes)
+    if span is None:
+        yield _NoSpan()
+        return
+    try:
+        yield span
+    except Exception as e:
+        span.set('error', type(e).__name__)
+        raise
+    finally:
+        span.finish()
+
+
+def start_server_span(request, sample_rate):
+    """Span serveur d'une requête, enfant du ``traceparent`` reçu s'il est valide."""
+    parent = parse_traceparent(request.headers.get('traceparent'))
+    if parent is not None:
+        trace_id, parent_id, sampled = parent
+    else:
+        trace_id, parent_id, sampled = _new_id(16), None, random.random() < sample_rate
+    return Span(f'{request.method} {request.path}', 'server', trace_id, parent_id, sampled,
+                {'http.method': request.method, 'http.path': request.path})
+
+
+def activate(span):
+    """Rend ``span`` parent des appels sortants ; retourne le jeton pour ``deactivate``."""
+    return _current_span.set(span)
+
+
+def deactivate(token):
+    _current_span.reset(token)
+
+
+class _DatabaseTimer:
+    def __init__(self, span):
+        self.span = span
+        self.queries = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.queries += 1
+
+
+class TracingMiddleware:
+    """Span serveur de chaque requête d'un microservice, avec le temps passé en base"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        config = get_tracing_settings()
+        if not config['ENABLED']:
+            raise MiddlewareNotUsed
+        self.sample_rate = config['SAMPLE_RATE']
+
+    def __call__(self, request):
+        span = start_server_span(request, self.sample_rate)
+        token = activate(span)
+        database = _DatabaseTimer(span)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(database))
+                response = self.get_response(request)
+            span.set('http.status_code', response.status_code)
+            return response
+        finally:
+            match = getattr(request, 'resolver_match', None)
+            if match is not None and match.route:
+                span.name = f'{request.method} /{match.route}'
+            span.set('db.queries', database.queries)
+            span.set('db.duration_ms', round(database.duration * 1000, 3))
+            deactivate(token)
+            span.finish()
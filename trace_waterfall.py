@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Affiche la cascade (waterfall) d'une requête tracée de bout en bout.
+
+Lit le collecteur commun (traces.jsonl à la racine du projet, ou
+$TRACE_COLLECTOR_FILE) où la passerelle et les microservices écrivent leurs
+spans, puis affiche chaque appel avec son décalage, sa durée et le temps
+passé en base de données. Le traçage est désactivé par défaut : lancer la
+passerelle et les services avec ``TRACING_ENABLED=1 TRACE_SAMPLE_RATE=1``.
+
+    python trace_waterfall.py                 # dernière trace
+    python trace_waterfall.py <trace_id>      # trace donnée (X-Trace-Id de la réponse)
+    python trace_waterfall.py --list 20       # traces récentes
+    python trace_waterfall.py --slowest 5     # traces les plus lentes
+"""
+
+import argparse
+import json
+import os
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+DEFAULT_COLLECTOR = Path(__file__).parent / 'traces.jsonl'
+BAR_WIDTH = 40
+
+
+def load_traces(path):
+    traces = defaultdict(list)
+    with open(path, encoding='utf-8') as collector:
+        for line in collector:
+            try:
+                span = json.loads(line)
+            except ValueError:
+                continue
+            traces[span['trace_id']].append(span)
+    return traces
+
+
+def roots(spans):
+    ids = {span['span_id'] for span in spans}
+    return [span for span in spans if span['parent_id'] not in ids]
+
+
+def summary(trace_id, spans):
+    top = min(roots(spans), key=lambda span: span['start'])
+    return top['start'], top['duration_ms'], f"{top['service']} {top['name']}", trace_id
+
+
+def print_waterfall(spans):
+    children = defaultdict(list)
+    for span in spans:
+        children[span['parent_id']].append(span)
+    origin = min(span['start'] for span in spans)
+    total = max(span['start'] * 1000 + span['duration_ms'] for span in spans) - origin * 1000
+    scale = BAR_WIDTH / total if total else 0
+
+    print(f"{'offset ms':>9} {'durée ms':>9} {'db ms':>7}  {'':<{BAR_WIDTH}}  span")
+    ids = {span['span_id'] for span in spans}
+    stack = [(span, 0) for span in sorted(roots(spans), key=lambda s: s['start'], reverse=True)]
+    while stack:
+        span, depth = stack.pop()
+        offset = (span['start'] - origin) * 1000
+        start = int(offset * scale)
+        bar = ' ' * start + '█' * max(1, int(span['duration_ms'] * scale))
+        attributes = span.get('attributes', {})
+        db = attributes.get('db.duration_ms')
+        status = attributes.get('http.status_code') or attributes.get('error', '')
+        label = f"{'  ' * depth}{span['service']} {span['name']} {status}".rstrip()
+        if 'db.queries' in attributes:
+            label += f" ({attributes['db.queries']} requêtes SQL)"
+        print(f"{offset:>9.1f} {span['duration_ms']:>9.1f} {db if db is not None else '':>7}  "
+              f"{bar:<{BAR_WIDTH}}  {label}")
+        for child in sorted(children[span['span_id']], key=lambda s: s['start'], reverse=True):
+            if child['span_id'] in ids:
+                stack.append((child, depth + 1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cascade d'une requête tracée")
+    parser.add_argument('trace_id', nargs='?')
+    parser.add_argument('--file', default=os.environ.get('TRACE_COLLECTOR_FILE', DEFAULT_COLLECTOR))
+    parser.add_argument('--list', type=int, metavar='N', help='traces les plus récentes')
+    parser.add_argument('--slowest', type=int, metavar='N', help='traces les plus lentes')
+    args = parser.parse_args()
+
+    try:
+        traces = load_traces(args.file)
+    except FileNotFoundError:
+        sys.exit(f"Collecteur introuvable : {args.file}")
+    if not traces:
+        sys.exit("Aucune trace enregistrée")
+
+    if args.list or args.slowest:
+        summaries = [summary(trace_id, spans) for trace_id, spans in traces.items()]
+        if args.slowest:
+            selected = sorted(summaries, key=lambda s: s[1], reverse=True)[:args.slowest]
+        else:
+            selected = sorted(summaries)[-args.list:]
+        for _, duration, name, trace_id in selected:
+            print(f"{trace_id}  {duration:>9.1f} ms  {name}")
+        return
+
+    if args.trace_id:
+        spans = traces.get(args.trace_id)
+        if spans is None:
+            sys.exit(f"Trace inconnue : {args.trace_id}")
+    else:
+        spans = max(traces.values(), key=lambda spans: max(span['start'] for span in spans))
+    print(f"trace {spans[0]['trace_id']}")
+    print_waterfall(spans)
+
+
+if __name__ == '__main__':
+    main()